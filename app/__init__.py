@@ -31,6 +31,35 @@ def create_app(config_class: Optional[Type] = None) -> Flask:
         # If the instance path cannot be created, continue without failing
         pass
 
+    # HTTP 응답 캐시 (instance/http_cache). HTTP_CACHE_MODE: normal, refresh, replay, off
+    from .services import http_cache
+    import os
+
+    http_cache.configure(
+        app.config.get("HTTP_CACHE_DIR") or os.path.join(app.instance_path, "http_cache"),
+        app.config.get("HTTP_CACHE_MODE") or os.environ.get("LOTTO_HTTP_CACHE_MODE", "normal"),
+    )
+
+    # C(45, 6) 조합 특성 저장소 (instance/combination_features.bin, scripts/build_feature_store.py로 생성)
+    from .services import feature_store
+
+    feature_store.configure(
+        app.config.get("FEATURE_STORE_PATH") or os.path.join(app.instance_path, feature_store.DEFAULT_FILENAME)
+    )
+
+    # 추천용 조합 인덱스를 첫 요청이 아니라 시작 시 백그라운드에서 준비 (저장소가 있으면 메모리 맵만 연다)
+    app.config.setdefault(
+        "PRELOAD_COMBINATION_INDEX",
+        not app.testing and os.environ.get("LOTTO_PRELOAD_COMBINATION_INDEX", "1") != "0",
+    )
+    if app.config["PRELOAD_COMBINATION_INDEX"]:
+        from .services.combinations import preload_combination_index
+
+        preload_combination_index()
+
+    # 크롤링 작업 워커: embedded(웹 프로세스 안 스레드) 또는 external(scripts/job_worker.py)
+    app.config.setdefault("JOB_WORKER", os.environ.get("LOTTO_JOB_WORKER", "embedded"))
+
     # Init extensions
     from .extensions import db, login_manager, csrf
 
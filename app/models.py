@@ -96,6 +96,24 @@ class Draw(db.Model):
         return [int(x) for x in self.numbers.split(",") if x]
 
 
+class Shop(db.Model):
+    """정규화된 판매점 (같은 판매점의 회차별 표기 차이를 하나로 묶음)"""
+    __tablename__ = "shops"
+
+    id = db.Column(db.Integer, primary_key=True)
+    canonical_key = db.Column(db.String(600), unique=True, nullable=False, index=True)  # 정규화 이름|주소
+    name = db.Column(db.String(200), nullable=False)  # 대표 상호명 (최근 표기)
+    address = db.Column(db.String(400), nullable=True)  # 정규화 주소
+    sido = db.Column(db.String(20), nullable=True, index=True)  # 시/도 (예: 서울, 경기)
+    sigungu = db.Column(db.String(50), nullable=True, index=True)  # 시/군/구 (예: 강남구, 수원시 팔달구)
+    dong = db.Column(db.String(50), nullable=True)  # 읍/면/동
+    latitude = db.Column(db.Float, nullable=True)  # 행정구역 대표 좌표 (WGS84)
+    longitude = db.Column(db.Float, nullable=True)
+    geo_precision = db.Column(db.String(10), nullable=True)  # dong/sigungu/sido/none (NULL=미처리)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 class WinningShop(db.Model):
     __tablename__ = "winning_shops"
 
@@ -109,6 +127,93 @@ class WinningShop(db.Model):
     winners_count = db.Column(db.Integer, nullable=True)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
 
+    # 정규화 판매점 (shop_normalizer.normalize_shops에서 채움)
+    shop_id = db.Column(db.Integer, db.ForeignKey('shops.id'), nullable=True, index=True)
+    shop = db.relationship('Shop', backref=db.backref('wins', lazy=True))
+
+
+class ShopLeaderboard(db.Model):
+    """미리 계산된 당첨점/지역 순위 (leaderboards.refresh_leaderboards에서 갱신)"""
+    __tablename__ = "shop_leaderboards"
+
+    id = db.Column(db.Integer, primary_key=True)
+    board_key = db.Column(db.String(50), unique=True, nullable=False, index=True)  # "{level}:{rank}:{window}"
+    level = db.Column(db.String(20), nullable=False)  # totals, sido, sigungu, shop
+    rank = db.Column(db.Integer, nullable=False, default=0)  # 0=전체, 1=1등, 2=2등
+    window = db.Column(db.String(10), nullable=False)  # all, 52w
+    entries = db.Column(db.Text, nullable=False)  # JSON 형태로 순위 목록 저장
+    through_round = db.Column(db.Integer, nullable=True)  # 집계에 포함된 마지막 회차
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class ShopPageState(db.Model):
+    """당첨점 페이지별 수집 상태 (shop_scraper에서 증분 수집에 사용)"""
+    __tablename__ = "shop_page_states"
+
+    id = db.Column(db.Integer, primary_key=True)
+    page_key = db.Column(db.String(20), unique=True, nullable=False, index=True)  # "{round}:{page}"
+    round = db.Column(db.Integer, nullable=False, index=True)
+    page = db.Column(db.Integer, nullable=False)
+    etag = db.Column(db.String(200), nullable=True)  # 응답 ETag (조건부 요청용)
+    last_modified = db.Column(db.String(100), nullable=True)  # 응답 Last-Modified
+    content_hash = db.Column(db.String(64), nullable=True)  # 파싱된 행의 SHA-256
+    row_count = db.Column(db.Integer, nullable=False, default=0)
+    page_count = db.Column(db.Integer, nullable=True)  # 1페이지만: 확인된 전체 페이지 수
+    fetched_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+class CrawlJob(db.Model):
+    """크롤링 작업 큐 (job_queue에서 등록/실행, 워커 프로세스 간 공유)"""
+    __tablename__ = "crawl_jobs"
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)  # single, range, missing
+    operation_type = db.Column(db.String(50), nullable=False)  # 화면 표시용 (예: "범위크롤링")
+    data_type = db.Column(db.String(10), nullable=False, default='both')  # both, numbers, shops
+    revalidate_shops = db.Column(db.Boolean, nullable=False, default=False)  # 저장된 당첨점 페이지도 조건부 요청으로 재확인
+    start_round = db.Column(db.Integer, nullable=True)
+    end_round = db.Column(db.Integer, nullable=True)
+    rounds = db.Column(db.Text, nullable=True)  # JSON 형태로 처리할 회차 목록 저장 (누락회차)
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True)  # queued, running, completed, failed, cancelled
+    cancel_requested = db.Column(db.Boolean, nullable=False, default=False)
+    status_message = db.Column(db.String(200), nullable=True)
+
+    # 진행 상황과 재개 지점
+    total_rounds = db.Column(db.Integer, nullable=False, default=0)
+    completed_rounds = db.Column(db.Integer, nullable=False, default=0)
+    current_round = db.Column(db.Integer, nullable=True)
+    last_completed_round = db.Column(db.Integer, nullable=True)  # 체크포인트: 마지막으로 반영된 회차
+
+    # 작업 지표
+    draws_updated = db.Column(db.Integer, nullable=False, default=0)
+    shops_updated = db.Column(db.Integer, nullable=False, default=0)
+    failed_rounds = db.Column(db.Integer, nullable=False, default=0)
+    attempts = db.Column(db.Integer, nullable=False, default=0)  # 워커가 작업을 가져간 횟수 (재개 포함)
+    metrics = db.Column(db.Text, nullable=True)  # JSON 형태로 미리받기 통계/실패 회차 저장
+    error = db.Column(db.Text, nullable=True)
+
+    worker_id = db.Column(db.String(100), nullable=True)  # "{hostname}:{pid}"
+    heartbeat_at = db.Column(db.DateTime, nullable=True)
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    @property
+    def is_active(self) -> bool:
+        return self.status in ('queued', 'running')
+
+
+class CrawlJobEvent(db.Model):
+    """크롤링 작업 진행 이벤트 (job_events 링 버퍼, SSE 이벤트 ID로 사용)"""
+    __tablename__ = "crawl_job_events"
+
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.Integer, db.ForeignKey('crawl_jobs.id'), nullable=False, index=True)
+    event = db.Column(db.String(30), nullable=False)  # job_started, round_started, round_completed, retry 등
+    data = db.Column(db.Text, nullable=False)  # JSON 형태로 이벤트 내용 저장
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
 
 class Purchase(db.Model):
     __tablename__ = "purchases"
@@ -141,11 +246,14 @@ class Purchase(db.Model):
     bonus_matched = db.Column(db.Boolean, nullable=False, default=False)  # 보너스 번호 일치 여부
     prize_amount = db.Column(db.Integer, nullable=True)  # 당첨금액 (원)
 
-    # Draw 관계 설정 (역참조)
-    @property
-    def draw(self):
-        """해당 회차의 추첨 결과 조회"""
-        return Draw.query.filter_by(round=self.purchase_round).first()
+    # 해당 회차의 추첨 결과 (읽기 전용, 목록에서는 services.purchase_draws.attach_draws로 일괄 로딩)
+    draw = db.relationship(
+        'Draw',
+        primaryjoin='foreign(Purchase.purchase_round) == Draw.round',
+        viewonly=True,
+        uselist=False,
+        lazy='select',
+    )
 
     def numbers_list(self) -> List[int]:
         return [int(x) for x in self.numbers.split(",") if x]
@@ -158,6 +266,23 @@ class Purchase(db.Model):
         return f"{self.winning_rank}등 당첨"
 
 
+class PurchaseReport(db.Model):
+    """사용자 구매 번호의 역대 회차 대입 리포트 (purchase_report에서 비동기 계산, 결과 캐시)"""
+    __tablename__ = "purchase_reports"
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, unique=True, index=True)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, completed, failed
+    stamp = db.Column(db.String(100), nullable=False)  # 계산 기준 (구매/추첨 행 수와 최대 id, 당첨금 빈 회차 수)
+    result = db.Column(db.Text, nullable=True)  # JSON 형태로 리포트 저장
+    error = db.Column(db.Text, nullable=True)
+    requested_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    user = db.relationship('User', backref=db.backref('purchase_report', uselist=False, lazy=True))
+
+
 class RecommendationSet(db.Model):
     __tablename__ = "recommendation_sets"
 
@@ -1,15 +1,17 @@
-from flask import Blueprint, render_template, request, jsonify, redirect, url_for, current_app, flash, abort
+from flask import (
+    Blueprint, render_template, request, jsonify, redirect, url_for, current_app, flash, abort,
+    Response, send_from_directory, stream_with_context
+)
+import json
 import re
 from flask_login import login_user, logout_user, login_required, current_user
 from functools import wraps
-import threading
-import time
 import secrets
 from datetime import timedelta, datetime
 from typing import Optional, List
 
 from .extensions import db, csrf
-from .models import Draw, WinningShop, Purchase, User, PasswordResetToken, RecommendationSet
+from .models import Draw, WinningShop, Purchase, PurchaseReport, User, PasswordResetToken, RecommendationSet
 from .services.lotto_fetcher import fetch_draw, fetch_winning_shops
 from .services.updater import (
     perform_update as svc_perform_update,
@@ -19,9 +21,29 @@ from .services.updater import (
     update_to_latest
 )
 from .services.recommender import auto_recommend, semi_auto_recommend, enhanced_auto_recommend
+from .services.simulator import iter_simulation, load_prize_table
+from .services.shop_search import search_shops
+from .services.round_gaps import completeness, count_missing, expand_ranges, missing_ranges
+from .services.job_events import event_stream as job_event_stream
+from .services.job_queue import (
+    JobConflict, cancel_job, enqueue_job, ensure_embedded_worker, get_active_job, get_progress, recent_jobs
+)
+from .services.shop_geo import MAX_RADIUS_KM, find_nearby_shops
+from .services.feature_store import get_feature_store
+from .services.history_match import get_history_index
+from .services.purchase_report import report_to_dict, request_report as request_purchase_report
+from .services.purchase_draws import attach_draws
+from .services.window_stats import window_stats
+from .services.snapshots import (
+    FORMATS as SNAPSHOT_FORMATS, SnapshotUnavailable, export_snapshot, import_snapshot, list_snapshots,
+    resolve_snapshot, snapshot_root
+)
+from .services.leaderboards import (
+    WINDOWS as LEADERBOARD_WINDOWS, board_key as leaderboard_key, get_leaderboards
+)
 from .services.analyzer import (
     get_number_frequency, get_most_frequent_numbers, get_least_frequent_numbers,
-    analyze_patterns, get_hot_cold_analysis, get_number_combinations
+    analyze_patterns, get_combination_stats, get_hot_cold_analysis, get_number_combinations
 )
 from .services.lottery_checker import (
     check_all_pending_results, get_purchase_statistics,
@@ -77,56 +99,6 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
-# Progress tracking storage
-crawling_progress = {
-    "is_running": False,
-    "should_stop": False,
-    "current_round": 0,
-    "total_rounds": 0,
-    "completed_rounds": 0,
-    "status": "대기중",
-    "start_time": None,
-    "operation_type": ""
-}
-
-
-def _update_progress(current_round=0, total_rounds=0, completed_rounds=0, status="진행중", operation_type="", is_running=True):
-    """Update crawling progress status"""
-    crawling_progress["current_round"] = current_round
-    crawling_progress["total_rounds"] = total_rounds
-    crawling_progress["completed_rounds"] = completed_rounds
-    crawling_progress["status"] = status
-    crawling_progress["operation_type"] = operation_type
-    crawling_progress["is_running"] = is_running
-    if is_running and crawling_progress["start_time"] is None:
-        crawling_progress["start_time"] = time.time()
-    elif not is_running:
-        crawling_progress["start_time"] = None
-
-
-def _reset_progress():
-    """Reset progress to initial state"""
-    _update_progress(0, 0, 0, "대기중", "", False)
-
-
-def _perform_update_with_progress(round_no: int, data_type: str = 'both'):
-    """Wrapper for single round update with progress tracking"""
-    try:
-        operation_name = "특정회차"
-        if data_type == "numbers":
-            operation_name = "당첨번호만"
-        elif data_type == "shops":
-            operation_name = "판매점만"
-
-        _update_progress(round_no, 1, 0, f"{round_no}회 수집중", operation_name, True)
-        result = svc_perform_update(round_no, data_type)
-        _update_progress(round_no, 1, 1, f"{round_no}회 완료", operation_name, False)
-        return result
-    except Exception as e:
-        _update_progress(round_no, 1, 0, f"오류: {str(e)}", operation_name if 'operation_name' in locals() else "특정회차", False)
-        raise
-
-
 def _parse_fixed_numbers(raw: Optional[str]) -> List[int]:
     if not raw:
         return []
@@ -353,6 +325,7 @@ def mobile_purchases():
     purchases = Purchase.query.filter_by(user_id=current_user.id).order_by(Purchase.purchase_date.desc()).paginate(
         page=page, per_page=per_page, error_out=False
     )
+    attach_draws(purchases.items)
 
     # 통계 계산
     all_purchases = Purchase.query.filter_by(user_id=current_user.id).all()
@@ -485,72 +458,33 @@ def update_round(round_no: int):
         return {"status": "error", "round": round_no, "message": str(exc)}, 400
 
 
-def _run_single_update_background(round_no: int, app, data_type: str = 'both'):
-    """Run single round update in background with progress tracking"""
-    try:
-        with app.app_context():
-            _perform_update_with_progress(round_no, data_type)
-    except Exception as e:
-        print(f"Background update failed: {e}")
+def _crawl_operation_name(base: str, data_type: str) -> str:
+    """작업 표시 이름 (예: 범위크롤링, 범위(당첨번호만))"""
+    if data_type == "numbers":
+        return f"{base}(당첨번호만)"
+    if data_type == "shops":
+        return f"{base}(판매점만)"
+    return f"{base}크롤링"
 
 
-def _run_range_update_background(start_round: int, end_round: int, operation_type: str, app, data_type: str = 'both'):
-    """Run range update in background with progress tracking"""
+def _start_crawl_job(kind: str, operation_type: str, data_type: str, message: str,
+                     start_round: Optional[int] = None, end_round: Optional[int] = None):
+    """크롤링 작업을 큐에 등록하고 응답 생성 (모바일/API 요청은 JSON, 나머지는 크롤링 페이지로 이동)"""
+    # 저장된 당첨점 페이지도 조건부 요청으로 다시 확인 (바뀐 페이지만 반영)
+    revalidate_shops = request.form.get("revalidate_shops", "").lower() in ("1", "true", "on")
     try:
-        with app.app_context():
-            total_rounds = end_round - start_round + 1
-            _update_progress(start_round, total_rounds, 0, "시작 중", operation_type, True)
-
-            for i, round_no in enumerate(range(start_round, end_round + 1)):
-                _update_progress(round_no, total_rounds, i, f"{round_no}회 수집중", operation_type, True)
-                svc_perform_update(round_no, data_type)
-                _update_progress(round_no, total_rounds, i + 1, f"{round_no}회 완료", operation_type, True)
-                time.sleep(0.1)  # Small delay to prevent overwhelming the server
+        job = enqueue_job(kind, operation_type, data_type, start_round, end_round,
+                          created_by=current_user.id if current_user.is_authenticated else None,
+                          revalidate_shops=revalidate_shops and data_type in ("both", "shops"))
+    except JobConflict as exc:
+        return jsonify({"success": False, "error": str(exc)}), 400
+    ensure_embedded_worker(current_app._get_current_object())
 
-            _update_progress(end_round, total_rounds, total_rounds, "모든 회차 완료", operation_type, False)
-    except Exception as e:
-        _update_progress(0, total_rounds if 'total_rounds' in locals() else 0, 0, f"오류: {str(e)}", operation_type, False)
-        print(f"Background range update failed: {e}")
-
-
-def _run_missing_update_background(app):
-    """Run missing rounds update in background with progress tracking"""
-    try:
-        with app.app_context():
-            _update_progress(0, 0, 0, "누락 회차 확인중", "누락회차", True)
-
-            # Get missing rounds (this is a simplified version, actual implementation may vary)
-            latest_round = get_latest_round()
-            if not latest_round:
-                _update_progress(0, 0, 0, "최신 회차를 감지할 수 없음", "누락회차", False)
-                return
-
-            all_rounds = set(range(1, latest_round + 1))
-            existing_rounds = set(draw.round for draw in Draw.query.all())
-            missing_rounds = sorted(list(all_rounds - existing_rounds))
-
-            if not missing_rounds:
-                _update_progress(0, 0, 0, "누락된 회차 없음", "누락회차", False)
-                return
-
-            total_rounds = len(missing_rounds)
-
-            for i, round_no in enumerate(missing_rounds):
-                # 중지 플래그 확인
-                if crawling_progress.get("should_stop", False):
-                    _update_progress(round_no, total_rounds, i, "중지됨", "누락회차", False)
-                    crawling_progress["should_stop"] = False  # 플래그 리셋
-                    return
-
-                _update_progress(round_no, total_rounds, i, f"{round_no}회 수집중", "누락회차", True)
-                svc_perform_update(round_no)
-                _update_progress(round_no, total_rounds, i + 1, f"{round_no}회 완료", "누락회차", True)
-                time.sleep(0.1)
-
-            _update_progress(missing_rounds[-1] if missing_rounds else 0, total_rounds, total_rounds, "누락 회차 완료", "누락회차", False)
-    except Exception as e:
-        _update_progress(0, 0, 0, f"오류: {str(e)}", "누락회차", False)
-        print(f"Background missing update failed: {e}")
+    # 요청 헤더로 모바일/API 요청 구분
+    if request.headers.get('Content-Type') == 'application/json' or 'mobile' in request.path:
+        return jsonify({"success": True, "message": message, "job_id": job.id})
+    else:
+        return redirect(url_for("main.crawling_page"))
 
 
 @main_bp.post("/update")
@@ -562,13 +496,14 @@ def update_round_from_form():
     except Exception:
         return jsonify({"error": "invalid round"}), 400
 
-    if crawling_progress["is_running"]:
-        return jsonify({"error": "크롤링이 이미 실행중입니다"}), 400
-
-    # Start background update with data type
-    threading.Thread(target=_run_single_update_background, args=(round_no, current_app._get_current_object(), data_type), daemon=True).start()
+    operation_name = "특정회차"
+    if data_type == "numbers":
+        operation_name = "당첨번호만"
+    elif data_type == "shops":
+        operation_name = "판매점만"
 
-    return redirect(url_for("main.crawling_page"))
+    return _start_crawl_job("single", operation_name, data_type, f"{round_no}회 업데이트가 시작되었습니다",
+                            start_round=round_no)
 
 
 @main_bp.post("/update-range")
@@ -581,35 +516,19 @@ def update_range_api():
     except Exception:
         return jsonify({"error": "invalid range"}), 400
 
-    if crawling_progress["is_running"]:
-        return jsonify({"error": "크롤링이 이미 실행중입니다"}), 400
-
     if start_round > end_round:
         start_round, end_round = end_round, start_round
 
-    # Start background range update
-    operation_name = "범위크롤링"
-    if data_type == "numbers":
-        operation_name = "범위(당첨번호만)"
-    elif data_type == "shops":
-        operation_name = "범위(판매점만)"
-
-    threading.Thread(target=_run_range_update_background,
-                     args=(start_round, end_round, operation_name, current_app._get_current_object(), data_type),
-                     daemon=True).start()
-
-    # 요청 헤더로 모바일/API 요청 구분
-    if request.headers.get('Content-Type') == 'application/json' or 'mobile' in request.path:
-        return jsonify({"success": True, "message": f"범위 업데이트({start_round}~{end_round}회)가 시작되었습니다"})
-    else:
-        return redirect(url_for("main.crawling_page"))
+    return _start_crawl_job("range", _crawl_operation_name("범위", data_type), data_type,
+                            f"범위 업데이트({start_round}~{end_round}회)가 시작되었습니다",
+                            start_round=start_round, end_round=end_round)
 
 
 @main_bp.post("/update-full")
 @login_required
 def update_full_api():
     """Complete re-crawling from round 1 to latest."""
-    if crawling_progress["is_running"]:
+    if get_active_job() is not None:
         return jsonify({"error": "크롤링이 이미 실행중입니다"}), 400
 
     latest = get_latest_round()
@@ -617,46 +536,22 @@ def update_full_api():
         return jsonify({"error": "cannot detect latest round"}), 400
 
     data_type = request.form.get("data_type", "both")
-    operation_name = "전체크롤링"
-    if data_type == "numbers":
-        operation_name = "전체(당첨번호만)"
-    elif data_type == "shops":
-        operation_name = "전체(판매점만)"
-
-    # Start background update
-    threading.Thread(target=_run_range_update_background,
-                     args=(1, latest, operation_name, current_app._get_current_object(), data_type),
-                     daemon=True).start()
-
-    # 요청 헤더로 모바일/API 요청 구분
-    if request.headers.get('Content-Type') == 'application/json' or 'mobile' in request.path:
-        return jsonify({"success": True, "message": f"전체 업데이트(1~{latest}회)가 시작되었습니다"})
-    else:
-        return redirect(url_for("main.crawling_page"))
+    return _start_crawl_job("range", _crawl_operation_name("전체", data_type), data_type,
+                            f"전체 업데이트(1~{latest}회)가 시작되었습니다", start_round=1, end_round=latest)
 
 
 @main_bp.post("/update-missing")
 @login_required
 def update_missing_api():
     """Update only missing rounds."""
-    if crawling_progress["is_running"]:
-        return jsonify({"success": False, "error": "크롤링이 이미 실행중입니다"}), 400
-
-    # Start background update
-    threading.Thread(target=_run_missing_update_background, args=(current_app._get_current_object(),), daemon=True).start()
-
-    # 요청 헤더로 모바일/API 요청 구분
-    if request.headers.get('Content-Type') == 'application/json' or 'mobile' in request.path:
-        return jsonify({"success": True, "message": "누락 회차 업데이트가 시작되었습니다"})
-    else:
-        return redirect(url_for("main.crawling_page"))
+    return _start_crawl_job("missing", "누락회차", "both", "누락 회차 업데이트가 시작되었습니다")
 
 
 @main_bp.post("/update-latest")
 @login_required
 def update_latest_api():
     """Update to the latest available round."""
-    if crawling_progress["is_running"]:
+    if get_active_job() is not None:
         return jsonify({"success": False, "error": "크롤링이 이미 실행중입니다"}), 400
 
     latest = get_latest_round()
@@ -664,17 +559,8 @@ def update_latest_api():
         return jsonify({"success": False, "error": "최신 회차를 감지할 수 없습니다"}), 400
 
     data_type = request.form.get("data_type", "both")
-
-    # Start background update for just the latest round
-    threading.Thread(target=_run_single_update_background,
-                     args=(latest, current_app._get_current_object(), data_type),
-                     daemon=True).start()
-
-    # 요청 헤더로 모바일/API 요청 구분
-    if request.headers.get('Content-Type') == 'application/json' or 'mobile' in request.path:
-        return jsonify({"success": True, "message": f"최신 회차({latest}회) 업데이트가 시작되었습니다"})
-    else:
-        return redirect(url_for("main.crawling_page"))
+    return _start_crawl_job("single", "최신회차", data_type, f"최신 회차({latest}회) 업데이트가 시작되었습니다",
+                            start_round=latest)
 
 
 @main_bp.post("/update-all")
@@ -757,6 +643,7 @@ def strategy():
     # Get latest draw for next round calculation
     latest_draw = Draw.query.order_by(Draw.round.desc()).first()
     next_round = latest_draw.round + 1 if latest_draw else 1
+    first_draw = Draw.query.order_by(Draw.round).first()
 
     return render_template(
         "strategy.html",
@@ -774,6 +661,9 @@ def strategy():
         analysis_limit=analysis_limit,
         # 장바구니 기능을 위한 next_round
         next_round=next_round,
+        # 구간 분석 슬라이더 범위
+        first_round=first_draw.round if first_draw else None,
+        latest_round=latest_draw.round if latest_draw else None,
     )
 
 
@@ -963,55 +853,78 @@ def crawling_page():
 @main_bp.get("/api/crawling-progress")
 def api_crawling_progress():
     """Get current crawling progress status"""
-    progress = crawling_progress.copy()
-
-    # Calculate elapsed time if running
-    if progress["is_running"] and progress["start_time"]:
-        elapsed = time.time() - progress["start_time"]
-        progress["elapsed_seconds"] = int(elapsed)
-
-        # Calculate estimated remaining time
-        if progress["completed_rounds"] > 0 and progress["total_rounds"] > 0:
-            avg_time_per_round = elapsed / progress["completed_rounds"]
-            remaining_rounds = progress["total_rounds"] - progress["completed_rounds"]
-            progress["estimated_remaining_seconds"] = int(avg_time_per_round * remaining_rounds)
-    else:
-        progress["elapsed_seconds"] = 0
-        progress["estimated_remaining_seconds"] = 0
-
+    progress = get_progress()
+    if progress["is_running"]:
+        # 서버 재시작 등으로 남아 있는 작업을 이어서 실행
+        ensure_embedded_worker(current_app._get_current_object())
     return jsonify(progress)
 
 
+@main_bp.get("/api/crawling-progress/stream")
+def api_crawling_progress_stream():
+    """크롤링 진행 이벤트 스트림 (Server-Sent Events, Last-Event-ID로 이어 받기)"""
+    last_event_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+    if get_active_job() is not None:
+        ensure_embedded_worker(current_app._get_current_object())
+
+    return Response(
+        stream_with_context(job_event_stream(last_event_id, get_progress)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @main_bp.post("/api/stop-crawling")
 def api_stop_crawling():
     """Stop current crawling operation"""
-    global crawling_progress
-
-    if not crawling_progress["is_running"]:
+    job = cancel_job()
+    if job is None:
         return jsonify({
             "success": False,
             "message": "진행 중인 크롤링이 없습니다."
         })
 
-    # 중지 플래그 설정
-    crawling_progress["should_stop"] = True
-    crawling_progress["status"] = "중지 요청됨..."
-
     return jsonify({
         "success": True,
-        "message": "크롤링 중지 요청이 전송되었습니다."
+        "message": "크롤링 중지 요청이 전송되었습니다.",
+        "job_id": job.id
     })
 
 
+@main_bp.get("/api/crawl-jobs")
+@login_required
+def api_crawl_jobs():
+    """최근 크롤링 작업 목록과 작업별 지표"""
+    limit = min(request.args.get("limit", 20, type=int) or 20, 100)
+    return jsonify({"jobs": recent_jobs(limit)})
+
+
+@main_bp.get("/api/analysis")
+@login_required
+def api_analysis():
+    """
+    회차 구간 통계 (번호별 출현, 홀짝, 번호 구간, 합계 분포) - 누적 합으로 구간 크기와 관계없이 일정 시간
+
+    Query: from, to (회차, 생략하면 처음/마지막 회차)
+    """
+    from_round = request.args.get("from", type=int)
+    to_round = request.args.get("to", type=int)
+    if from_round is not None and to_round is not None and from_round > to_round:
+        return jsonify({"success": False, "error": "from은 to보다 클 수 없습니다"}), 400
+    return jsonify({"success": True, **window_stats(from_round, to_round)})
+
+
 @main_bp.get("/api/recommend")
 @login_required
 def api_recommend():
-    draws = Draw.query.order_by(Draw.round.desc()).limit(50).all()
-    history = [d.numbers_list() for d in draws]
     fixed = _parse_fixed_numbers(request.args.get("fixed"))
-    # Enhanced recommendation with user's winning pattern analysis
+    # Enhanced recommendation with user's winning pattern analysis (cached last-50 frequency)
     user_id = current_user.id if current_user.is_authenticated else None
-    auto_recommendations, auto_reasons = enhanced_auto_recommend(history, user_id=user_id, count=3)
+    auto_recommendations, auto_reasons = enhanced_auto_recommend(None, user_id=user_id, count=3, limit=50)
 
     return jsonify({
         "auto": auto_recommendations,
@@ -1021,6 +934,182 @@ def api_recommend():
     })
 
 
+def _int_range_arg(name: str, low: int, high: int) -> Optional[tuple]:
+    """?<name>_min=&<name>_max= 쿼리 파라미터를 (min, max)로 (둘 다 없으면 None)"""
+    minimum = request.args.get(f"{name}_min", type=int)
+    maximum = request.args.get(f"{name}_max", type=int)
+    if minimum is None and maximum is None:
+        return None
+    return (low if minimum is None else minimum, high if maximum is None else maximum)
+
+
+@main_bp.get("/api/combination-stats")
+@login_required
+def api_combination_stats():
+    """
+    C(45, 6) 전체 조합 중 조건을 만족하는 조합 수와 역대 최고 등수 분포 (조합 특성 저장소)
+
+    Query: sum_min/sum_max, odd_min/odd_max, match_min/match_max, max_consecutive, min_per_range,
+           exclude_won(1~5), unseen_size(3~5)+unseen_rounds, include, exclude, samples(최대 20),
+           numbers(6개 번호의 특성 조회)
+    """
+    conditions = {
+        "sum_range": _int_range_arg("sum", 21, 255),
+        "odd_range": _int_range_arg("odd", 0, 6),
+        "best_match_range": _int_range_arg("match", 0, 6),
+        "max_consecutive": request.args.get("max_consecutive", type=int),
+        "min_per_range": request.args.get("min_per_range", type=int),
+        "exclude_won": request.args.get("exclude_won", type=int),
+        "include": _parse_fixed_numbers(request.args.get("include")),
+        "exclude": [int(p) for p in re.split(r"[,/ ]+", request.args.get("exclude", "")) if p.isdigit()
+                    and 1 <= int(p) <= 45],
+    }
+    unseen_size = request.args.get("unseen_size", type=int)
+    if unseen_size is not None:
+        conditions["unseen_for"] = (unseen_size, request.args.get("unseen_rounds", 52, type=int))
+    samples = max(0, min(request.args.get("samples", 0, type=int) or 0, 20))
+
+    try:
+        stats = get_combination_stats(samples=samples, **conditions)
+    except ValueError as exc:
+        return jsonify({"success": False, "error": str(exc)}), 400
+    if stats is None:
+        return jsonify({"success": False, "error": "조합 특성 저장소가 없습니다 (scripts/build_feature_store.py)"}), 503
+
+    numbers = request.args.get("numbers")
+    if numbers:
+        ticket = sorted({int(p) for p in re.split(r"[,/ ]+", numbers) if p.isdigit()})
+        if len(ticket) != 6 or not all(1 <= n <= 45 for n in ticket):
+            return jsonify({"success": False, "error": "numbers는 1~45 사이 서로 다른 6개여야 합니다"}), 400
+        stats["ticket"] = {"numbers": ticket, **get_feature_store().lookup([ticket])[0]}
+    return jsonify({"success": True, **stats})
+
+
+# 시뮬레이션 요청 한도 (요청 워커에서 동기 실행하므로 추첨 수 x 티켓 수 합계도 제한:
+# 1e7 x 1티켓이 약 2초, MAX_SIMULATION_WORK는 약 20초)
+MAX_SIMULATIONS = 10_000_000
+MAX_SIMULATION_TICKETS = 50
+MAX_SIMULATION_WORK = 100_000_000
+
+
+@main_bp.post("/api/simulate")
+@login_required
+def api_simulate():
+    """
+    티켓 세트의 다음 회차 기대값 몬테카를로 시뮬레이션
+
+    JSON: {"tickets": [[1,2,3,4,5,6], ...], "simulations": 1000000, "seed": 선택, "stream": false}
+    stream=true이면 배치마다 진행률을 NDJSON 한 줄씩 전송하고 마지막 줄에 결과를 보낸다.
+    """
+    data = request.get_json(silent=True) or {}
+
+    tickets = data.get("tickets") or []
+    if not isinstance(tickets, list) or not tickets:
+        return jsonify({"success": False, "error": "tickets가 필요합니다"}), 400
+    if len(tickets) > MAX_SIMULATION_TICKETS:
+        return jsonify({"success": False, "error": f"티켓은 최대 {MAX_SIMULATION_TICKETS}개까지 가능합니다"}), 400
+    for ticket in tickets:
+        try:
+            numbers = [int(n) for n in ticket]
+        except (TypeError, ValueError):
+            return jsonify({"success": False, "error": f"잘못된 번호: {ticket}"}), 400
+        if len(numbers) != 6 or len(set(numbers)) != 6 or not all(1 <= n <= 45 for n in numbers):
+            return jsonify({"success": False, "error": f"번호는 1~45 사이 서로 다른 6개여야 합니다: {ticket}"}), 400
+
+    try:
+        simulations = int(data.get("simulations", 1_000_000))
+        seed = int(data["seed"]) if data.get("seed") is not None else None
+        if seed is not None and seed < 0:
+            # np.random.default_rng는 음수 seed를 받지 않는다
+            raise ValueError(seed)
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "error": "simulations/seed는 정수여야 합니다"}), 400
+    if not 1 <= simulations <= MAX_SIMULATIONS:
+        return jsonify({"success": False, "error": f"simulations는 1~{MAX_SIMULATIONS} 사이여야 합니다"}), 400
+    if simulations * len(tickets) > MAX_SIMULATION_WORK:
+        return jsonify({
+            "success": False,
+            "error": f"simulations x 티켓 수는 최대 {MAX_SIMULATION_WORK:,}까지 가능합니다 "
+                     f"(티켓 {len(tickets)}개면 simulations {MAX_SIMULATION_WORK // len(tickets):,} 이하)"
+        }), 400
+
+    events = iter_simulation(tickets, simulations, seed=seed, prize_table=load_prize_table())
+
+    if data.get("stream"):
+        def generate():
+            for event in events:
+                yield json.dumps(event) + "\n"
+
+        return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+    result = None
+    for event in events:
+        result = event
+    result.pop("type")
+    return jsonify({"success": True, **result})
+
+
+# 역대 당첨 조회 요청당 티켓 수 한도
+MAX_HISTORY_MATCH_TICKETS = 1000
+
+
+@main_bp.post("/api/history-match")
+@login_required
+def api_history_match():
+    """
+    티켓들이 역대 회차에서 몇 등에 당첨되었을지 (등수별 횟수, 최고 등수, 1~3등 회차)
+
+    JSON: {"tickets": [[1,2,3,4,5,6], ...]}
+    """
+    data = request.get_json(silent=True) or {}
+
+    tickets = data.get("tickets") or []
+    if not isinstance(tickets, list) or not tickets:
+        return jsonify({"success": False, "error": "tickets가 필요합니다"}), 400
+    if len(tickets) > MAX_HISTORY_MATCH_TICKETS:
+        return jsonify({"success": False, "error": f"티켓은 최대 {MAX_HISTORY_MATCH_TICKETS}개까지 가능합니다"}), 400
+    parsed = []
+    for ticket in tickets:
+        try:
+            numbers = [int(n) for n in ticket]
+        except (TypeError, ValueError):
+            return jsonify({"success": False, "error": f"잘못된 번호: {ticket}"}), 400
+        if len(numbers) != 6 or len(set(numbers)) != 6 or not all(1 <= n <= 45 for n in numbers):
+            return jsonify({"success": False, "error": f"번호는 1~45 사이 서로 다른 6개여야 합니다: {ticket}"}), 400
+        parsed.append(numbers)
+
+    index = get_history_index()
+    results = index.score_many(parsed)
+    # 최고 등수별 티켓 수 (0 = 당첨 이력 없음)
+    best_rank_counts = dict.fromkeys(range(6), 0)
+    for result in results:
+        best_rank_counts[result["best_rank"] or 0] += 1
+    return jsonify({
+        "success": True,
+        "draws": len(index),
+        "results": results,
+        "best_rank_counts": best_rank_counts,
+    })
+
+
+@main_bp.get("/api/purchase-report")
+@login_required
+def api_purchase_report():
+    """내 구매 번호 역대 회차 대입 리포트 (상태와 저장된 결과, entries는 limit개)"""
+    limit = min(request.args.get("limit", 50, type=int) or 50, 1000)
+    report = PurchaseReport.query.filter_by(user_id=current_user.id).first()
+    return jsonify({"success": True, **report_to_dict(report, limit)})
+
+
+@main_bp.post("/api/purchase-report")
+@login_required
+def api_request_purchase_report():
+    """리포트 계산 요청 (구매/추첨 데이터가 그대로면 저장된 결과 반환)"""
+    limit = min(request.args.get("limit", 50, type=int) or 50, 1000)
+    report = request_purchase_report(current_app._get_current_object(), current_user.id)
+    return jsonify({"success": True, **report_to_dict(report, limit)}), 200 if report.status == "completed" else 202
+
+
 # 구매 기록 관련 라우트
 @main_bp.post("/purchase")
 @login_required
@@ -1146,6 +1235,8 @@ def purchase_history():
 
         # 해당 페이지의 회차만 필터링
         grouped_purchases = {round_num: grouped_purchases[round_num] for round_num in page_rounds}
+        # 페이지 회차의 추첨 결과를 IN 쿼리 한 번으로 (회차마다 purchase.draw 조회 방지)
+        attach_draws(p for round_num in page_rounds for p in grouped_purchases[round_num])
 
         # 페이지네이션 객체 생성 (회차 단위)
         class GroupedPagination:
@@ -1166,6 +1257,7 @@ def purchase_history():
         purchases = query.order_by(Purchase.purchase_date.desc()).paginate(
             page=page, per_page=per_page, error_out=False
         )
+        attach_draws(purchases.items)
 
     # 통계는 조회된 사용자 기준으로 계산
     stats = get_purchase_statistics(current_user_id)
@@ -1444,16 +1536,16 @@ def api_data_detail(tab_type):
             return jsonify({"error": "데이터베이스에 데이터가 없습니다"}), 500
 
         if tab_type == "missing":
-            # 단일 쿼리로 누락 회차 계산 (최적화)
-            existing_rounds = set(row[0] for row in db.session.query(Draw.round).all())
-            all_rounds = set(range(min_round, max_round + 1))
-            missing_rounds = sorted(list(all_rounds - existing_rounds))
+            # 누락 회차를 구간으로 계산 (round 인덱스 한 번 조회)
+            ranges = missing_ranges(min_round, max_round)
+            total_missing = count_missing(ranges)
 
             return jsonify({
-                "rounds": missing_rounds[:100],  # 최대 100개만 반환
-                "total_missing": len(missing_rounds),
+                "rounds": expand_ranges(ranges, limit=100),  # 최대 100개만 반환
+                "ranges": [{"start": start, "end": end} for start, end in ranges[:100]],
+                "total_missing": total_missing,
                 "range": {"start": min_round, "end": max_round},
-                "has_more": len(missing_rounds) > 100,
+                "has_more": total_missing > 100,
                 "fast_mode": True
             })
 
@@ -1481,17 +1573,14 @@ def api_data_detail(tab_type):
             })
 
         elif tab_type == "summary":
-            # 빠른 요약 정보 (이미 계산된 값 재사용)
-            existing_rounds = set(row[0] for row in db.session.query(Draw.round).all())
-            all_rounds = set(range(min_round, max_round + 1))
-            missing_count = len(all_rounds - existing_rounds)
-            completion_rate = round((total_count / (max_round - min_round + 1)) * 100, 1)
+            # 빠른 요약 정보 (누락 구간에서 계산)
+            summary = completeness(min_round, max_round)
 
             return jsonify({
-                "total_existing": total_count,
-                "total_missing": missing_count,
-                "completion_rate": completion_rate,
-                "range": {"start": min_round, "end": max_round},
+                "total_existing": summary["total_existing"],
+                "total_missing": summary["total_missing"],
+                "completion_rate": summary["completion_rate"],
+                "range": summary["range"],
                 "fast_mode": True
             })
 
@@ -1505,52 +1594,44 @@ def api_data_detail(tab_type):
 
 @main_bp.get("/api/shop-statistics")
 def api_shop_statistics():
-    """당첨점 통계 분석 API"""
-    try:
-        # 기본 통계
-        total_shops = WinningShop.query.count()
-        rank1_shops = WinningShop.query.filter_by(rank=1).count()
-        rank2_shops = WinningShop.query.filter_by(rank=2).count()
+    """당첨점 통계 분석 API
 
-        # 지역별 통계 (주소에서 시/도 추출)
-        location_stats = db.session.query(
-            db.func.substr(WinningShop.address, 1, db.func.instr(WinningShop.address, ' ') - 1).label('region'),
-            db.func.count().label('count')
-        ).filter(
-            WinningShop.address.isnot(None),
-            WinningShop.address != ''
-        ).group_by('region').order_by(db.func.count().desc()).limit(10).all()
-
-        # 상위 당첨 판매점 (여러번 당첨된 곳)
-        top_shops = db.session.query(
-            WinningShop.name,
-            WinningShop.address,
-            db.func.count().label('win_count')
-        ).filter(
-            WinningShop.rank == 1,
-            WinningShop.name.isnot(None)
-        ).group_by(WinningShop.name, WinningShop.address).having(
-            db.func.count() > 1
-        ).order_by(db.func.count().desc()).limit(20).all()
+    사전 계산된 순위(shop_leaderboards)를 조회한다.
+    Query: window=all|52w, level=sido|sigungu (지역 단위), location_rank=all|1|2
+    """
+    try:
+        window = request.args.get('window', 'all')
+        level = request.args.get('level', 'sido')
+        location_rank = request.args.get('location_rank', 'all')
+        if window not in LEADERBOARD_WINDOWS or level not in ('sido', 'sigungu') \
+                or location_rank not in ('all', '1', '2'):
+            return jsonify({"error": "잘못된 window/level/location_rank 값입니다"}), 400
+
+        totals_key = leaderboard_key('totals', 0, window)
+        location_key = leaderboard_key(level, 0 if location_rank == 'all' else int(location_rank), window)
+        shops_key = leaderboard_key('shop', 1, window)
+        boards = get_leaderboards(totals_key, location_key, shops_key)
+
+        totals = boards[totals_key]
+        location_board = boards[location_key]
+        shops_board = boards[shops_key]
 
         return jsonify({
-            "total_stats": {
-                "total_shops": total_shops,
-                "rank1_shops": rank1_shops,
-                "rank2_shops": rank2_shops
+            "window": window,
+            "level": level,
+            "through_round": totals["through_round"] if totals else None,
+            "updated_at": totals["updated_at"] if totals else None,
+            "total_stats": totals["entries"] if totals else {
+                "total_shops": 0,
+                "rank1_shops": 0,
+                "rank2_shops": 0
             },
             "location_stats": [
-                {"region": region or "알 수 없음", "count": count}
-                for region, count in location_stats
+                {"region": entry["region"], "count": entry["count"]}
+                for entry in (location_board["entries"] if location_board else [])[:10]
             ],
-            "top_shops": [
-                {
-                    "name": shop.name,
-                    "address": shop.address,
-                    "win_count": shop.win_count
-                }
-                for shop in top_shops
-            ]
+            # 상위 1등 당첨 판매점 (여러번 당첨된 곳)
+            "top_shops": (shops_board["entries"] if shops_board else [])[:20]
         })
 
     except Exception as e:
@@ -1737,60 +1818,32 @@ def api_shop_search():
                 "error": "검색어는 2글자 이상 입력해주세요"
             }), 400
 
-        # 기본 쿼리 - 판매점명 또는 주소로 검색
-        query_filter = db.or_(
-            WinningShop.name.like(f'%{query}%'),
-            WinningShop.address.like(f'%{query}%')
+        try:
+            page = max(int(request.args.get('page', 1)), 1)
+            per_page = min(max(int(request.args.get('per_page', 100)), 1), 200)
+        except ValueError:
+            return jsonify({
+                "success": False,
+                "error": "page/per_page는 정수여야 합니다"
+            }), 400
+        sort = request.args.get('sort', 'relevance')  # 'relevance', 'recent'
+
+        # FTS5 trigram 인덱스 검색 (등수별 건수는 전체 일치 건수)
+        result = search_shops(
+            query,
+            rank=int(rank_filter) if rank_filter in ('1', '2') else None,
+            page=page,
+            per_page=per_page,
+            sort=sort
         )
 
-        # 등수 필터 적용
-        if rank_filter == '1':
-            shops = WinningShop.query.filter(
-                query_filter,
-                WinningShop.rank == 1
-            ).order_by(
-                WinningShop.round.desc()
-            ).limit(100).all()
-        elif rank_filter == '2':
-            shops = WinningShop.query.filter(
-                query_filter,
-                WinningShop.rank == 2
-            ).order_by(
-                WinningShop.round.desc()
-            ).limit(100).all()
-        else:  # 'all'
-            shops = WinningShop.query.filter(
-                query_filter
-            ).order_by(
-                WinningShop.round.desc(),
-                WinningShop.rank.asc()
-            ).limit(100).all()
-
-        # 검색 결과 변환
-        results = []
-        for shop in shops:
-            results.append({
-                "round": shop.round,
-                "rank": shop.rank,
-                "name": shop.name,
-                "address": shop.address,
-                "method": shop.method,
-                "winners_count": shop.winners_count
-            })
-
-        # 통계 정보
-        total_count = len(results)
-        rank1_count = sum(1 for s in results if s['rank'] == 1)
-        rank2_count = sum(1 for s in results if s['rank'] == 2)
-
         return jsonify({
             "success": True,
             "query": query,
             "rank_filter": rank_filter,
-            "total_count": total_count,
-            "rank1_count": rank1_count,
-            "rank2_count": rank2_count,
-            "results": results
+            "sort": sort,
+            "has_next": result["page"] < result["total_pages"],
+            **result
         })
 
     except Exception as e:
@@ -1801,13 +1854,62 @@ def api_shop_search():
         }), 500
 
 
+@main_bp.get("/api/shops/nearby")
+def api_shops_nearby():
+    """근처 당첨 판매점 API (행정구역 대표 좌표 기준)"""
+    try:
+        try:
+            lat = float(request.args['lat'])
+            lon = float(request.args['lon'])
+            radius = request.args.get('radius')
+            radius = float(radius) if radius not in (None, '') else None
+            limit = min(max(int(request.args.get('limit', 20)), 1), 100)
+        except (KeyError, ValueError):
+            return jsonify({
+                "success": False,
+                "error": "lat/lon은 숫자로 입력해주세요 (radius는 km, limit은 정수)"
+            }), 400
+
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            return jsonify({"success": False, "error": "좌표 범위가 올바르지 않습니다"}), 400
+        if radius is not None and not (0 < radius <= MAX_RADIUS_KM):
+            return jsonify({
+                "success": False,
+                "error": f"radius는 0보다 크고 {MAX_RADIUS_KM:g}km 이하여야 합니다"
+            }), 400
+
+        rank_filter = request.args.get('rank', 'all')  # 'all', '1', '2'
+        result = find_nearby_shops(
+            lat, lon,
+            radius_km=radius,
+            limit=limit,
+            rank=int(rank_filter) if rank_filter in ('1', '2') else None
+        )
+
+        return jsonify({
+            "success": True,
+            "lat": lat,
+            "lon": lon,
+            "limit": limit,
+            "rank_filter": rank_filter,
+            "count": len(result["results"]),
+            **result
+        })
+
+    except Exception as e:
+        current_app.logger.error(f"Error in api_shops_nearby: {str(e)}")
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+
 @main_bp.post("/api/refresh-recommendations")
 @login_required
 def refresh_recommendations_api():
     """AI 추천번호 새로 생성"""
     try:
-        all_draws = Draw.query.order_by(Draw.round.desc()).all()
-        auto_recs, recommendation_reasons = refresh_recommendations(all_draws, current_user.id)
+        auto_recs, recommendation_reasons = refresh_recommendations(None, current_user.id)
 
         return jsonify({
             "success": True,
@@ -2568,6 +2670,61 @@ def admin_reset_password(user_id):
         return jsonify({'success': False, 'message': '비밀번호 재설정 중 오류가 발생했습니다.'}), 500
 
 
+@main_bp.get("/api/admin/snapshots")
+@admin_required
+def admin_list_snapshots():
+    """draws/winning_shops 스냅샷 목록 (instance/snapshots)"""
+    return jsonify({"success": True, "snapshots": list_snapshots(current_app.instance_path)})
+
+
+@main_bp.post("/api/admin/snapshots")
+@admin_required
+def admin_export_snapshot():
+    """draws/winning_shops를 Arrow/Parquet 스냅샷으로 내보내기"""
+    payload = request.get_json(silent=True) or {}
+    formats = payload.get("formats") or list(SNAPSHOT_FORMATS)
+    if not isinstance(formats, list) or any(fmt not in SNAPSHOT_FORMATS for fmt in formats):
+        return jsonify({"success": False, "error": f"formats는 {list(SNAPSHOT_FORMATS)} 중에서 선택해야 합니다"}), 400
+
+    name = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+    try:
+        manifest = export_snapshot(snapshot_root(current_app.instance_path) / name, formats)
+    except SnapshotUnavailable as exc:
+        return jsonify({"success": False, "error": str(exc)}), 501
+    return jsonify({"success": True, "snapshot": {"name": name, **manifest}})
+
+
+@main_bp.get("/api/admin/snapshots/<name>/<filename>")
+@admin_required
+def admin_download_snapshot(name, filename):
+    """스냅샷 파일 다운로드"""
+    path = resolve_snapshot(current_app.instance_path, name)
+    if path is None:
+        abort(404)
+    return send_from_directory(path, filename, as_attachment=True, download_name=f"{name}-{filename}")
+
+
+@main_bp.post("/api/admin/snapshots/<name>/import")
+@admin_required
+def admin_import_snapshot(name):
+    """스냅샷을 DB에 반영 (없는 회차 추가, 비어 있는 당첨금 채우기, 새 당첨점 추가)"""
+    path = resolve_snapshot(current_app.instance_path, name)
+    if path is None:
+        return jsonify({"success": False, "error": "스냅샷을 찾을 수 없습니다"}), 404
+    data_type = (request.get_json(silent=True) or {}).get("data_type", "both")
+    if data_type not in ("both", "numbers", "shops"):
+        return jsonify({"success": False, "error": "data_type은 both, numbers, shops 중 하나여야 합니다"}), 400
+    # 수집 작업과 동시에 쓰지 않도록
+    if get_active_job() is not None:
+        return jsonify({"success": False, "error": "크롤링이 실행중입니다"}), 409
+
+    try:
+        result = import_snapshot(path, data_type)
+    except SnapshotUnavailable as exc:
+        return jsonify({"success": False, "error": str(exc)}), 501
+    return jsonify({"success": True, **result})
+
+
 # ==================== PASSWORD RESET ROUTES ====================
 
 @main_bp.route("/forgot-password", methods=["GET", "POST"])
@@ -2905,19 +3062,38 @@ def api_batch_upload_purchases():
 
         success_count = 0
         failed_count = 0
+        duplicate_count = 0
         errors = []
+        results = []  # 항목별 처리 결과 (클라이언트 업로드 대기열에서 사용)
 
-        # 로컬 수집기용 사용자 확인/생성
-        collector_user = User.query.filter_by(username='local_collector').first()
-        if not collector_user:
-            collector_user = User(
-                username='local_collector',
-                email='local_collector@system.local',
-                is_active=True
+        # 사용자 결정: 로그인된 사용자가 있으면 그 사용자, 없으면 local_collector 사용
+        if current_user.is_authenticated:
+            target_user = current_user
+        else:
+            target_user = User.query.filter_by(username='local_collector').first()
+            if not target_user:
+                target_user = User(
+                    username='local_collector',
+                    email='local_collector@system.local',
+                    is_active=True
+                )
+                target_user.set_password('system_collector_2024!')
+                db.session.add(target_user)
+                db.session.flush()
+
+        # 중복 검증용 기존 구매 번호를 한 번에 조회
+        batch_rounds = {
+            item.get('draw_number') for item in purchases_data
+            if isinstance(item, dict) and isinstance(item.get('draw_number'), int)
+        }
+        existing_keys = set()
+        if batch_rounds:
+            existing_keys = set(
+                db.session.query(Purchase.purchase_round, Purchase.numbers).filter(
+                    Purchase.user_id == target_user.id,
+                    Purchase.purchase_round.in_(batch_rounds)
+                ).all()
             )
-            collector_user.set_password('system_collector_2024!')
-            db.session.add(collector_user)
-            db.session.flush()
 
         for i, purchase_data in enumerate(purchases_data):
             try:
@@ -2926,6 +3102,7 @@ def api_batch_upload_purchases():
                 if validation_errors:
                     failed_count += 1
                     errors.append(f"항목 {i+1}: {'; '.join(validation_errors)}")
+                    results.append({"index": i, "status": "failed", "error": '; '.join(validation_errors)})
                     continue
 
                 # 구매 날짜 파싱
@@ -2935,14 +3112,23 @@ def api_batch_upload_purchases():
                 except ValueError:
                     failed_count += 1
                     errors.append(f"항목 {i+1}: 구매 날짜 형식이 잘못되었습니다")
+                    results.append({"index": i, "status": "failed", "error": "구매 날짜 형식이 잘못되었습니다"})
                     continue
 
                 # 번호를 문자열로 변환
                 numbers_str = ','.join(map(str, sorted(purchase_data['numbers'])))
 
+                # 중복 검증: 동일한 사용자, 회차, 번호 조합 (배치 내 중복 포함)
+                key = (purchase_data['draw_number'], numbers_str)
+                if key in existing_keys:
+                    duplicate_count += 1
+                    results.append({"index": i, "status": "duplicate"})
+                    continue
+                existing_keys.add(key)
+
                 # Purchase 객체 생성
                 purchase = Purchase(
-                    user_id=collector_user.id,
+                    user_id=target_user.id,
                     purchase_round=purchase_data['draw_number'],
                     numbers=numbers_str,
                     purchase_date=purchase_date,
@@ -2953,10 +3139,12 @@ def api_batch_upload_purchases():
 
                 db.session.add(purchase)
                 success_count += 1
+                results.append({"index": i, "status": "created"})
 
             except Exception as e:
                 failed_count += 1
                 errors.append(f"항목 {i+1}: {str(e)}")
+                results.append({"index": i, "status": "failed", "error": str(e)})
 
         # 모든 성공한 항목들을 커밋
         if success_count > 0:
@@ -2964,17 +3152,19 @@ def api_batch_upload_purchases():
 
         response_data = {
             "count": success_count,
-            "failed_count": failed_count
+            "failed_count": failed_count,
+            "duplicate_count": duplicate_count,
+            "results": results
         }
 
         # 에러가 있으면 에러 정보도 포함
         if errors:
             response_data["errors"] = errors
 
-        # 부분 성공인 경우 206, 완전 성공인 경우 200, 완전 실패인 경우 400
-        if failed_count > 0 and success_count > 0:
+        # 부분 성공인 경우 206, 완전 성공(중복 포함)인 경우 200, 완전 실패인 경우 400
+        if failed_count > 0 and (success_count > 0 or duplicate_count > 0):
             return jsonify(response_data), 206  # Partial Content
-        elif success_count > 0:
+        elif success_count > 0 or duplicate_count > 0:
             return jsonify(response_data), 200
         else:
             return jsonify(response_data), 400
@@ -3227,11 +3417,12 @@ def api_sync_purchases():
 
         # 정렬 및 페이징
         total_count = query.count()
-        purchases = query.order_by(Purchase.purchase_date.desc()).offset(offset).limit(limit).all()
+        purchases = attach_draws(query.order_by(Purchase.purchase_date.desc()).offset(offset).limit(limit))
 
         # 응답 데이터 구성
         purchase_list = []
         for purchase in purchases:
+            draw = purchase.draw
             purchase_list.append({
                 "id": purchase.id,
                 "numbers": purchase.numbers_list(),
@@ -3243,6 +3434,8 @@ def api_sync_purchases():
                 "result_checked": purchase.result_checked,
                 "winning_rank": purchase.winning_rank,
                 "matched_count": purchase.matched_count,
+                "winning_numbers": draw.numbers_list() if draw else None,
+                "bonus_number": draw.bonus if draw else None,
                 "created_at": purchase.purchase_date.isoformat() + "Z"
             })
 
@@ -2,25 +2,20 @@
 Lottery number frequency and pattern analysis service.
 """
 from collections import Counter, defaultdict
-from typing import List, Dict, Tuple
-from ..models import Draw
+from typing import List, Dict, Optional, Tuple
 
+import numpy as np
 
-def get_number_frequency(limit: int = None) -> Dict[int, int]:
-    """Get frequency of each number across all draws."""
-    query = Draw.query.order_by(Draw.round.desc())
-    if limit:
-        query = query.limit(limit)
-
-    draws = query.all()
-    frequency = Counter()
+from ..models import Draw
+from .feature_store import get_feature_store
+from .window_stats import COLD_RATIO, HOT_RATIO, get_prefix_sums, recent_stats
 
-    for draw in draws:
-        numbers = draw.numbers_list()
-        for num in numbers:
-            frequency[num] += 1
 
-    return dict(frequency)
+def get_number_frequency(limit: int = None) -> Dict[int, int]:
+    """Get frequency of each number across all draws (or the latest `limit` draws)."""
+    prefix = get_prefix_sums()
+    frequency = prefix.frequency(*prefix.last(limit))
+    return {n + 1: int(count) for n, count in enumerate(frequency) if count}
 
 
 def get_most_frequent_numbers(count: int = 10, limit: int = None) -> List[Tuple[int, int]]:
@@ -56,49 +51,13 @@ def get_number_combinations(count: int = 10, limit: int = None) -> List[Tuple[Tu
 
 
 def analyze_patterns(limit: int = None) -> Dict:
-    """Analyze various patterns in lottery draws."""
-    query = Draw.query.order_by(Draw.round.desc())
-    if limit:
-        query = query.limit(limit)
-
-    draws = query.all()
-
-    # Pattern analysis
-    odd_even_patterns = Counter()
-    sum_ranges = Counter()
-    consecutive_counts = Counter()
-
-    for draw in draws:
-        numbers = sorted(draw.numbers_list())
-
-        # Odd/Even pattern
-        odd_count = sum(1 for n in numbers if n % 2 == 1)
-        even_count = 6 - odd_count
-        odd_even_patterns[f"{odd_count}홀/{even_count}짝"] += 1
-
-        # Sum range analysis
-        total_sum = sum(numbers)
-        if total_sum <= 120:
-            sum_ranges["낮음(~120)"] += 1
-        elif total_sum <= 150:
-            sum_ranges["중간(121~150)"] += 1
-        elif total_sum <= 180:
-            sum_ranges["높음(151~180)"] += 1
-        else:
-            sum_ranges["매우높음(181~)"] += 1
-
-        # Consecutive numbers count
-        consecutive = 0
-        for i in range(len(numbers) - 1):
-            if numbers[i + 1] - numbers[i] == 1:
-                consecutive += 1
-        consecutive_counts[consecutive] += 1
-
+    """Analyze various patterns in lottery draws (from the prefix sums, no per-draw loop)."""
+    stats = recent_stats(limit)
     return {
-        "odd_even_patterns": dict(odd_even_patterns.most_common()),
-        "sum_ranges": dict(sum_ranges.most_common()),
-        "consecutive_counts": dict(consecutive_counts.most_common()),
-        "total_analyzed": len(draws)
+        "odd_even_patterns": stats["odd_even_patterns"],
+        "sum_ranges": stats["sum_ranges"],
+        "consecutive_counts": stats["consecutive_counts"],
+        "total_analyzed": stats["draws"]
     }
 
 
@@ -162,12 +121,18 @@ def get_recommendation_reasons(recommended_numbers: List[int], limit: int = 50)
     return reasons[:5]  # Return top 5 reasons
 
 
-def get_hot_cold_analysis(limit: int = 50) -> Dict:
-    """Get hot and cold number analysis for recent draws."""
-    frequency = get_number_frequency(limit)
+def get_hot_cold_analysis(limit: Optional[int] = 50, from_round: Optional[int] = None,
+                          to_round: Optional[int] = None) -> Dict:
+    """Get hot and cold number analysis for the latest `limit` draws or a round window."""
+    prefix = get_prefix_sums()
+    if from_round is not None or to_round is not None:
+        start, end = prefix.positions(from_round, to_round)
+    else:
+        start, end = prefix.last(limit)
+    frequency = prefix.frequency(start, end)
 
     # Calculate average frequency
-    total_frequency = sum(frequency.values())
+    total_frequency = int(frequency.sum())
     avg_frequency = total_frequency / 45 if total_frequency > 0 else 0
 
     hot_numbers = []
@@ -175,10 +140,10 @@ def get_hot_cold_analysis(limit: int = 50) -> Dict:
     normal_numbers = []
 
     for num in range(1, 46):
-        freq = frequency.get(num, 0)
-        if freq > avg_frequency * 1.2:
+        freq = int(frequency[num - 1])
+        if freq > avg_frequency * HOT_RATIO:
             hot_numbers.append((num, freq))
-        elif freq < avg_frequency * 0.8:
+        elif freq < avg_frequency * COLD_RATIO:
             cold_numbers.append((num, freq))
         else:
             normal_numbers.append((num, freq))
@@ -188,5 +153,34 @@ def get_hot_cold_analysis(limit: int = 50) -> Dict:
         "cold_numbers": sorted(cold_numbers, key=lambda x: x[1]),
         "normal_numbers": sorted(normal_numbers, key=lambda x: x[1], reverse=True),
         "avg_frequency": avg_frequency,
-        "analyzed_draws": limit
+        "analyzed_draws": end - start
+    }
+
+
+def get_combination_stats(samples: int = 0, **conditions) -> Optional[Dict]:
+    """Count the C(45, 6) combinations matching FeatureStore.mask conditions.
+
+    Uses the memory-mapped feature store; returns None when it has not been built.
+    """
+    store = get_feature_store()
+    if store is None:
+        return None
+
+    keep = store.mask(**conditions)
+    matching = int(np.count_nonzero(keep))
+    best_ranks = np.bincount(store.best_rank[keep], minlength=6)
+    result = {
+        "matching": matching,
+        "total": len(store),
+        "share": matching / len(store),
+        "best_rank_counts": {rank: int(best_ranks[rank]) for rank in range(6)},
+        "store": store.summary(),
     }
+    if samples and matching:
+        indices = np.flatnonzero(keep)
+        picks = np.sort(np.random.default_rng().choice(indices, size=min(samples, matching), replace=False))
+        result["samples"] = [
+            {"numbers": [n + 1 for n in range(45) if int(store.masks[i]) >> n & 1], **features}
+            for i, features in zip(picks, store.features(picks))
+        ]
+    return result
@@ -0,0 +1,417 @@
+"""
+asyncio 기반 추첨 결과/당첨점 수집기
+
+한 이벤트 루프에서 여러 회차/페이지 요청을 동시에 진행한다. 동시 요청 수는
+세마포어로, 요청 속도는 토큰 버킷으로 제한하며 연결은 keep-alive로 재사용한다.
+HTTP 클라이언트는 설치된 것을 사용한다 (httpx > aiohttp > requests 세션을
+스레드에서 실행). 응답은 lotto_fetcher와 같은 디스크 캐시(http_cache)를 거치고,
+파싱도 lotto_fetcher와 같은 함수를 쓰므로 결과 형식이 동기 버전과 같다.
+
+    async with AsyncLottoFetcher(concurrency=16, rate=2.0) as fetcher:
+        results = await fetcher.fetch_rounds(range(1, 101))
+
+동기 코드(CLI 스크립트, 백그라운드 작업)에서는 run_fetch_rounds()를 쓴다.
+"""
+import asyncio
+import json
+import random
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from . import http_cache
+from .lotto_fetcher import (
+    CONNECT_TIMEOUT, DEFAULT_HEADERS, MAX_SHOP_PAGES, NUMBERS_URL, READ_TIMEOUT, REQUEST_DELAY,
+    _shop_page_url, draw_response_ttl, notify_wait, parse_draw_data, shop_page_result, shop_page_ttl, shop_row_key,
+)
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+DEFAULT_CONCURRENCY = 16
+# 기본 속도는 동기 수집기의 요청 간격과 같음
+DEFAULT_RATE = 1 / REQUEST_DELAY
+
+# 비동기 클라이언트는 brotli/zstd 디코더가 없을 수 있으므로 gzip/deflate만 요청
+_HEADERS = {**DEFAULT_HEADERS, "Accept-Encoding": "gzip, deflate"}
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """재시도 정책: 지수 백오프 + 지터, 429/503의 Retry-After 존중"""
+    attempts: int = 5
+    backoff: float = 2.0
+    max_backoff: float = 60.0
+    retry_statuses: FrozenSet[int] = field(default_factory=lambda: frozenset({429, 500, 502, 503, 504, 522, 524}))
+
+    def delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after:
+            try:
+                return min(float(retry_after), self.max_backoff)
+            except ValueError:
+                pass
+        return min(self.backoff * (2 ** attempt), self.max_backoff) * random.uniform(0.5, 1.0)
+
+
+class FetchError(Exception):
+    """재시도 후에도 실패한 요청 (시도별 오류 기록 포함)"""
+
+    def __init__(self, url: str, errors: List[str]):
+        super().__init__(f"{url}: {len(errors)}회 시도 실패 ({errors[-1] if errors else 'unknown'})")
+        self.url = url
+        self.errors = errors
+
+
+class AsyncTokenBucket:
+    """초당 rate개 토큰, 최대 capacity개까지 모아 두는 토큰 버킷"""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self._tokens = self.capacity
+        self._updated: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        # 잠금을 쥔 채 기다리므로 대기 순서대로 토큰을 받는다
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            while True:
+                now = loop.time()
+                if self._updated is not None:
+                    self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+                notify_wait("rate_limit", wait)
+                await asyncio.sleep(wait)
+
+
+class FetchedResponse:
+    """비동기 클라이언트 응답을 requests.Response처럼 다루기 위한 래퍼"""
+
+    def __init__(self, url: str, status_code: int, headers, content: bytes, encoding: Optional[str]):
+        self.url = url
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers)
+        self.content = content
+        self.encoding = encoding
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding or "utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} for url: {self.url}")
+
+
+class _HttpxTransport:
+    name = "httpx"
+    errors = (httpx.TransportError,) if httpx else ()
+
+    def __init__(self, concurrency: int):
+        self._client = httpx.AsyncClient(
+            headers=_HEADERS,
+            timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+            follow_redirects=True,
+        )
+
+    async def get(self, url: str, headers: Dict[str, str]) -> FetchedResponse:
+        resp = await self._client.get(url, headers=headers)
+        return FetchedResponse(url, resp.status_code, resp.headers, resp.content, resp.encoding)
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+class _AiohttpTransport:
+    name = "aiohttp"
+    errors = (aiohttp.ClientError,) if aiohttp else ()
+
+    def __init__(self, concurrency: int):
+        self._session = aiohttp.ClientSession(
+            headers=_HEADERS,
+            connector=aiohttp.TCPConnector(limit=concurrency, keepalive_timeout=30),
+            timeout=aiohttp.ClientTimeout(connect=CONNECT_TIMEOUT, sock_read=READ_TIMEOUT),
+        )
+
+    async def get(self, url: str, headers: Dict[str, str]) -> FetchedResponse:
+        async with self._session.get(url, headers=headers) as resp:
+            content = await resp.read()
+            return FetchedResponse(url, resp.status, resp.headers, content, resp.charset)
+
+    async def close(self) -> None:
+        await self._session.close()
+
+
+class _ThreadTransport:
+    """비동기 HTTP 클라이언트가 없을 때: keep-alive requests 세션을 스레드에서 실행"""
+    name = "thread"
+    errors = (requests.exceptions.RequestException,)
+
+    def __init__(self, concurrency: int):
+        self._session = requests.Session()
+        self._session.headers.update(DEFAULT_HEADERS)
+        adapter = requests.adapters.HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        # 기본 실행기는 CPU 수에 맞춰져 있으므로 동시 요청 수만큼 스레드를 따로 둠
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="async-fetch")
+
+    async def get(self, url: str, headers: Dict[str, str]):
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor,
+            partial(self._session.get, url, headers=headers, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT))
+        )
+
+    async def close(self) -> None:
+        self._executor.shutdown(wait=False)
+        self._session.close()
+
+
+TRANSPORTS = {}
+if httpx is not None:
+    TRANSPORTS["httpx"] = _HttpxTransport
+if aiohttp is not None:
+    TRANSPORTS["aiohttp"] = _AiohttpTransport
+TRANSPORTS["thread"] = _ThreadTransport
+
+
+class AsyncLottoFetcher:
+    """동시성/속도가 제한된 비동기 수집기 (async with로 사용)"""
+
+    def __init__(self, concurrency: int = DEFAULT_CONCURRENCY, rate: float = DEFAULT_RATE,
+                 burst: float = 1.0, retry: Optional[RetryPolicy] = None, transport: Optional[str] = None):
+        self.concurrency = concurrency
+        self.retry = retry or RetryPolicy()
+        self.transport_name = transport or next(iter(TRANSPORTS))
+        if self.transport_name not in TRANSPORTS:
+            raise ValueError(f"Unknown or unavailable transport: {self.transport_name}")
+        self._rate = rate
+        self._burst = burst
+        self._transport = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._bucket: Optional[AsyncTokenBucket] = None
+        self.stats = {"requests": 0, "cache_hits": 0, "retries": 0, "failures": 0}
+
+    async def __aenter__(self) -> "AsyncLottoFetcher":
+        self._transport = TRANSPORTS[self.transport_name](self.concurrency)
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._bucket = AsyncTokenBucket(self._rate, self._burst)
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self._transport.close()
+
+    async def _request(self, url: str, headers: Dict[str, str]):
+        errors: List[str] = []
+        for attempt in range(self.retry.attempts):
+            retry_after = None
+            async with self._semaphore:
+                await self._bucket.acquire()
+                self.stats["requests"] += 1
+                try:
+                    resp = await self._transport.get(url, headers)
+                except (asyncio.TimeoutError, OSError, *self._transport.errors) as exc:
+                    errors.append(f"{type(exc).__name__}: {exc}")
+                else:
+                    if resp.status_code not in self.retry.retry_statuses:
+                        if resp.status_code != 304:
+                            resp.raise_for_status()
+                        return resp
+                    errors.append(f"HTTP {resp.status_code}")
+                    retry_after = resp.headers.get("Retry-After")
+
+            if attempt < self.retry.attempts - 1:
+                self.stats["retries"] += 1
+                # 대기 중에는 세마포어를 놓아 다른 요청이 진행되도록 함
+                wait = self.retry.delay(attempt, retry_after)
+                notify_wait("retry", wait, attempt=attempt + 1, error=errors[-1], url=url)
+                await asyncio.sleep(wait)
+
+        self.stats["failures"] += 1
+        raise FetchError(url, errors)
+
+    async def get(self, url: str, headers: Optional[Dict[str, str]] = None, ttl_for=None,
+                  refresh: bool = False):
+        """캐시를 거치는 GET (ttl_for, refresh는 http_cache.cached_get과 같음)"""
+        cached = http_cache.lookup(url, refresh)
+        if cached is not None:
+            self.stats["cache_hits"] += 1
+            return cached
+        resp = await self._request(url, headers or {})
+        http_cache.save(url, resp, ttl_for or (lambda _: http_cache.DEFAULT_TTL))
+        return resp
+
+    async def fetch_draw(self, round_no: int) -> Dict:
+        """lotto_fetcher.fetch_draw의 비동기 버전"""
+        resp = await self.get(NUMBERS_URL.format(round=round_no), ttl_for=draw_response_ttl)
+        return parse_draw_data(round_no, resp.json())
+
+    async def draw_exists(self, round_no: int) -> bool:
+        try:
+            resp = await self.get(NUMBERS_URL.format(round=round_no), ttl_for=draw_response_ttl)
+            return resp.json().get("returnValue") == "success"
+        except Exception:
+            return False
+
+    async def get_latest_round(self) -> Optional[int]:
+        """lotto_fetcher 기반 get_latest_round와 같은 지수/이진 탐색"""
+        if not await self.draw_exists(1):
+            return None
+        lo, hi = 1, 2
+        while await self.draw_exists(hi):
+            lo, hi = hi, hi * 2
+        while lo + 1 < hi:
+            mid = (lo + hi) // 2
+            if await self.draw_exists(mid):
+                lo = mid
+            else:
+                hi = mid
+        return lo
+
+    async def fetch_shop_page(self, round_no: int, page: int, etag: Optional[str] = None,
+                              last_modified: Optional[str] = None, refresh: bool = False) -> Dict:
+        """lotto_fetcher.fetch_shop_page의 비동기 버전 (조건부 요청이면 캐시를 건너뜀)"""
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        resp = await self.get(_shop_page_url(round_no, page), headers, ttl_for=lambda _: shop_page_ttl(round_no),
+                              refresh=refresh or bool(etag or last_modified))
+        return shop_page_result(resp, round_no, page, etag, last_modified)
+
+    async def fetch_round_shop_pages(self, round_no: int) -> Dict:
+        """
+        회차 당첨점 페이지별 결과 (페이지 수를 알면 나머지 페이지 동시 요청)
+
+        Returns:
+            {'pages': {페이지: fetch_shop_page 결과 또는 예외}, 'page_count': 확인된 페이지 수 또는 None}
+            당첨점이 아직 없으면 pages가 비어 있다. 1페이지 요청이 실패하면 예외를 그대로 올린다.
+        """
+        first = await self.fetch_shop_page(round_no, 1)
+        if not first["rows"]:
+            return {"pages": {}, "page_count": None}
+        pages: Dict[int, object] = {1: first}
+
+        if first["page_count"]:
+            numbers = range(2, first["page_count"] + 1)
+            results = await asyncio.gather(*(self.fetch_shop_page(round_no, page) for page in numbers),
+                                           return_exceptions=True)
+            pages.update(zip(numbers, results))
+            return {"pages": pages, "page_count": first["page_count"]}
+
+        # 페이지 수를 모르면 새 행이 없는 페이지(마지막 페이지 반복)가 나올 때까지 순서대로
+        seen = {shop_row_key(row) for row in first["rows"]}
+        page_count = None
+        for page in range(2, MAX_SHOP_PAGES + 1):
+            try:
+                result = await self.fetch_shop_page(round_no, page)
+            except Exception as exc:
+                pages[page] = exc
+                break
+            keys = {shop_row_key(row) for row in result["rows"]}
+            if keys <= seen:
+                page_count = page - 1
+                break
+            seen |= keys
+            pages[page] = result
+        else:
+            page_count = MAX_SHOP_PAGES
+        return {"pages": pages, "page_count": page_count}
+
+    @staticmethod
+    def shop_rows(shop_pages: Dict) -> List[Dict]:
+        """fetch_round_shop_pages 결과에서 받은 페이지의 행 (중복 제거, 페이지 순)"""
+        rows: List[Dict] = []
+        seen = set()
+        for page in sorted(shop_pages["pages"]):
+            result = shop_pages["pages"][page]
+            if isinstance(result, Exception):
+                continue
+            for shop_data in result["rows"]:
+                key = shop_row_key(shop_data)
+                if key not in seen:
+                    seen.add(key)
+                    rows.append(shop_data)
+        return rows
+
+    async def fetch_winning_shops(self, round_no: int) -> List[Dict]:
+        """lotto_fetcher.fetch_winning_shops의 비동기 버전 (실패한 페이지의 행은 빠진다)"""
+        return self.shop_rows(await self.fetch_round_shop_pages(round_no))
+
+    async def fetch_round(self, round_no: int, draws: bool = True, shops: bool = True) -> Dict:
+        """
+        {'round', 'draw': 결과 또는 예외, 'shops': 행 목록 또는 예외,
+         'shop_pages': fetch_round_shop_pages 결과 또는 예외} (요청하지 않은 항목은 None)
+
+        shops에는 받은 페이지의 행만 들어 있으므로, 실패한 페이지는 shop_pages에서 확인한다.
+        """
+        async def _safe(coro):
+            try:
+                return await coro
+            except Exception as exc:
+                return exc
+
+        draw, shop_pages = await asyncio.gather(
+            _safe(self.fetch_draw(round_no)) if draws else asyncio.sleep(0),
+            _safe(self.fetch_round_shop_pages(round_no)) if shops else asyncio.sleep(0),
+        )
+        shop_rows = shop_pages
+        if shop_pages is not None and not isinstance(shop_pages, Exception):
+            shop_rows = self.shop_rows(shop_pages)
+        return {"round": round_no, "draw": draw, "shops": shop_rows, "shop_pages": shop_pages}
+
+    async def fetch_rounds(self, rounds: Iterable[int], draws: bool = True, shops: bool = True,
+                           on_round: Optional[Callable[[int], None]] = None) -> Dict[int, Dict]:
+        """
+        여러 회차 동시 수집 ({round: fetch_round 결과}). 동시 요청 수는 concurrency로 제한
+
+        on_round(회차)는 회차 수집이 끝날 때마다 이벤트 루프에서 호출된다 (작업 heartbeat 등).
+        예외를 올리면 수집을 중단한다.
+        """
+        async def _one(round_no: int) -> Dict:
+            result = await self.fetch_round(round_no, draws, shops)
+            if on_round is not None:
+                on_round(round_no)
+            return result
+
+        results = await asyncio.gather(*(_one(r) for r in rounds))
+        return {result["round"]: result for result in results}
+
+
+def run_fetch_rounds(rounds: Iterable[int], draws: bool = True, shops: bool = True,
+                     concurrency: int = DEFAULT_CONCURRENCY, rate: float = DEFAULT_RATE,
+                     transport: Optional[str] = None, on_round: Optional[Callable[[int], None]] = None) -> Dict:
+    """동기 코드용: 회차들을 비동기로 수집 (on_round는 fetch_rounds와 같음)
+
+    Returns:
+        {'results': {round: fetch_round 결과}, 'stats': 요청/캐시/재시도 통계, 'transport'}
+    """
+    async def _run():
+        async with AsyncLottoFetcher(concurrency=concurrency, rate=rate, transport=transport) as fetcher:
+            results = await fetcher.fetch_rounds(rounds, draws, shops, on_round)
+            return {"results": results, "stats": dict(fetcher.stats), "transport": fetcher.transport_name}
+
+    return asyncio.run(_run())
@@ -0,0 +1,255 @@
+"""
+Historical backtesting for recommendation strategies.
+
+Replays the draw history round by round: for round r every strategy only sees
+the draws before r, generates tickets, and is scored against round r with the
+vectorized checker. Rounds are split across worker processes.
+"""
+import multiprocessing
+import os
+import secrets
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+from ..extensions import db
+from ..models import Draw
+from .combinations import DEFAULT_CONSTRAINTS, get_combination_index, tickets_to_masks
+from .lottery_checker import ESTIMATED_PRIZES, rank_tickets
+from .sampler import NUMBER_COUNT, ProductWeightedSampler, WeightedTicketSampler, frequency_weights
+
+TICKET_PRICE = 1000
+
+# random: 균등 무작위 / auto: auto_recommend / semi_auto: semi_auto_recommend / enhanced: enhanced_auto_recommend
+STRATEGIES = ('random', 'auto', 'semi_auto', 'enhanced')
+
+# semi_auto has no user input in a replay, so it fixes the most frequent numbers so far
+SEMI_AUTO_FIXED = 2
+
+# Rounds per task handed to a worker process
+_TASKS_PER_WORKER = 4
+
+# Draw.<rank>_prize_amount columns, rank 1..5
+_PRIZE_RANKS = ('first', 'second', 'third', 'fourth', 'fifth')
+
+_UNIFORM_SAMPLER = WeightedTicketSampler(np.ones(NUMBER_COUNT))
+
+# Proposal batch size relative to the tickets still missing (about half of all
+# combinations satisfy DEFAULT_CONSTRAINTS)
+_ENHANCED_OVERSAMPLE = 3
+
+# Set in each worker by _init_worker
+_history: Optional[Dict[str, np.ndarray]] = None
+# Combinations allowed by DEFAULT_CONSTRAINTS, by lexicographic index (built once per process)
+_enhanced_allowed: Optional[np.ndarray] = None
+
+
+def load_history(snapshot=None) -> Dict[str, np.ndarray]:
+    """Draw history as arrays, ordered by round.
+
+    prizes[i, rank] is the actual per-ticket prize of that round, or the
+    estimate from ESTIMATED_PRIZES when the amount was not collected.
+    cumulative[i] holds the number counts of all draws before position i.
+
+    With `snapshot` (a directory written by snapshots.export_snapshot) the
+    draws come from its Arrow file, memory-mapped, instead of the database.
+    """
+    if snapshot is not None:
+        from .snapshots import load_draw_arrays
+
+        arrays = load_draw_arrays(snapshot)
+        rounds, numbers, bonus = arrays['rounds'], arrays['numbers'], arrays['bonus']
+        amounts = np.column_stack([arrays['prizes'][f'{rank}_prize_amount'] for rank in _PRIZE_RANKS])
+    else:
+        rows = db.session.query(
+            Draw.round, Draw.numbers, Draw.bonus,
+            *(getattr(Draw, f'{rank}_prize_amount') for rank in _PRIZE_RANKS)
+        ).order_by(Draw.round).all()
+
+        rounds = np.array([row.round for row in rows], dtype=np.int32)
+        numbers = np.array([[int(x) for x in row.numbers.split(",") if x] for row in rows],
+                           dtype=np.int8).reshape(-1, 6)
+        bonus = np.array([row.bonus for row in rows], dtype=np.int8)
+        amounts = np.array([[-1 if amount is None else amount for amount in row[3:8]] for row in rows],
+                           dtype=np.int64).reshape(-1, 5)
+
+    prizes = np.zeros((len(rounds), 6), dtype=np.int64)
+    estimated = np.array([ESTIMATED_PRIZES[rank] for rank in range(1, 6)], dtype=np.int64)
+    prizes[:, 1:] = np.where(amounts < 0, estimated, amounts)
+
+    hits = np.zeros((len(rounds), NUMBER_COUNT), dtype=np.int32)
+    np.put_along_axis(hits, numbers.astype(np.int64) - 1, 1, axis=1)
+    cumulative = np.vstack([np.zeros((1, NUMBER_COUNT), dtype=np.int32), np.cumsum(hits, axis=0)])
+
+    return {
+        'rounds': rounds,
+        'numbers': numbers,
+        'bonus': bonus,
+        'prizes': prizes,
+        'cumulative': cumulative,
+    }
+
+
+def _strategy_masks(strategy: str, counts: np.ndarray, count: int, rng: np.random.Generator) -> np.ndarray:
+    """`count` tickets (uint64 masks) from one strategy given prior number counts."""
+    if strategy == 'random':
+        return tickets_to_masks(_UNIFORM_SAMPLER.sample(count, rng=rng))
+    if strategy == 'auto':
+        sampler = WeightedTicketSampler(frequency_weights(counts))
+        return tickets_to_masks(sampler.sample(count, rng=rng))
+    if strategy == 'semi_auto':
+        fixed = np.argsort(-counts, kind='stable')[:SEMI_AUTO_FIXED] + 1
+        return tickets_to_masks(_UNIFORM_SAMPLER.sample(count, fixed=fixed.tolist(), rng=rng))
+    if strategy == 'enhanced':
+        return _enhanced_masks(counts, count, rng)
+    raise ValueError(f"unknown strategy: {strategy}")
+
+
+def _get_enhanced_allowed() -> np.ndarray:
+    global _enhanced_allowed
+    if _enhanced_allowed is None:
+        index = get_combination_index()
+        allowed = np.zeros(len(index), dtype=bool)
+        allowed[index.filter(**DEFAULT_CONSTRAINTS)] = True
+        _enhanced_allowed = allowed
+    return _enhanced_allowed
+
+
+def _enhanced_masks(counts: np.ndarray, count: int, rng: np.random.Generator) -> np.ndarray:
+    """enhanced_auto_recommend's distribution without a per-round CDF.
+
+    CombinationIndex.sample would build (and cache) a cumulative weight array
+    over every constrained combination for each round's weights. Here tickets
+    are drawn from the same product-of-weights distribution with
+    ProductWeightedSampler and the ones outside DEFAULT_CONSTRAINTS are
+    rejected; the first `count` distinct survivors are kept.
+    """
+    from .feature_store import combination_ranks
+
+    allowed = _get_enhanced_allowed()
+    sampler = ProductWeightedSampler(frequency_weights(counts))
+    picked = np.empty(0, dtype=np.int64)
+    while len(picked) < count:
+        ranks = combination_ranks(sampler.sample((count - len(picked)) * _ENHANCED_OVERSAMPLE, rng=rng))
+        candidates = np.concatenate([picked, ranks[allowed[ranks]]])
+        _, first = np.unique(candidates, return_index=True)
+        picked = candidates[np.sort(first)][:count]
+    return get_combination_index().masks[picked]
+
+
+def _init_worker(history: Dict[str, np.ndarray]):
+    global _history
+    _history = history
+
+
+def _run_rounds(task) -> Dict[str, Dict]:
+    """Score every strategy on the given history positions (runs in a worker)."""
+    positions, strategies, tickets_per_round, window, seed = task
+    history = _history
+    cumulative = history['cumulative']
+
+    totals = {name: {'tiers': np.zeros(6, dtype=np.int64), 'prize': 0} for name in strategies}
+    for pos in positions:
+        counts = cumulative[pos]
+        if window and pos > window:
+            counts = counts - cumulative[pos - window]
+
+        winning = history['numbers'][pos].tolist()
+        bonus = int(history['bonus'][pos])
+        prizes = history['prizes'][pos]
+        for strategy_no, name in enumerate(strategies):
+            # Seeded per (round, strategy) so results do not depend on how rounds are split
+            rng = np.random.default_rng([seed, int(history['rounds'][pos]), strategy_no])
+            masks = _strategy_masks(name, counts, tickets_per_round, rng)
+            tiers = np.bincount(rank_tickets(masks, winning, bonus), minlength=6)
+            totals[name]['tiers'] += tiers
+            totals[name]['prize'] += int(tiers[1:] @ prizes[1:])
+    return totals
+
+
+def run_backtest(strategies: Iterable[str] = STRATEGIES, tickets_per_round: int = 1000,
+                 start_round: Optional[int] = None, end_round: Optional[int] = None,
+                 window: Optional[int] = None, min_history: int = 10,
+                 workers: Optional[int] = None, seed: Optional[int] = None,
+                 snapshot=None) -> Dict:
+    """
+    Replay history and compare strategies.
+
+    Args:
+        tickets_per_round: tickets generated per strategy per round
+        window: only the latest `window` prior draws feed the frequency weights (None = all)
+        min_history: skip rounds with fewer prior draws than this
+        workers: worker processes (None = CPU count, 1 = run in this process)
+        seed: makes the run reproducible; a random seed is chosen and returned when None
+        snapshot: read the draw history from this snapshot directory instead of the database
+
+    Returns:
+        {'rounds', 'first_round', 'last_round', 'tickets_per_round', 'seed',
+         'strategies': {name: {'tickets', 'tiers', 'hit_rate', 'total_prize', 'cost',
+                               'expected_return', 'roi'}}}
+    """
+    strategies = list(strategies)
+    for name in strategies:
+        if name not in STRATEGIES:
+            raise ValueError(f"unknown strategy: {name}")
+    if seed is None:
+        seed = secrets.randbits(32)
+
+    history = load_history(snapshot)
+    rounds = history['rounds']
+    eligible = np.arange(len(rounds)) >= min_history
+    if start_round is not None:
+        eligible &= rounds >= start_round
+    if end_round is not None:
+        eligible &= rounds <= end_round
+    positions = np.flatnonzero(eligible)
+
+    totals = {name: {'tiers': np.zeros(6, dtype=np.int64), 'prize': 0} for name in strategies}
+    if len(positions):
+        workers = workers or os.cpu_count() or 1
+        chunks = [chunk for chunk in np.array_split(positions, workers * _TASKS_PER_WORKER) if len(chunk)]
+        tasks = [(chunk, strategies, tickets_per_round, window, seed) for chunk in chunks]
+
+        if workers <= 1 or len(chunks) <= 1:
+            _init_worker(history)
+            results = [_run_rounds(task) for task in tasks]
+        else:
+            context = None
+            if 'fork' in multiprocessing.get_all_start_methods():
+                context = multiprocessing.get_context('fork')
+                if 'enhanced' in strategies:
+                    # Build once so forked workers share the index copy-on-write
+                    _get_enhanced_allowed()
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                     initializer=_init_worker, initargs=(history,)) as executor:
+                results = list(executor.map(_run_rounds, tasks))
+
+        for result in results:
+            for name, partial in result.items():
+                totals[name]['tiers'] += partial['tiers']
+                totals[name]['prize'] += partial['prize']
+
+    summary = {}
+    for name, total in totals.items():
+        tickets = len(positions) * tickets_per_round
+        cost = tickets * TICKET_PRICE
+        tiers = total['tiers']
+        summary[name] = {
+            'tickets': tickets,
+            'tiers': {rank: int(tiers[rank]) for rank in range(1, 6)},
+            'hit_rate': float(tiers[1:].sum() / tickets) if tickets else 0.0,
+            'total_prize': total['prize'],
+            'cost': cost,
+            'expected_return': total['prize'] / tickets if tickets else 0.0,
+            'roi': (total['prize'] - cost) / cost if cost else 0.0,
+        }
+
+    return {
+        'rounds': len(positions),
+        'first_round': int(rounds[positions[0]]) if len(positions) else None,
+        'last_round': int(rounds[positions[-1]]) if len(positions) else None,
+        'tickets_per_round': tickets_per_round,
+        'seed': seed,
+        'strategies': summary,
+    }
@@ -0,0 +1,326 @@
+"""
+Constraint-filtered ticket generation over all C(45, 6) combinations.
+
+Every combination is stored once as a uint64 bitmask (bit n-1 set for number n)
+together with small feature columns, so constraints become vectorized column
+filters and recommendations are drawn straight from the filtered index.
+"""
+import threading
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .sampler import NUMBER_COUNT, PICK_COUNT
+
+TOTAL_COMBINATIONS = 8_145_060
+
+# Balance rules shown as recommendation reasons, enforced up front
+DEFAULT_CONSTRAINTS = {
+    'sum_range': (120, 180),
+    'odd_range': (2, 4),
+    'max_consecutive': 2,
+    'min_per_range': 1,
+}
+
+# Range buckets used by the recommender: 1-15, 16-30, 31-45
+RANGE_BOUNDS = (15, 30)
+
+# Filtered index / weight CDF cache sizes
+_FILTER_CACHE_SIZE = 16
+_CDF_CACHE_SIZE = 8
+
+
+def enumerate_combinations() -> np.ndarray:
+    """All 6-number combinations in lexicographic order as an (N, 6) int8 array."""
+    rows = np.arange(1, NUMBER_COUNT - PICK_COUNT + 2, dtype=np.int8)[:, None]
+    for pos in range(1, PICK_COUNT):
+        max_value = NUMBER_COUNT - (PICK_COUNT - 1 - pos)
+        last = rows[:, -1].astype(np.int64)
+        extend = max_value - last
+        repeated = np.repeat(rows, extend, axis=0)
+        starts = np.repeat(np.cumsum(extend) - extend, extend)
+        offsets = np.arange(len(repeated)) - starts + 1
+        nxt = (np.repeat(last, extend) + offsets).astype(np.int8)
+        rows = np.hstack([repeated, nxt[:, None]])
+    return rows
+
+
+def numbers_to_mask(numbers: Iterable[int]) -> int:
+    mask = 0
+    for n in numbers:
+        mask |= 1 << (int(n) - 1)
+    return mask
+
+
+def tickets_to_masks(tickets: np.ndarray) -> np.ndarray:
+    """Encode an (n, 6) array of numbers as uint64 bitmasks."""
+    tickets = np.asarray(tickets)
+    bits = np.left_shift(np.uint64(1), (tickets - 1).astype(np.uint64))
+    return np.bitwise_or.reduce(bits, axis=1)
+
+
+if hasattr(np, 'bitwise_count'):
+    def popcount(masks: np.ndarray) -> np.ndarray:
+        """Set bits per uint64 mask."""
+        return np.bitwise_count(masks).astype(np.uint8)
+else:
+    _BYTE_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+    def popcount(masks: np.ndarray) -> np.ndarray:
+        """Set bits per uint64 mask."""
+        masks = np.ascontiguousarray(masks, dtype=np.uint64)
+        return _BYTE_POPCOUNT[masks.view(np.uint8)].reshape(masks.shape + (8,)).sum(axis=-1, dtype=np.uint8)
+
+
+def masks_to_numbers(masks: np.ndarray) -> np.ndarray:
+    """Decode uint64 bitmasks into an (n, 6) int8 array of sorted numbers."""
+    masks = np.ascontiguousarray(masks, dtype=np.uint64)
+    bits = np.unpackbits(masks.view(np.uint8).reshape(-1, 8), axis=1, bitorder='little')
+    _, cols = np.nonzero(bits[:, :NUMBER_COUNT])
+    return (cols.reshape(-1, PICK_COUNT) + 1).astype(np.int8)
+
+
+class CombinationIndex:
+    """All C(45, 6) tickets with per-combination features.
+
+    Columns (one row per combination, lexicographic order):
+        masks        uint64 bitmask of the six numbers
+        sums         sum of the numbers (21-255)
+        odd_counts   number of odd numbers
+        consecutive  adjacent pairs differing by 1, as in get_recommendation_reasons
+        low/mid/high count of numbers in 1-15 / 16-30 / 31-45
+
+    With a FeatureStore the columns are its read-only memory maps, so nothing
+    is built or copied per process.
+    """
+
+    def __init__(self, store=None):
+        self.store = store
+        if store is not None:
+            for name in ('masks', 'sums', 'odd_counts', 'consecutive', 'low', 'mid', 'high'):
+                setattr(self, name, store.columns[name])
+        else:
+            combos = enumerate_combinations()
+
+            self.masks = tickets_to_masks(combos)
+
+            self.sums = combos.sum(axis=1, dtype=np.int16).astype(np.uint8)
+            self.odd_counts = (combos & 1).sum(axis=1, dtype=np.uint8)
+            self.consecutive = (np.diff(combos, axis=1) == 1).sum(axis=1, dtype=np.uint8)
+            self.low = (combos <= RANGE_BOUNDS[0]).sum(axis=1, dtype=np.uint8)
+            self.high = (combos > RANGE_BOUNDS[1]).sum(axis=1, dtype=np.uint8)
+            self.mid = (PICK_COUNT - self.low - self.high).astype(np.uint8)
+            del combos
+
+        for column in (self.masks, self.sums, self.odd_counts, self.consecutive, self.low, self.mid, self.high):
+            column.setflags(write=False)
+
+        self._lock = threading.Lock()
+        self._filter_cache: Dict[Tuple, np.ndarray] = {}
+        self._cdf_cache: Dict[Tuple, Tuple[np.ndarray, int]] = {}
+        self._chunk_cache: Optional[Tuple[Tuple, np.ndarray]] = None
+
+    def __len__(self) -> int:
+        return len(self.masks)
+
+    def filter(self, sum_range: Optional[Tuple[int, int]] = None,
+               odd_range: Optional[Tuple[int, int]] = None,
+               max_consecutive: Optional[int] = None,
+               min_per_range: Optional[int] = None,
+               include: Optional[Iterable[int]] = None,
+               exclude: Optional[Iterable[int]] = None,
+               exclude_won: Optional[int] = None) -> np.ndarray:
+        """Indices (int32) of combinations satisfying every given constraint.
+
+        The column constraints are cached; `include`/`exclude` numbers are applied
+        on top of the cached index with a bitmask test. `exclude_won` drops
+        combinations that ever won rank 1..exclude_won and needs the feature store.
+        """
+        store = None
+        if exclude_won:
+            from .feature_store import get_feature_store
+
+            store = get_feature_store()
+            if store is None:
+                raise ValueError("exclude_won needs the combination feature store (scripts/build_feature_store.py)")
+        key = (tuple(sum_range) if sum_range else None,
+               tuple(odd_range) if odd_range else None,
+               max_consecutive, min_per_range,
+               (exclude_won, store.identity) if store is not None else None)
+        with self._lock:
+            indices = self._filter_cache.get(key)
+
+        if indices is None:
+            keep = np.ones(len(self.masks), dtype=bool)
+            if sum_range:
+                keep &= (self.sums >= sum_range[0]) & (self.sums <= sum_range[1])
+            if odd_range:
+                keep &= (self.odd_counts >= odd_range[0]) & (self.odd_counts <= odd_range[1])
+            if max_consecutive is not None:
+                keep &= self.consecutive <= max_consecutive
+            if min_per_range:
+                keep &= ((self.low >= min_per_range) & (self.mid >= min_per_range)
+                         & (self.high >= min_per_range))
+            if store is not None:
+                keep &= (store.best_rank == 0) | (store.best_rank > exclude_won)
+            indices = np.flatnonzero(keep).astype(np.int32)
+            indices.setflags(write=False)
+            with self._lock:
+                if len(self._filter_cache) >= _FILTER_CACHE_SIZE:
+                    self._filter_cache.pop(next(iter(self._filter_cache)))
+                self._filter_cache[key] = indices
+
+        include_mask = np.uint64(numbers_to_mask(include or []))
+        exclude_mask = np.uint64(numbers_to_mask(exclude or []))
+        if include_mask or exclude_mask:
+            masks = self.masks[indices]
+            keep = (masks & include_mask) == include_mask
+            if exclude_mask:
+                keep &= (masks & exclude_mask) == 0
+            indices = indices[keep]
+        return indices
+
+    def numbers(self, indices: np.ndarray) -> np.ndarray:
+        """(n, 6) int8 tickets for the given combination indices."""
+        return masks_to_numbers(self.masks[indices])
+
+    def features(self, index: int) -> Dict[str, int]:
+        return {
+            'sum': int(self.sums[index]),
+            'odd': int(self.odd_counts[index]),
+            'consecutive': int(self.consecutive[index]),
+            'low': int(self.low[index]),
+            'mid': int(self.mid[index]),
+            'high': int(self.high[index]),
+        }
+
+    def sample(self, count: int, weights: Optional[Sequence[float]] = None,
+               rng: Optional[np.random.Generator] = None, **constraints) -> np.ndarray:
+        """Draw `count` distinct combination indices from the filtered index.
+
+        Without weights every matching combination is equally likely; with
+        per-number weights a combination's probability is proportional to the
+        product of its numbers' weights.
+        """
+        rng = rng or np.random.default_rng()
+        indices = self.filter(**constraints)
+        if len(indices) < count:
+            raise ValueError(f"only {len(indices)} combinations satisfy the constraints")
+
+        if weights is None:
+            return indices[rng.choice(len(indices), size=count, replace=False)]
+
+        cdf, positive = self._weighted_cdf(indices, np.asarray(weights, dtype=np.float64), constraints)
+        if positive < count:
+            raise ValueError(f"only {positive} matching combinations have positive weight")
+
+        picked = np.empty(0, dtype=np.int64)
+        # Only tops up when the same combination is drawn twice
+        while len(picked) < count:
+            draws = np.searchsorted(cdf, rng.random(count - len(picked)) * cdf[-1], side='right')
+            picked = np.unique(np.concatenate([picked, np.minimum(draws, len(cdf) - 1)]))
+        return indices[rng.permutation(picked)]
+
+    def _weighted_cdf(self, indices: np.ndarray, weights: np.ndarray,
+                      constraints: Dict) -> Tuple[np.ndarray, int]:
+        """Cumulative combination weights over `indices` and the number of positive ones.
+
+        Log weights are summed through lookup tables on 16-bit chunks of the
+        masks, so no per-combination number array is needed.
+        """
+        constraint_key = tuple(sorted((k, tuple(sorted(v)) if isinstance(v, (list, tuple, set)) else v)
+                                      for k, v in constraints.items() if v is not None))
+        if constraints.get('exclude_won'):
+            # The filtered index changes when the feature store is rebuilt
+            from .feature_store import get_feature_store
+
+            constraint_key += (('store', get_feature_store().identity),)
+        key = (constraint_key, weights.tobytes())
+        with self._lock:
+            cached = self._cdf_cache.get(key)
+        if cached is not None:
+            return cached
+
+        with np.errstate(divide='ignore'):
+            log_weights = np.log(weights)
+        log_weights -= log_weights[np.isfinite(log_weights)].max()
+
+        # lut8[j, b]: summed log weight of the numbers set in byte j == b
+        byte_bits = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1, bitorder='little')
+        padded = np.concatenate([log_weights, np.zeros(48 - NUMBER_COUNT)]).reshape(6, 8)
+        lut8 = np.where(byte_bits[None, :, :].astype(bool), padded[:, None, :], 0.0).sum(axis=2)
+        # lut[j, v]: same for 16-bit chunk j (little-endian: low byte first)
+        lut = (lut8[1::2, :, None] + lut8[0::2, None, :]).reshape(3, 1 << 16)
+
+        chunks = self._mask_chunks(indices, constraint_key)
+        total = lut[0][chunks[0]]
+        total += lut[1][chunks[1]]
+        total += lut[2][chunks[2]]
+        combination_weights = np.exp(total)
+        cdf = np.cumsum(combination_weights)
+        cdf.setflags(write=False)
+        cached = (cdf, int(np.count_nonzero(combination_weights)))
+
+        with self._lock:
+            if len(self._cdf_cache) >= _CDF_CACHE_SIZE:
+                self._cdf_cache.pop(next(iter(self._cdf_cache)))
+            self._cdf_cache[key] = cached
+        return cached
+
+    def _mask_chunks(self, indices: np.ndarray, constraint_key: Tuple) -> np.ndarray:
+        """(3, n) uint16 low chunks of the masks; cached for the latest constraint set."""
+        with self._lock:
+            if self._chunk_cache and self._chunk_cache[0] == constraint_key:
+                return self._chunk_cache[1]
+
+        chunks = np.ascontiguousarray(self.masks[indices].view(np.uint16).reshape(-1, 4)[:, :3].T)
+        with self._lock:
+            self._chunk_cache = (constraint_key, chunks)
+        return chunks
+
+
+_index_lock = threading.Lock()
+_index: Optional[CombinationIndex] = None
+
+
+def get_combination_index() -> CombinationIndex:
+    """Process-wide index.
+
+    Backed by the memory-mapped feature store when it has been built: opening it
+    is cheap and the pages are shared by every worker process. Without a store
+    the columns are computed once per process (a few seconds, ~120MB), normally
+    by preload_combination_index at app startup rather than inside a request.
+    The index follows the store when it is built or replaced.
+    """
+    global _index
+    from .feature_store import get_feature_store
+
+    store = get_feature_store()
+    index = _index
+    if index is not None and (store is None or index.store is store):
+        return index
+    with _index_lock:
+        if _index is None or (store is not None and _index.store is not store):
+            _index = CombinationIndex(store)
+        return _index
+
+
+def preload_combination_index() -> threading.Thread:
+    """Build the process-wide index in a background thread (create_app)."""
+    thread = threading.Thread(target=get_combination_index, name="combination-index", daemon=True)
+    thread.start()
+    return thread
+
+
+def constrained_tickets(count: int, weights: Optional[Sequence[float]] = None,
+                        fixed: Optional[Iterable[int]] = None,
+                        rng: Optional[np.random.Generator] = None,
+                        **constraints) -> np.ndarray:
+    """`count` tickets satisfying the constraints (DEFAULT_CONSTRAINTS when none given).
+
+    `fixed` numbers must appear in every ticket.
+    """
+    index = get_combination_index()
+    constraints = constraints or DEFAULT_CONSTRAINTS
+    picks = index.sample(count, weights=weights, rng=rng, include=fixed, **constraints)
+    return index.numbers(picks)
@@ -0,0 +1,270 @@
+"""
+추첨 결과/당첨점 일괄 저장
+
+asyncio 수집기(async_fetcher.run_fetch_rounds)가 받아 온 회차별 결과를 청크
+단위로 한 트랜잭션에 저장한다. 추첨 결과는 INSERT ... ON CONFLICT(round) DO UPDATE
+한 번(executemany)으로, 당첨점은 새 행만 골라 한 번의 INSERT로 넣는다. 기존 행
+확인도 청크당 한 번의 조회로 끝내므로 회차별 SELECT/커밋이 없다.
+
+perform_update와 같은 규칙을 따른다:
+    - 없는 회차는 추가, 당첨금 정보가 비어 있는 회차만 갱신 (갱신 후 구매 당첨금 재계산)
+    - 추첨 결과가 바뀌면 조합 특성 저장소를 백그라운드에서 다시 빌드
+    - 당첨점은 (등수, 순번) 키로 중복 제거, 이미 있는 행은 그대로 둔다
+    - 수집기가 페이지별 결과(shop_pages)를 넘기면 받은 페이지의 상태를 shop_page_states에
+      shop_scraper와 같은 형식으로 저장한다. 실패한 페이지는 상태가 없으므로 그 회차는
+      다음 수집 때 빠진 페이지만 다시 받는다 (updater.rounds_needing_fetch)
+"""
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, List, Set
+
+from sqlalchemy import func, insert, or_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from ..extensions import db
+from ..models import Draw, ShopPageState, WinningShop
+from .lottery_checker import reprice_purchases
+from .feature_store import schedule_refresh as schedule_feature_store_refresh
+from .lotto_fetcher import shop_row_key
+from .shop_geo import geocode_shops
+from .shop_normalizer import normalize_shops
+from .shop_scraper import page_key
+
+# 한 트랜잭션에 저장하는 회차 수
+INGEST_CHUNK = 200
+
+# 당첨금 정보 (기존 회차에서 비어 있으면 갱신하는 컬럼)
+PRIZE_FIELDS = (
+    "total_sales",
+    "first_prize_amount", "first_prize_winners",
+    "second_prize_amount", "second_prize_winners",
+    "third_prize_amount", "third_prize_winners",
+    "fourth_prize_amount", "fourth_prize_winners",
+    "fifth_prize_amount", "fifth_prize_winners",
+    "total_tickets_sold",
+)
+
+
+def _draw_row(data: Dict, now: datetime) -> Dict:
+    row = {
+        "round": data["round"],
+        "draw_date": data["draw_date"],
+        "numbers": ",".join(str(n) for n in data["numbers"]),
+        "bonus": data["bonus"],
+        "created_at": now,
+    }
+    row.update({field: data.get(field) for field in PRIZE_FIELDS})
+    return row
+
+
+def _upsert_draws(draws: List[Dict]) -> Dict[int, str]:
+    """추첨 결과 upsert. {회차: 'inserted' | 'updated' | 'unchanged'}"""
+    if not draws:
+        return {}
+    rounds = [data["round"] for data in draws]
+    # 기존 회차의 당첨금 정보를 한 번에 확인 (비어 있는 회차만 갱신 대상)
+    existing = {
+        row[0]: row[1:]
+        for row in db.session.query(Draw.round, *(getattr(Draw, field) for field in PRIZE_FIELDS))
+        .filter(Draw.round.in_(rounds))
+    }
+
+    def needs_update(data: Dict) -> bool:
+        prizes = existing[data["round"]]
+        if prizes[PRIZE_FIELDS.index("total_sales")] is not None and \
+                prizes[PRIZE_FIELDS.index("first_prize_amount")] is not None:
+            return False
+        # 같은 값(예: 아직 비어 있는 당첨금)을 다시 쓰면 갱신으로 치지 않는다
+        return tuple(data.get(field) for field in PRIZE_FIELDS) != tuple(prizes)
+
+    now = datetime.utcnow()
+    stmt = sqlite_insert(Draw)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Draw.round],
+        set_={field: stmt.excluded[field] for field in PRIZE_FIELDS},
+        where=or_(Draw.total_sales.is_(None), Draw.first_prize_amount.is_(None)),
+    )
+    outcome = {}
+    pending = []
+    for data in draws:
+        r = data["round"]
+        if r not in existing:
+            outcome[r] = "inserted"
+        elif needs_update(data):
+            outcome[r] = "updated"
+        else:
+            outcome[r] = "unchanged"
+            continue
+        pending.append(_draw_row(data, now))
+    if pending:
+        db.session.execute(stmt, pending)
+    return outcome
+
+
+def _insert_shops(shops_by_round: Dict[int, List[Dict]]) -> Dict[int, int]:
+    """새 당첨점 행만 일괄 추가. {회차: 추가된 행 수}"""
+    if not shops_by_round:
+        return {}
+    existing: Set = set()
+    for round_no, rank, sequence, name, address in db.session.query(
+        WinningShop.round, WinningShop.rank, WinningShop.sequence, WinningShop.name, WinningShop.address
+    ).filter(WinningShop.round.in_(list(shops_by_round))):
+        existing.add((round_no, shop_row_key({"rank": rank, "sequence": sequence, "name": name, "address": address})))
+
+    now = datetime.utcnow()
+    new_rows = []
+    added: Dict[int, int] = {}
+    for round_no, rows in shops_by_round.items():
+        for shop_data in rows:
+            key = (round_no, shop_row_key(shop_data))
+            if key in existing:
+                continue
+            existing.add(key)
+            new_rows.append({
+                "round": round_no,
+                "rank": shop_data["rank"],
+                "sequence": shop_data.get("sequence"),
+                "name": shop_data["name"],
+                "method": shop_data.get("method"),
+                "address": shop_data.get("address"),
+                "winners_count": shop_data.get("winners_count"),
+                "created_at": now,
+            })
+            added[round_no] = added.get(round_no, 0) + 1
+    if new_rows:
+        db.session.execute(insert(WinningShop), new_rows)
+    return added
+
+
+def _record_shop_pages(pages_by_round: Dict[int, Dict]) -> None:
+    """받은 당첨점 페이지의 상태 upsert (page_key 기준, 1페이지에는 확인된 페이지 수)"""
+    now = datetime.utcnow()
+    rows = []
+    for round_no, shop_pages in pages_by_round.items():
+        for page, result in shop_pages["pages"].items():
+            if isinstance(result, Exception):
+                continue
+            rows.append({
+                "page_key": page_key(round_no, page),
+                "round": round_no,
+                "page": page,
+                "etag": result["etag"],
+                "last_modified": result["last_modified"],
+                "content_hash": result["content_hash"],
+                "row_count": len(result["rows"]),
+                "page_count": shop_pages["page_count"] if page == 1 else None,
+                "fetched_at": now,
+            })
+    if not rows:
+        return
+    stmt = sqlite_insert(ShopPageState)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ShopPageState.page_key],
+        set_={
+            **{field: stmt.excluded[field] for field in ("etag", "last_modified", "content_hash", "row_count",
+                                                          "fetched_at")},
+            "page_count": func.coalesce(stmt.excluded.page_count, ShopPageState.page_count),
+        },
+    )
+    db.session.execute(stmt, rows)
+
+
+def _ingest_chunk(payloads: List[Dict], data_type: str) -> List[Dict]:
+    draws: List[Dict] = []
+    shops_by_round: Dict[int, List[Dict]] = {}
+    pages_by_round: Dict[int, Dict] = {}
+    errors: Dict[int, List[str]] = {}
+
+    for payload in payloads:
+        round_no = payload["round"]
+        draw = payload.get("draw")
+        shops = payload.get("shops")
+        if data_type in ("both", "numbers") and draw is not None:
+            if isinstance(draw, Exception):
+                errors.setdefault(round_no, []).append(f"draw: {type(draw).__name__}: {draw}")
+            else:
+                draws.append(draw)
+        if data_type in ("both", "shops") and shops is not None:
+            if isinstance(shops, Exception):
+                errors.setdefault(round_no, []).append(f"shops: {type(shops).__name__}: {shops}")
+            else:
+                shops_by_round[round_no] = shops
+            shop_pages = payload.get("shop_pages")
+            if isinstance(shop_pages, dict):
+                pages_by_round[round_no] = shop_pages
+                for page, result in sorted(shop_pages["pages"].items()):
+                    if isinstance(result, Exception):
+                        errors.setdefault(round_no, []).append(
+                            f"shops page {page}: {type(result).__name__}: {result}"
+                        )
+
+    try:
+        draw_outcome = _upsert_draws(draws)
+        shops_added = _insert_shops(shops_by_round)
+        _record_shop_pages(pages_by_round)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    # 갱신된 회차는 예상 당첨금으로 계산된 구매 기록을 실제 배당금으로 다시 계산
+    for round_no, outcome in draw_outcome.items():
+        if outcome == "updated":
+            reprice_purchases(round_no)
+
+    rounds = [payload["round"] for payload in payloads]
+    shop_counts = Counter(dict(db.session.query(WinningShop.round, func.count(WinningShop.id)).filter(
+        WinningShop.round.in_(rounds)
+    ).group_by(WinningShop.round).all()))
+
+    results = []
+    for round_no in rounds:
+        draw_updated = draw_outcome.get(round_no) in ("inserted", "updated")
+        shops_updated = shops_added.get(round_no, 0) > 0
+        # 실패한 요청(당첨점 페이지 포함)이 있으면 저장된 것이 있어도 partial
+        if draw_updated and shops_updated and round_no not in errors:
+            status = "updated"
+        elif draw_updated or shops_updated:
+            status = "partial"
+        elif round_no in errors:
+            status = "error"
+        else:
+            status = "skipped"
+        result = {
+            "round": round_no,
+            "status": status,
+            "draw_updated": draw_updated,
+            "shops_updated": shops_updated,
+            "shops_count": shop_counts[round_no],
+        }
+        if round_no in errors:
+            result["errors"] = errors[round_no]
+        results.append(result)
+    return results
+
+
+def ingest_rounds(payloads: Iterable[Dict], data_type: str = "both", chunk_size: int = INGEST_CHUNK) -> List[Dict]:
+    """
+    수집된 회차 결과를 청크 단위로 일괄 저장
+
+    Args:
+        payloads: async_fetcher.fetch_round 결과 형식 {'round', 'draw', 'shops', 'shop_pages'(선택)}
+                  (draw/shops는 결과, 예외 또는 None)
+        data_type: 'both', 'numbers', 'shops'
+
+    Returns:
+        회차별 perform_update와 같은 형식의 결과 (실패 항목은 'errors', 실패만 있으면 status='error')
+    """
+    payloads = sorted(payloads, key=lambda payload: payload["round"])
+    results: List[Dict] = []
+    for offset in range(0, len(payloads), chunk_size):
+        results.extend(_ingest_chunk(payloads[offset:offset + chunk_size], data_type))
+
+    if any(result["shops_updated"] for result in results):
+        # 새 당첨 행을 정규화 판매점에 연결하고 좌표 부여 (청크마다가 아니라 한 번)
+        normalize_shops()
+        geocode_shops()
+    if any(result["draw_updated"] for result in results):
+        # 조합 특성 저장소에 새 회차 반영 (백그라운드 재빌드)
+        schedule_feature_store_refresh()
+    return results
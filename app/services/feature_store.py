@@ -0,0 +1,416 @@
+"""
+C(45, 6) 조합 특성 저장소 (메모리 맵 파일)
+
+8,145,060개 조합 전체의 특성을 고정 폭 컬럼으로 instance/combination_features.bin
+하나에 미리 계산해 둔다. 파일은 읽기 전용 메모리 맵으로 열기 때문에 gunicorn
+워커 여러 개가 OS 페이지 캐시의 같은 페이지를 공유하고, 프로세스마다 복사본이나
+빌드 시간이 없다. 컬럼은 조합 사전순(combinations.enumerate_combinations) 행이라
+CombinationIndex와 같은 인덱스로 벡터 마스크 필터를 걸 수 있다.
+
+    masks         uint64  6개 번호의 비트마스크
+    sums          uint8   번호 합
+    odd_counts    uint8   홀수 개수
+    consecutive   uint8   연속 번호 쌍 수
+    low/mid/high  uint8   1-15 / 16-30 / 31-45 구간별 개수
+    last_seen_3   uint16  3개 부분집합 중 하나가 당첨 번호에 포함된 마지막 회차 (0=없음)
+    last_seen_4   uint16  4개 부분집합 기준
+    last_seen_5   uint16  5개 부분집합 기준
+    best_match    uint8   역대 최대 일치 개수 (3 미만은 0)
+    best_rank     uint8   역대 최고 등수 (1~5, 0=당첨 없음, 2등은 보너스 포함)
+
+파일 구조: HEADER_SIZE 바이트 헤더(매직 + JSON: 컬럼 오프셋, 기준 회차) 뒤에
+컬럼을 64바이트 정렬로 이어 붙인다. 새 회차가 반영되면 저장 경로(updater.perform_update,
+draw_ingest.ingest_rounds, 크롤링 작업 종료 시 job_queue)나 scripts/build_feature_store.py가
+새 파일을 만들어 교체하고, 열려 있는 프로세스는 다음 조회에서 파일이 바뀐 것을 보고 다시 연다.
+"""
+import json
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import combinations as subsets
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .combinations import RANGE_BOUNDS, TOTAL_COMBINATIONS, enumerate_combinations, tickets_to_masks
+from .sampler import NUMBER_COUNT, PICK_COUNT
+
+MAGIC = b"LOTTOFS1"
+HEADER_SIZE = 4096
+ALIGN = 64
+STORE_VERSION = 1
+
+DEFAULT_FILENAME = "combination_features.bin"
+
+# 빌드 시 한 번에 처리하는 조합 수
+BUILD_CHUNK = 1 << 20
+
+# 부분집합 크기별 마지막 당첨 회차 컬럼
+SUBSET_SIZES = (3, 4, 5)
+
+COLUMNS = (
+    ("masks", np.uint64),
+    ("sums", np.uint8),
+    ("odd_counts", np.uint8),
+    ("consecutive", np.uint8),
+    ("low", np.uint8),
+    ("mid", np.uint8),
+    ("high", np.uint8),
+    ("last_seen_3", np.uint16),
+    ("last_seen_4", np.uint16),
+    ("last_seen_5", np.uint16),
+    ("best_match", np.uint8),
+    ("best_rank", np.uint8),
+)
+
+# BINOM[n, k] = C(n, k)
+BINOM = np.zeros((NUMBER_COUNT + 1, PICK_COUNT + 2), dtype=np.int64)
+for _n in range(NUMBER_COUNT + 1):
+    BINOM[_n, 0] = 1
+    for _k in range(1, min(_n, PICK_COUNT + 1) + 1):
+        BINOM[_n, _k] = BINOM[_n - 1, _k - 1] + BINOM[_n - 1, _k]
+_BINOM_BY_K = np.ascontiguousarray(BINOM.T)
+
+_path: Optional[str] = None
+_store: Optional["FeatureStore"] = None
+_store_lock = threading.Lock()
+
+# 새 회차 저장 후 백그라운드 재빌드 (한 번에 하나, 시작 전인 요청은 하나로 합침)
+_refresh_executor: Optional[ThreadPoolExecutor] = None
+_refresh_pending = False
+_refresh_lock = threading.Lock()
+
+
+def configure(path: Optional[str]) -> None:
+    """저장소 파일 경로 (create_app에서 설정)"""
+    global _path, _store
+    with _store_lock:
+        _path = path
+        _store = None
+
+
+def store_path() -> Optional[str]:
+    return _path
+
+
+def _colex_ranks(values: np.ndarray) -> np.ndarray:
+    """0부터 시작하는 정렬된 번호 (n, k)의 colex 순위 (부분집합 테이블 인덱스)"""
+    ranks = np.zeros(len(values), dtype=np.int64)
+    for i in range(values.shape[1]):
+        ranks += _BINOM_BY_K[i + 1].take(values[:, i])
+    return ranks
+
+
+def combination_ranks(tickets) -> np.ndarray:
+    """(n, 6) 티켓의 조합 사전순 행 번호 (CombinationIndex/FeatureStore 인덱스)"""
+    values = np.sort(np.asarray(tickets, dtype=np.int64).reshape(-1, PICK_COUNT), axis=1) - 1
+    # 번호를 뒤집으면 (45-1-x) 사전순이 colex 역순이 된다
+    mirrored = NUMBER_COUNT - 1 - values[:, ::-1]
+    return TOTAL_COMBINATIONS - 1 - _colex_ranks(mirrored)
+
+
+def _draw_history() -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    from ..extensions import db
+    from ..models import Draw
+
+    rows = db.session.query(Draw.round, Draw.numbers, Draw.bonus).order_by(Draw.round).all()
+    rounds = np.array([row.round for row in rows], dtype=np.int64)
+    numbers = np.array([[int(x) for x in row.numbers.split(",") if x] for row in rows],
+                       dtype=np.int64).reshape(-1, PICK_COUNT)
+    bonus = np.array([row.bonus for row in rows], dtype=np.int64)
+    return rounds, np.sort(numbers, axis=1), bonus
+
+
+def _history_tables(rounds: np.ndarray, numbers: np.ndarray, bonus: np.ndarray) -> Dict:
+    """부분집합(colex 순위)별 마지막 당첨 회차와 1등/2등 조합"""
+    values = numbers - 1
+    tables = {}
+    for size in SUBSET_SIZES:
+        table = np.zeros(int(BINOM[NUMBER_COUNT, size]), dtype=np.uint16)
+        for positions in subsets(range(PICK_COUNT), size):
+            np.maximum.at(table, _colex_ranks(values[:, positions]), rounds.astype(np.uint16))
+        tables[size] = table
+
+    # 조합(colex 순위)별 1등/2등 여부. 2등: 당첨 번호 5개 + 보너스 번호
+    prize = np.zeros(TOTAL_COMBINATIONS, dtype=np.uint8)
+    for drop in range(PICK_COUNT):
+        kept = np.delete(values, drop, axis=1)
+        prize[_colex_ranks(np.sort(np.hstack([kept, bonus[:, None] - 1]), axis=1))] = 2
+    prize[_colex_ranks(values)] = 1
+    return {"last_seen": tables, "prize": prize}
+
+
+def _layout() -> Tuple[List[Dict], int]:
+    layout = []
+    offset = HEADER_SIZE
+    for name, dtype in COLUMNS:
+        layout.append({"name": name, "dtype": np.dtype(dtype).str, "offset": offset})
+        offset += TOTAL_COMBINATIONS * np.dtype(dtype).itemsize
+        offset = (offset + ALIGN - 1) // ALIGN * ALIGN
+    return layout, offset
+
+
+def build_feature_store(path: Optional[str] = None, chunk_size: int = BUILD_CHUNK) -> Dict:
+    """
+    draws 전체로 특성 파일을 새로 만들어 교체 (앱 컨텍스트 필요)
+
+    임시 파일에 메모리 맵으로 청크 단위로 쓰고 os.replace로 바꾸므로, 읽고 있는
+    프로세스는 이전 파일을 끝까지 볼 수 있다.
+
+    Returns:
+        헤더 dict (built_round, draw_count, ...)
+    """
+    path = path or _path
+    if not path:
+        raise RuntimeError("feature store path is not configured")
+
+    rounds, numbers, bonus = _draw_history()
+    history = _history_tables(rounds, numbers, bonus)
+    layout, size = _layout()
+    header = {
+        "version": STORE_VERSION,
+        "rows": TOTAL_COMBINATIONS,
+        "columns": layout,
+        "built_round": int(rounds.max()) if len(rounds) else 0,
+        "draw_count": int(len(rounds)),
+        "built_at": datetime.utcnow().isoformat(),
+    }
+    encoded = json.dumps(header).encode("utf-8")
+    if len(MAGIC) + 4 + len(encoded) > HEADER_SIZE:
+        raise ValueError("feature store header too large")
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".features-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(MAGIC + len(encoded).to_bytes(4, "little") + encoded)
+            f.truncate(size)
+
+        columns = {
+            item["name"]: np.memmap(tmp_path, dtype=item["dtype"], mode="r+", offset=item["offset"],
+                                    shape=(TOTAL_COMBINATIONS,))
+            for item in layout
+        }
+        combos = enumerate_combinations()
+        for start in range(0, TOTAL_COMBINATIONS, chunk_size):
+            _fill_chunk(columns, combos[start:start + chunk_size], slice(start, start + chunk_size), history)
+        del combos
+        for column in columns.values():
+            column.flush()
+        del columns
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return header
+
+
+def _fill_chunk(columns: Dict[str, np.memmap], combos: np.ndarray, rows: slice, history: Dict) -> None:
+    columns["masks"][rows] = tickets_to_masks(combos)
+    columns["sums"][rows] = combos.sum(axis=1, dtype=np.int16).astype(np.uint8)
+    columns["odd_counts"][rows] = (combos & 1).sum(axis=1, dtype=np.uint8)
+    columns["consecutive"][rows] = (np.diff(combos, axis=1) == 1).sum(axis=1, dtype=np.uint8)
+    low = (combos <= RANGE_BOUNDS[0]).sum(axis=1, dtype=np.uint8)
+    high = (combos > RANGE_BOUNDS[1]).sum(axis=1, dtype=np.uint8)
+    columns["low"][rows] = low
+    columns["high"][rows] = high
+    columns["mid"][rows] = PICK_COUNT - low - high
+
+    # 컬럼 단위로 읽으므로 열 우선 배치
+    values = np.asfortranarray(combos.astype(np.intp) - 1)
+    best_match = np.zeros(len(combos), dtype=np.uint8)
+    best_rank = np.zeros(len(combos), dtype=np.uint8)
+    for size, rank in zip(SUBSET_SIZES, (5, 4, 3)):
+        table = history["last_seen"][size]
+        last_seen = np.zeros(len(combos), dtype=np.uint16)
+        for positions in subsets(range(PICK_COUNT), size):
+            np.maximum(last_seen, table.take(_colex_ranks(values[:, positions])), out=last_seen)
+        columns[f"last_seen_{size}"][rows] = last_seen
+        seen = last_seen > 0
+        best_match[seen] = size
+        best_rank[seen] = rank
+
+    prize = history["prize"][_colex_ranks(values)]
+    best_rank[prize == 2] = 2
+    best_match[prize == 1] = PICK_COUNT
+    best_rank[prize == 1] = 1
+    columns["best_match"][rows] = best_match
+    columns["best_rank"][rows] = best_rank
+
+
+class FeatureStore:
+    """읽기 전용 메모리 맵 특성 파일. 컬럼 이름으로 NumPy 배열(np.memmap)에 접근"""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            prefix = f.read(len(MAGIC) + 4)
+            if prefix[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"not a feature store file: {path}")
+            self.header = json.loads(f.read(int.from_bytes(prefix[len(MAGIC):], "little")))
+            stat = os.fstat(f.fileno())
+        if self.header.get("version") != STORE_VERSION:
+            raise ValueError(f"unsupported feature store version: {self.header.get('version')}")
+
+        self.path = path
+        self.identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        self.built_round: int = self.header["built_round"]
+        self.draw_count: int = self.header["draw_count"]
+        self.columns: Dict[str, np.ndarray] = {
+            item["name"]: np.memmap(path, dtype=item["dtype"], mode="r", offset=item["offset"],
+                                    shape=(self.header["rows"],))
+            for item in self.header["columns"]
+        }
+
+    def __getattr__(self, name: str) -> np.ndarray:
+        columns = self.__dict__.get("columns", {})
+        if name in columns:
+            return columns[name]
+        raise AttributeError(name)
+
+    def __len__(self) -> int:
+        return self.header["rows"]
+
+    def is_stale(self) -> bool:
+        """DB에 파일을 만든 뒤 추가/삭제된 회차가 있는지 (앱 컨텍스트 필요)"""
+        from ..extensions import db
+        from ..models import Draw
+
+        count, latest = db.session.query(db.func.count(Draw.id), db.func.max(Draw.round)).one()
+        return (count, latest or 0) != (self.draw_count, self.built_round)
+
+    def mask(self, sum_range: Optional[Tuple[int, int]] = None,
+             odd_range: Optional[Tuple[int, int]] = None,
+             max_consecutive: Optional[int] = None,
+             min_per_range: Optional[int] = None,
+             best_match_range: Optional[Tuple[int, int]] = None,
+             exclude_won: Optional[int] = None,
+             unseen_for: Optional[Tuple[int, int]] = None,
+             include: Optional[Iterable[int]] = None,
+             exclude: Optional[Iterable[int]] = None) -> np.ndarray:
+        """
+        조건을 모두 만족하는 조합의 bool 마스크
+
+        Args:
+            best_match_range: 역대 최대 일치 개수 범위 (3 미만은 0)
+            exclude_won: 역대 1~exclude_won등에 해당한 적이 있는 조합 제외
+            unseen_for: (부분집합 크기, 회차 수) 그 크기의 부분집합이 최근 N회차 동안 나오지 않은 조합
+            include/exclude: 반드시 포함/제외할 번호
+        """
+        keep = np.ones(len(self), dtype=bool)
+        if sum_range:
+            keep &= (self.sums >= sum_range[0]) & (self.sums <= sum_range[1])
+        if odd_range:
+            keep &= (self.odd_counts >= odd_range[0]) & (self.odd_counts <= odd_range[1])
+        if max_consecutive is not None:
+            keep &= self.consecutive <= max_consecutive
+        if min_per_range:
+            keep &= (self.low >= min_per_range) & (self.mid >= min_per_range) & (self.high >= min_per_range)
+        if best_match_range:
+            keep &= (self.best_match >= best_match_range[0]) & (self.best_match <= best_match_range[1])
+        if exclude_won:
+            keep &= (self.best_rank == 0) | (self.best_rank > exclude_won)
+        if unseen_for:
+            size, window = unseen_for
+            if size not in SUBSET_SIZES:
+                raise ValueError(f"unseen_for subset size must be one of {SUBSET_SIZES}")
+            keep &= self.columns[f"last_seen_{size}"] <= max(0, self.built_round - window)
+
+        include_mask = 0
+        for n in include or []:
+            include_mask |= 1 << (int(n) - 1)
+        exclude_mask = 0
+        for n in exclude or []:
+            exclude_mask |= 1 << (int(n) - 1)
+        if include_mask:
+            keep &= (self.masks & np.uint64(include_mask)) == np.uint64(include_mask)
+        if exclude_mask:
+            keep &= (self.masks & np.uint64(exclude_mask)) == 0
+        return keep
+
+    def filter(self, **conditions) -> np.ndarray:
+        """조건을 만족하는 조합 인덱스 (int32)"""
+        return np.flatnonzero(self.mask(**conditions)).astype(np.int32)
+
+    def features(self, indices) -> List[Dict[str, int]]:
+        indices = np.asarray(indices, dtype=np.int64)
+        values = {name: column[indices] for name, column in self.columns.items() if name != "masks"}
+        return [{name: int(column[i]) for name, column in values.items()} for i in range(len(indices))]
+
+    def lookup(self, tickets) -> List[Dict[str, int]]:
+        """티켓 (n, 6)의 특성"""
+        return self.features(combination_ranks(tickets))
+
+    def summary(self) -> Dict:
+        return {key: self.header[key] for key in ("built_round", "draw_count", "built_at", "rows")}
+
+
+def get_feature_store() -> Optional[FeatureStore]:
+    """
+    프로세스 공용 저장소 (파일이 없으면 None)
+
+    파일이 새로 만들어져 교체되었으면 다시 연다 (이전 메모리 맵은 참조가 사라지면 해제).
+    """
+    global _store
+    path = _path
+    if not path:
+        return None
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    store = _store
+    if store is not None and store.path == path and store.identity == (stat.st_ino, stat.st_mtime_ns, stat.st_size):
+        return store
+    with _store_lock:
+        if _store is None or _store.identity != (stat.st_ino, stat.st_mtime_ns, stat.st_size):
+            _store = FeatureStore(path)
+        return _store
+
+
+def refresh_feature_store() -> Optional[Dict]:
+    """저장소 파일이 있고 DB보다 오래되었으면 다시 빌드 (없으면 아무것도 하지 않음)"""
+    store = get_feature_store()
+    if store is None or not store.is_stale():
+        return None
+    return build_feature_store(store.path)
+
+
+def schedule_refresh() -> None:
+    """
+    새 회차를 저장한 뒤 호출: refresh_feature_store를 백그라운드에서 실행 (앱 컨텍스트 필요)
+
+    빌드는 수 초가 걸리므로 요청/수집 경로를 막지 않는다. 아직 시작하지 않은 갱신이
+    있으면 그 갱신이 새 회차까지 반영하므로 다시 예약하지 않는다.
+    """
+    global _refresh_executor, _refresh_pending
+    if not _path or not os.path.exists(_path):
+        return
+    from flask import current_app
+
+    app = current_app._get_current_object()
+    with _refresh_lock:
+        if _refresh_pending:
+            return
+        _refresh_pending = True
+        if _refresh_executor is None:
+            _refresh_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="feature-store")
+        _refresh_executor.submit(_run_refresh, app)
+
+
+def _run_refresh(app) -> None:
+    global _refresh_pending
+    from ..extensions import db
+
+    with _refresh_lock:
+        _refresh_pending = False
+    with app.app_context():
+        try:
+            refresh_feature_store()
+        except Exception as exc:
+            print(f"조합 특성 저장소 갱신 실패: {type(exc).__name__}: {exc}")
+        finally:
+            db.session.remove()
@@ -0,0 +1,156 @@
+"""
+역대 당첨 조회 색인 ("이 번호가 당첨된 적이 있나")
+
+draws 전체에서 다음 해시 테이블을 만들어 두고, 티켓마다 부분집합 42개
+(6개 1 + 5개 6 + 4개 15 + 3개 20)를 조회해 등수별 역대 당첨 횟수를 계산한다.
+회차 수와 관계없이 티켓당 일정 시간이다. 키는 번호 비트마스크(combinations.numbers_to_mask).
+
+    six    6개 조합 -> 1등 회차 목록
+    five   5개 부분집합 -> [(회차, 보너스)] (남은 번호가 보너스면 2등, 아니면 3등)
+    four   4개 부분집합 -> 당첨 번호에 포함된 횟수
+    three  3개 부분집합 -> 당첨 번호에 포함된 횟수
+
+부분집합 합계에서 상위 일치를 빼서 정확히 k개 일치한 회차 수를 구한다
+(예: 4개 일치 = 4개 부분집합 합 - 5 x 5개 일치 - 15 x 6개 일치).
+
+색인은 프로세스마다 한 번 만들고, 조회 시 draws 상태(행 수, 최대 id)가 바뀌었으면
+새 회차만 추가한다. 회차가 삭제되는 등 추가만으로 설명되지 않으면 다시 만든다.
+"""
+import threading
+from collections import Counter, defaultdict
+from itertools import combinations as subsets
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+
+from ..extensions import db
+from ..models import Draw
+from .combinations import numbers_to_mask
+
+_STAMP_SQL = text("SELECT COUNT(*), MAX(id) FROM draws")
+
+RANKS = (1, 2, 3, 4, 5)
+
+
+class HistoryMatchIndex:
+    def __init__(self):
+        self.six: Dict[int, List[int]] = defaultdict(list)
+        self.five: Dict[int, List[Tuple[int, int]]] = defaultdict(list)
+        self.four: Counter = Counter()
+        self.three: Counter = Counter()
+        self.rounds: set = set()
+        self.max_id = 0
+        self.stamp: Optional[Tuple] = None
+
+    def __len__(self) -> int:
+        return len(self.rounds)
+
+    def add_draw(self, round_no: int, numbers: Sequence[int], bonus: int) -> bool:
+        """회차 하나 추가 (이미 있으면 False)"""
+        if round_no in self.rounds:
+            return False
+        self.rounds.add(round_no)
+        numbers = sorted(numbers)
+        self.six[numbers_to_mask(numbers)].append(round_no)
+        for subset in subsets(numbers, 5):
+            self.five[numbers_to_mask(subset)].append((round_no, bonus))
+        for subset in subsets(numbers, 4):
+            self.four[numbers_to_mask(subset)] += 1
+        for subset in subsets(numbers, 3):
+            self.three[numbers_to_mask(subset)] += 1
+        return True
+
+    def load(self, after_id: int = 0) -> int:
+        """id가 after_id보다 큰 draws 행 추가. 추가한 회차 수 반환"""
+        rows = db.session.query(Draw.id, Draw.round, Draw.numbers, Draw.bonus).filter(
+            Draw.id > after_id
+        ).order_by(Draw.id).all()
+        added = 0
+        for row in rows:
+            if self.add_draw(row.round, [int(x) for x in row.numbers.split(",") if x], row.bonus):
+                added += 1
+            self.max_id = max(self.max_id, row.id)
+        return added
+
+    def score(self, ticket: Iterable[int]) -> Dict:
+        """
+        티켓 하나의 역대 등수별 당첨 횟수
+
+        Returns:
+            {'numbers', 'best_rank' (없으면 None), 'counts': {등수: 횟수},
+             'first_rounds', 'second_rounds', 'third_rounds'}
+        """
+        numbers = sorted(int(n) for n in ticket)
+        mask = numbers_to_mask(numbers)
+
+        first_rounds = list(self.six.get(mask, ()))
+        second_rounds: List[int] = []
+        third_rounds: List[int] = []
+        five_total = 0
+        for number in numbers:
+            # number를 뺀 5개가 당첨 번호에 포함된 회차: 빠진 번호가 보너스면 2등
+            for round_no, bonus in self.five.get(mask & ~(1 << (number - 1)), ()):
+                five_total += 1
+                if bonus == number:
+                    second_rounds.append(round_no)
+                elif round_no not in first_rounds:
+                    third_rounds.append(round_no)
+        four_total = sum(self.four.get(numbers_to_mask(subset), 0) for subset in subsets(numbers, 4))
+        three_total = sum(self.three.get(numbers_to_mask(subset), 0) for subset in subsets(numbers, 3))
+
+        six = len(first_rounds)
+        five = five_total - 6 * six
+        four = four_total - 5 * five - 15 * six
+        three = three_total - 4 * four - 10 * five - 20 * six
+        counts = {1: six, 2: len(second_rounds), 3: five - len(second_rounds), 4: four, 5: three}
+        best_rank = next((rank for rank in RANKS if counts[rank]), None)
+        return {
+            "numbers": numbers,
+            "best_rank": best_rank,
+            "counts": counts,
+            "first_rounds": sorted(first_rounds),
+            "second_rounds": sorted(second_rounds),
+            "third_rounds": sorted(third_rounds),
+        }
+
+    def score_many(self, tickets: Iterable[Iterable[int]]) -> List[Dict]:
+        return [self.score(ticket) for ticket in tickets]
+
+
+_index: Optional[HistoryMatchIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_history_index() -> HistoryMatchIndex:
+    """
+    draws와 동기화된 프로세스 공용 색인
+
+    새 회차가 들어왔으면 그 행만 추가하고, 행 수가 추가분만큼 늘지 않았으면
+    (삭제/교체) 처음부터 다시 만든다.
+    """
+    global _index
+    stamp = tuple(db.session.execute(_STAMP_SQL).one())
+    index = _index
+    if index is not None and index.stamp == stamp:
+        return index
+
+    with _index_lock:
+        index = _index
+        if index is not None and index.stamp == stamp:
+            return index
+        if index is not None:
+            added = index.load(index.max_id)
+            if len(index) == stamp[0]:
+                index.stamp = stamp
+                return index
+            print(f"역대 당첨 색인 재생성 (추가 {added}, 색인 {len(index)}, draws {stamp[0]})")
+        index = HistoryMatchIndex()
+        index.load()
+        index.stamp = stamp
+        _index = index
+        return index
+
+
+def score_tickets(tickets: Iterable[Iterable[int]]) -> List[Dict]:
+    """티켓 목록을 역대 전체 회차와 비교 (티켓당 일정 시간)"""
+    return get_history_index().score_many(tickets)
@@ -0,0 +1,246 @@
+"""
+lotto_fetcher용 디스크 HTTP 응답 캐시
+
+추첨이 끝난 회차의 번호 JSON과 당첨점 페이지는 바뀌지 않으므로 한 번 받은 응답을
+instance/http_cache 아래에 저장해 두고 다시 요청하지 않는다.
+
+    index/<url 해시 앞 2자리>/<url 해시>.json    URL별 메타데이터 (상태, 헤더, 만료 시각)
+    objects/<본문 해시 앞 2자리>/<본문 해시>      응답 본문 (내용 주소 방식, 같은 본문은 한 번만 저장)
+
+항목은 영구(마감된 회차) 또는 TTL(진행 중인 회차, 아직 없는 회차)로 저장된다.
+
+모드:
+    normal  - 만료되지 않은 항목은 캐시에서, 나머지는 네트워크에서 받아 저장
+    refresh - 항상 네트워크에서 받아 저장
+    replay  - 캐시만 사용 (만료 무시, 없으면 CacheMiss). 네트워크 요청 없음
+    off     - 캐시 사용 안 함
+"""
+import hashlib
+import json
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+MODES = ("normal", "refresh", "replay", "off")
+
+# 1회차 추첨일. 이후 매주 토요일 추첨
+FIRST_DRAW_DATE = date(2002, 12, 7)
+# 추첨 후 당첨점 정보가 확정될 때까지 기다리는 기간
+SETTLE_DAYS = 7
+
+# 진행 중인 회차/아직 없는 회차 응답의 유효 시간 (초)
+DEFAULT_TTL = 3600
+
+# 캐시에 저장하는 응답 헤더 (조건부 요청/본문 해석용)
+_STORED_HEADERS = ("ETag", "Last-Modified", "Content-Type")
+
+_cache_dir: Optional[Path] = None
+_mode = "off"
+
+
+class CacheMiss(Exception):
+    """replay 모드에서 캐시에 없는 URL을 요청한 경우"""
+
+
+class CachedResponse:
+    """requests.Response 중 fetcher가 쓰는 부분만 흉내 낸 캐시 응답"""
+
+    def __init__(self, url: str, status_code: int, headers: Dict[str, str], content: bytes):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.from_cache = True
+
+    @property
+    def text(self) -> str:
+        # Content-Type의 charset으로 해석 (EUC-KR 페이지 등)
+        content_type = self.headers.get("Content-Type", "")
+        charset = content_type.split("charset=")[-1].split(";")[0].strip() if "charset=" in content_type else "utf-8"
+        try:
+            return self.content.decode(charset, errors="replace")
+        except LookupError:
+            return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            import requests
+            raise requests.exceptions.HTTPError(f"{self.status_code} (cached) for url: {self.url}")
+
+
+def configure(cache_dir, mode: str = "normal") -> None:
+    """캐시 위치와 모드 설정 (create_app에서 호출)"""
+    global _cache_dir, _mode
+    if mode not in MODES:
+        raise ValueError(f"Unknown HTTP cache mode: {mode}")
+    _cache_dir = Path(cache_dir) if cache_dir else None
+    _mode = mode if _cache_dir else "off"
+
+
+def get_mode() -> str:
+    return _mode
+
+
+def set_mode(mode: str) -> None:
+    configure(_cache_dir, mode)
+
+
+def round_draw_date(round_no: int) -> date:
+    return FIRST_DRAW_DATE + timedelta(days=7 * (round_no - 1))
+
+
+def is_round_closed(round_no: int, today: Optional[date] = None) -> bool:
+    """추첨 후 SETTLE_DAYS가 지나 응답이 더 이상 바뀌지 않는 회차인지"""
+    return (today or date.today()) >= round_draw_date(round_no) + timedelta(days=SETTLE_DAYS)
+
+
+def _url_key(url: str) -> str:
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+
+def _index_path(url: str) -> Path:
+    key = _url_key(url)
+    return _cache_dir / "index" / key[:2] / f"{key}.json"
+
+
+def _object_path(digest: str) -> Path:
+    return _cache_dir / "objects" / digest[:2] / digest
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def load(url: str, allow_expired: bool = False) -> Optional[CachedResponse]:
+    """저장된 응답 (없거나 만료되었으면 None)"""
+    if _cache_dir is None:
+        return None
+    try:
+        meta = json.loads(_index_path(url).read_text(encoding="utf-8"))
+        if not allow_expired and meta["expires_at"] is not None and meta["expires_at"] < time.time():
+            return None
+        content = _object_path(meta["body_sha256"]).read_bytes()
+    except (OSError, ValueError, KeyError):
+        return None
+    return CachedResponse(url, meta["status"], meta["headers"], content)
+
+
+def store(url: str, response, ttl: Optional[float] = DEFAULT_TTL) -> None:
+    """응답 저장 (ttl=None이면 영구)"""
+    if _cache_dir is None:
+        return
+    content = response.content
+    digest = hashlib.sha256(content).hexdigest()
+    object_path = _object_path(digest)
+    if not object_path.exists():
+        _write_atomic(object_path, content)
+
+    meta = {
+        "url": url,
+        "status": response.status_code,
+        "headers": {name: response.headers[name] for name in _STORED_HEADERS if response.headers.get(name)},
+        "body_sha256": digest,
+        "stored_at": time.time(),
+        "expires_at": None if ttl is None else time.time() + ttl,
+    }
+    _write_atomic(_index_path(url), json.dumps(meta).encode("utf-8"))
+
+
+def lookup(url: str, refresh: bool = False):
+    """현재 모드에서 캐시로 응답할 수 있으면 캐시 응답, 네트워크가 필요하면 None
+
+    refresh=True이면 normal 모드에서도 캐시를 건너뛴다 (replay 모드는 그대로 캐시 사용).
+
+    Raises:
+        CacheMiss: replay 모드에서 캐시에 없는 경우
+    """
+    if _mode == "replay" or (_mode == "normal" and not refresh):
+        cached = load(url, allow_expired=_mode == "replay")
+        if cached is not None:
+            return cached
+        if _mode == "replay":
+            raise CacheMiss(url)
+    return None
+
+
+def save(url: str, response, ttl_for: Callable[[object], Optional[float]]) -> None:
+    """네트워크 응답을 현재 모드에 따라 저장 (200 응답만)"""
+    if _mode in ("normal", "refresh") and response.status_code == 200:
+        ttl = ttl_for(response)
+        if ttl != 0:
+            try:
+                store(url, response, ttl)
+            except OSError as exc:
+                # 캐시 저장 실패는 수집에 영향을 주지 않음
+                print(f"HTTP 캐시 저장 실패: {type(exc).__name__}: {exc}")
+
+
+def cached_get(url: str, fetch: Callable[[], object],
+               ttl_for: Callable[[object], Optional[float]] = lambda response: DEFAULT_TTL,
+               refresh: bool = False):
+    """
+    캐시를 거치는 GET
+
+    Args:
+        fetch: 네트워크 요청 (재시도/요청 간격 제한 포함). 캐시 적중 시 호출하지 않는다.
+        ttl_for: 응답 -> 유효 시간(초), None이면 영구 저장, 0이면 저장하지 않음
+        refresh: 캐시를 읽지 않고 네트워크에서 받아 새 응답을 저장 (조건부 요청/재확인용).
+            304 응답은 저장하지 않으므로 기존 항목이 그대로 남는다.
+
+    Raises:
+        CacheMiss: replay 모드에서 캐시에 없는 경우
+    """
+    cached = lookup(url, refresh)
+    if cached is not None:
+        return cached
+    response = fetch()
+    save(url, response, ttl_for)
+    return response
+
+
+def prune(now: Optional[float] = None) -> Dict:
+    """만료된 항목과 참조되지 않는 본문 삭제
+
+    Returns:
+        {'entries': 남은 항목 수, 'expired': 삭제한 항목 수, 'objects_removed': 삭제한 본문 수}
+    """
+    if _cache_dir is None:
+        return {"entries": 0, "expired": 0, "objects_removed": 0}
+    now = now or time.time()
+    referenced = set()
+    entries = expired = 0
+    for path in (_cache_dir / "index").glob("*/*.json"):
+        try:
+            meta = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            path.unlink(missing_ok=True)
+            expired += 1
+            continue
+        if meta.get("expires_at") is not None and meta["expires_at"] < now:
+            path.unlink(missing_ok=True)
+            expired += 1
+        else:
+            referenced.add(meta.get("body_sha256"))
+            entries += 1
+
+    objects_removed = 0
+    for path in (_cache_dir / "objects").glob("*/*"):
+        if path.name not in referenced:
+            path.unlink(missing_ok=True)
+            objects_removed += 1
+    return {"entries": entries, "expired": expired, "objects_removed": objects_removed}
@@ -0,0 +1,187 @@
+"""
+크롤링 작업 진행 이벤트
+
+워커가 회차 시작/완료, 재시도 대기, 오류, 처리 속도(회차/초)와 남은 시간을
+crawl_job_events에 기록하고, /api/crawling-progress/stream(SSE)이 이를 읽어
+브라우저로 보낸다. 이벤트 ID가 SSE의 id이므로 재연결 시 Last-Event-ID 다음
+이벤트부터 이어서 받는다. 테이블은 최근 EVENT_BUFFER_SIZE개만 남기는 링 버퍼다.
+
+이벤트는 세션이 아닌 별도 연결로 바로 커밋하므로 다른 스레드(당첨점 페이지
+동시 요청, asyncio 수집기)에서도 기록할 수 있고, 워커가 다른 프로세스여도
+웹 프로세스에서 같은 이벤트를 본다.
+"""
+import json
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+from flask import Flask
+from sqlalchemy import func
+
+from ..extensions import db
+from ..models import CrawlJobEvent
+from .lotto_fetcher import add_wait_listener, remove_wait_listener
+
+# 링 버퍼 크기 (전체 작업 합계)
+EVENT_BUFFER_SIZE = 2000
+# 이 개수마다 오래된 이벤트 삭제
+PRUNE_EVERY = 100
+# 처리 속도 계산에 쓰는 최근 회차 수
+RATE_WINDOW = 50
+
+# SSE 스트림 설정
+STREAM_POLL_INTERVAL = 0.5
+STREAM_SNAPSHOT_INTERVAL = 5.0  # 이벤트가 없어도 진행 상황을 보내는 간격 (경과 시간 갱신)
+STREAM_MAX_SECONDS = 300  # 연결을 닫고 재연결시킴 (브라우저가 Last-Event-ID로 이어 받음)
+STREAM_RETRY_MS = 2000
+
+
+def emit(app: Flask, job_id: int, event: str, **data) -> Optional[int]:
+    """이벤트 기록 (실패해도 수집에는 영향 없음). 이벤트 ID 반환"""
+    try:
+        with app.app_context():
+            with db.engine.begin() as connection:
+                event_id = connection.execute(CrawlJobEvent.__table__.insert().values(
+                    job_id=job_id, event=event, data=json.dumps(data, ensure_ascii=False),
+                    created_at=datetime.utcnow(),
+                )).inserted_primary_key[0]
+                if event_id % PRUNE_EVERY == 0:
+                    connection.execute(CrawlJobEvent.__table__.delete().where(
+                        CrawlJobEvent.id <= event_id - EVENT_BUFFER_SIZE
+                    ))
+        return event_id
+    except Exception as exc:
+        print(f"작업 이벤트 기록 실패: {type(exc).__name__}: {exc}")
+        return None
+
+
+def latest_event_id() -> int:
+    return db.session.query(func.max(CrawlJobEvent.id)).scalar() or 0
+
+
+def events_after(last_event_id: int, limit: int = 200) -> List[Dict]:
+    rows = CrawlJobEvent.query.filter(CrawlJobEvent.id > last_event_id).order_by(CrawlJobEvent.id).limit(limit)
+    return [
+        {"id": row.id, "job_id": row.job_id, "event": row.event, "data": json.loads(row.data),
+         "created_at": row.created_at.isoformat()}
+        for row in rows
+    ]
+
+
+class JobProgressTracker:
+    """
+    run_job에서 쓰는 이벤트 기록기
+
+    최근 RATE_WINDOW개 회차의 처리 시간으로 속도와 남은 시간을 계산하고,
+    수집기의 요청 간격 대기는 합산해 회차 완료 이벤트에 포함한다. 재시도
+    대기는 바로 이벤트로 기록한다.
+    """
+
+    def __init__(self, app: Flask, job_id: int, remaining_rounds: int):
+        self.app = app
+        self.job_id = job_id
+        self.remaining_rounds = remaining_rounds
+        self._durations = deque(maxlen=RATE_WINDOW)
+        self._round_started: Optional[float] = None
+        self._lock = threading.Lock()
+        self._wait_count = 0
+        self._wait_seconds = 0.0
+
+    def __enter__(self) -> "JobProgressTracker":
+        add_wait_listener(self._on_wait)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        remove_wait_listener(self._on_wait)
+
+    def _on_wait(self, reason: str, seconds: float, detail: Dict) -> None:
+        if reason == "rate_limit":
+            with self._lock:
+                self._wait_count += 1
+                self._wait_seconds += seconds
+        else:
+            self.emit(reason, seconds=round(seconds, 2), **detail)
+
+    def _take_waits(self) -> Dict:
+        with self._lock:
+            waits = {"count": self._wait_count, "seconds": round(self._wait_seconds, 2)}
+            self._wait_count = 0
+            self._wait_seconds = 0.0
+        return waits
+
+    def emit(self, event: str, **data) -> Optional[int]:
+        return emit(self.app, self.job_id, event, **data)
+
+    def rate(self) -> Dict:
+        """최근 회차 기준 처리 속도(회차/초)와 남은 시간(초)"""
+        elapsed = sum(self._durations)
+        if not self._durations or elapsed <= 0:
+            return {"rounds_per_second": None, "eta_seconds": None}
+        per_second = len(self._durations) / elapsed
+        return {"rounds_per_second": round(per_second, 3),
+                "eta_seconds": int(self.remaining_rounds / per_second)}
+
+    def round_started(self, round_no: int) -> None:
+        self._round_started = time.monotonic()
+        self.emit("round_started", round=round_no)
+
+    def round_finished(self, round_no: int, completed: int, total: int, error: Optional[str] = None,
+                       **result) -> Dict:
+        duration = time.monotonic() - self._round_started if self._round_started else 0.0
+        self._durations.append(duration)
+        self.remaining_rounds = max(0, self.remaining_rounds - 1)
+        rate = self.rate()
+        data = {"round": round_no, "seconds": round(duration, 3), "completed": completed, "total": total,
+                "rate_limit_waits": self._take_waits(), **rate, **result}
+        if error:
+            self.emit("round_failed", error=error, **data)
+        else:
+            self.emit("round_completed", **data)
+        return rate
+
+
+def format_sse(event: str, data: Dict, event_id: Optional[int] = None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def event_stream(last_event_id: Optional[int], progress, poll_interval: float = STREAM_POLL_INTERVAL,
+                 max_seconds: float = STREAM_MAX_SECONDS) -> Iterator[str]:
+    """
+    SSE 스트림 (요청/앱 컨텍스트 안에서 실행)
+
+    처음에 현재 진행 상황("progress")을 보내고, 이후 새 작업 이벤트와 갱신된
+    진행 상황을 보낸다. last_event_id가 없으면 지금 이후의 이벤트만 보내고,
+    있으면 링 버퍼에 남아 있는 그 다음 이벤트부터 보낸다.
+
+    Args:
+        progress: 현재 진행 상황 dict를 반환하는 함수 (job_queue.get_progress)
+    """
+    newest = latest_event_id()
+    # 버퍼가 비워져 ID가 다시 시작된 경우 처음부터
+    cursor = newest if last_event_id is None or last_event_id > newest else last_event_id
+
+    yield f"retry: {STREAM_RETRY_MS}\n\n"
+    yield format_sse("progress", progress())
+    db.session.remove()
+
+    started = last_snapshot = time.monotonic()
+    while time.monotonic() - started < max_seconds:
+        events = events_after(cursor)
+        for item in events:
+            cursor = item["id"]
+            yield format_sse(item["event"], {"job_id": item["job_id"], "created_at": item["created_at"],
+                                             **item["data"]}, item["id"])
+        now = time.monotonic()
+        if events or now - last_snapshot >= STREAM_SNAPSHOT_INTERVAL:
+            yield format_sse("progress", progress())
+            last_snapshot = now
+        # 대기 중에는 DB 연결을 반납
+        db.session.remove()
+        time.sleep(poll_interval)
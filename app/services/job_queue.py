@@ -0,0 +1,477 @@
+"""
+크롤링 작업 큐
+
+수집 요청은 crawl_jobs 테이블에 작업으로 등록되고, 워커가 하나씩 가져가 실행한다.
+진행 상황/중지 요청/체크포인트가 모두 DB에 있으므로 여러 웹 프로세스(gunicorn
+워커)에서 같은 진행 상황을 보고, 서버가 재시작되어도 마지막으로 반영된 회차
+다음부터 이어서 실행한다.
+
+워커:
+    - 외부 워커: scripts/job_worker.py (JOB_WORKER="external")
+    - 내장 워커: 작업 등록/진행 조회 시 웹 프로세스 안에서 데몬 스레드로 시작 (기본값)
+
+작업 가져가기는 "실행 중인 작업이 없을 때만 queued -> running" 조건의 UPDATE 한 문장이라
+워커가 여러 개여도 한 번에 한 작업만 실행된다. heartbeat가 STALE_AFTER 이상 멈춘
+running 작업(워커 종료)은 다시 queued로 돌려 체크포인트부터 재개한다. 실행 중인 워커는
+미리받기 중에도 HEARTBEAT_INTERVAL마다 heartbeat를 갱신하고, 체크포인트는 작업이 아직
+자기 것(worker_id, running)일 때만 커밋한다. 다른 워커가 가져갔으면 그 자리에서 멈춘다.
+"""
+import json
+import os
+import socket
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from flask import Flask, current_app
+from sqlalchemy import text
+
+from ..extensions import db
+from ..models import CrawlJob
+from .async_fetcher import DEFAULT_CONCURRENCY, DEFAULT_RATE
+from .job_events import JobProgressTracker, emit as emit_event
+from .feature_store import refresh_feature_store
+from .leaderboards import refresh_leaderboards
+from .updater import find_missing_rounds, perform_update, prefetch_rounds
+
+KINDS = ("single", "range", "missing")
+ACTIVE_STATUSES = ("queued", "running")
+
+# heartbeat가 이 시간 이상 갱신되지 않은 running 작업은 워커가 죽은 것으로 보고 재개
+STALE_AFTER = timedelta(minutes=5)
+# 미리받기(asyncio 수집기) 단위. 이 단위마다 중지 요청을 확인
+PREFETCH_CHUNK = 50
+# 미리받기 중 heartbeat 갱신 간격 (STALE_AFTER보다 충분히 짧게)
+HEARTBEAT_INTERVAL = timedelta(seconds=30)
+# 끝난 작업의 결과를 진행 상황에 보여 주는 시간 (이후에는 "대기중")
+RESULT_VISIBLE_FOR = timedelta(minutes=1)
+# metrics에 남기는 실패 회차 수
+MAX_RECORDED_FAILURES = 50
+
+DEFAULT_POLL_INTERVAL = 2.0
+
+
+class JobConflict(Exception):
+    """이미 대기 중이거나 실행 중인 작업이 있는 경우"""
+
+
+class JobLost(Exception):
+    """실행 중인 작업을 다른 워커가 가져간 경우 (heartbeat가 끊겨 재할당됨)"""
+
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _load_json(value: Optional[str], default):
+    return json.loads(value) if value else default
+
+
+def get_active_job() -> Optional[CrawlJob]:
+    return CrawlJob.query.filter(CrawlJob.status.in_(ACTIVE_STATUSES)).order_by(CrawlJob.id).first()
+
+
+def enqueue_job(kind: str, operation_type: str, data_type: str = 'both', start_round: Optional[int] = None,
+                end_round: Optional[int] = None, created_by: Optional[int] = None,
+                revalidate_shops: bool = False) -> CrawlJob:
+    """
+    작업 등록
+
+    Args:
+        kind: single(start_round 한 회차), range(start_round~end_round), missing(실행 시 누락 회차 계산)
+        revalidate_shops: 이미 저장된 당첨점 페이지도 조건부 요청으로 다시 확인 (perform_update)
+
+    Raises:
+        JobConflict: 대기 중이거나 실행 중인 작업이 있는 경우
+    """
+    if kind not in KINDS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    if get_active_job() is not None:
+        raise JobConflict("크롤링이 이미 실행중입니다")
+
+    if kind == "single":
+        end_round = start_round
+    total_rounds = end_round - start_round + 1 if kind != "missing" else 0
+    job = CrawlJob(
+        kind=kind,
+        operation_type=operation_type,
+        data_type=data_type,
+        revalidate_shops=revalidate_shops,
+        start_round=start_round,
+        end_round=end_round,
+        total_rounds=total_rounds,
+        status="queued",
+        status_message="작업 대기열 등록됨",
+        created_by=created_by,
+    )
+    db.session.add(job)
+    db.session.commit()
+    emit_event(current_app._get_current_object(), job.id, "job_queued", kind=kind, operation_type=operation_type,
+               total=total_rounds)
+    _wake_event.set()
+    return job
+
+
+def cancel_job(job_id: Optional[int] = None) -> Optional[CrawlJob]:
+    """
+    작업 중지 요청 (job_id 생략 시 현재 작업)
+
+    대기 중인 작업은 바로 cancelled, 실행 중인 작업은 워커가 다음 회차 전에 멈춘다.
+    중지할 작업이 없으면 None
+    """
+    job = db.session.get(CrawlJob, job_id) if job_id else get_active_job()
+    if job is None or not job.is_active:
+        return None
+    if job.status == "queued":
+        job.status = "cancelled"
+        job.status_message = "중지됨"
+        job.finished_at = datetime.utcnow()
+    else:
+        job.cancel_requested = True
+        job.status_message = "중지 요청됨..."
+    db.session.commit()
+    emit_event(current_app._get_current_object(), job.id, "cancel_requested", status=job.status)
+    return job
+
+
+def requeue_stale_jobs(now: Optional[datetime] = None) -> int:
+    """heartbeat가 끊긴 running 작업을 queued로 되돌림 (체크포인트부터 재개)"""
+    cutoff = (now or datetime.utcnow()) - STALE_AFTER
+    count = CrawlJob.query.filter(
+        CrawlJob.status == "running",
+        db.or_(CrawlJob.heartbeat_at.is_(None), CrawlJob.heartbeat_at < cutoff),
+    ).update({"status": "queued", "worker_id": None, "status_message": "재개 대기중"}, synchronize_session=False)
+    db.session.commit()
+    return count
+
+
+def claim_next_job(worker_id: str) -> Optional[int]:
+    """가장 오래된 대기 작업을 가져감 (실행 중인 작업이 있으면 None)"""
+    requeue_stale_jobs()
+    candidate = db.session.query(CrawlJob.id).filter_by(status="queued").order_by(CrawlJob.id).first()
+    if candidate is None:
+        return None
+
+    now = datetime.utcnow()
+    claimed = db.session.execute(text(
+        "UPDATE crawl_jobs SET status = 'running', worker_id = :worker_id, heartbeat_at = :now, "
+        "started_at = COALESCE(started_at, :now), attempts = attempts + 1 "
+        "WHERE id = :id AND status = 'queued' "
+        "AND NOT EXISTS (SELECT 1 FROM crawl_jobs WHERE status = 'running')"
+    ), {"worker_id": worker_id, "now": now, "id": candidate.id}).rowcount
+    db.session.commit()
+    return candidate.id if claimed else None
+
+
+def _job_rounds(job: CrawlJob) -> List[int]:
+    if job.kind == "missing":
+        if job.rounds is None:
+            # 누락 회차는 처음 실행할 때 한 번만 계산 (재개 시 같은 목록 사용)
+            job.status_message = "누락 회차 확인중"
+            db.session.commit()
+            rounds = find_missing_rounds()
+            job.rounds = json.dumps(rounds)
+            job.total_rounds = len(rounds)
+            db.session.commit()
+        return _load_json(job.rounds, [])
+    return list(range(job.start_round, job.end_round + 1))
+
+
+def _cancel_requested(job_id: int) -> bool:
+    return bool(db.session.query(CrawlJob.cancel_requested).filter_by(id=job_id).scalar())
+
+
+def _commit_if_owner(job: CrawlJob, worker_id: Optional[str]) -> None:
+    """
+    heartbeat를 갱신하고 작업이 아직 이 워커의 running 작업일 때만 커밋
+
+    소유권 확인 UPDATE를 대기 중인 변경보다 먼저 같은 트랜잭션에서 실행하므로(SQLite
+    쓰기 잠금), 다른 워커가 가져간 뒤에는 체크포인트나 종료 상태가 덮어써지지 않는다.
+
+    Raises:
+        JobLost: 작업이 재할당되었거나 더 이상 running이 아닌 경우 (변경은 롤백)
+    """
+    now = datetime.utcnow()
+    job.heartbeat_at = now
+    with db.session.no_autoflush:
+        owned = db.session.execute(text(
+            "UPDATE crawl_jobs SET heartbeat_at = :now "
+            "WHERE id = :id AND worker_id IS :worker_id AND status = 'running'"
+        ), {"now": now, "id": job.id, "worker_id": worker_id}).rowcount
+    if not owned:
+        db.session.rollback()
+        raise JobLost(f"작업 {job.id}을 다른 워커가 가져갔습니다")
+    db.session.commit()
+
+
+def _merge_prefetch(metrics: Dict, stats: Optional[Dict]) -> None:
+    if not stats:
+        return
+    totals = metrics.setdefault("prefetch", {})
+    for key, value in stats.items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            totals[key] = totals.get(key, 0) + value
+        else:
+            totals[key] = value
+
+
+def run_job(job_id: int, prefetch: bool = True, concurrency: int = DEFAULT_CONCURRENCY,
+            rate: float = DEFAULT_RATE) -> CrawlJob:
+    """
+    가져간 작업 실행
+
+    회차마다 중지 요청을 확인하고, 반영이 끝난 회차를 last_completed_round에
+    커밋한다. 개별 회차 실패는 기록만 하고 다음 회차로 넘어간다.
+    prefetch=True이면 PREFETCH_CHUNK 단위로 응답을 미리 받아 캐시한다 (updater.prefetch_rounds).
+    진행 이벤트는 job_events에 기록한다.
+
+    커밋은 작업이 아직 이 워커의 것일 때만 한다 (_commit_if_owner). 다른 워커가
+    가져갔으면 아무것도 바꾸지 않고 멈춘다.
+    """
+    job = db.session.get(CrawlJob, job_id)
+    owner = job.worker_id
+    metrics = _load_json(job.metrics, {})
+    failures = metrics.setdefault("failures", [])
+    tracker = JobProgressTracker(current_app._get_current_object(), job.id, 0)
+
+    try:
+        with tracker:
+            rounds = _job_rounds(job)
+            if job.kind == "missing" and not rounds:
+                _finish(job, metrics, "completed", "누락된 회차 없음", tracker, owner)
+                return job
+
+            # 체크포인트 다음 회차부터 (회차 목록은 오름차순)
+            checkpoint = job.last_completed_round
+            remaining = [r for r in rounds if checkpoint is None or r > checkpoint]
+            tracker.remaining_rounds = len(remaining)
+            tracker.emit("job_started", kind=job.kind, operation_type=job.operation_type, total=job.total_rounds,
+                         remaining=len(remaining), resumed_after=checkpoint, attempt=job.attempts)
+
+            for offset in range(0, len(remaining), PREFETCH_CHUNK):
+                chunk = remaining[offset:offset + PREFETCH_CHUNK]
+                if _cancel_requested(job.id):
+                    break
+                if prefetch and len(chunk) > 1:
+                    last_beat = datetime.utcnow()
+
+                    def heartbeat(_round_no: int) -> None:
+                        # 느린 속도에서는 미리받기 한 번이 STALE_AFTER를 넘을 수 있으므로 중간에 갱신
+                        nonlocal last_beat
+                        if datetime.utcnow() - last_beat >= HEARTBEAT_INTERVAL:
+                            _commit_if_owner(job, owner)
+                            last_beat = datetime.utcnow()
+
+                    stats = prefetch_rounds(chunk, job.data_type, concurrency, rate, on_round=heartbeat)
+                    _merge_prefetch(metrics, stats)
+                    if stats:
+                        tracker.emit("prefetch", first_round=chunk[0], last_round=chunk[-1], **stats)
+
+                for round_no in chunk:
+                    if _cancel_requested(job.id):
+                        break
+                    job.current_round = round_no
+                    job.status_message = f"{round_no}회 수집중"
+                    _commit_if_owner(job, owner)
+                    tracker.round_started(round_no)
+
+                    error = None
+                    result = {"draw_updated": False, "shops_updated": False}
+                    try:
+                        result = perform_update(round_no, job.data_type, refresh_boards=False,
+                                                revalidate_shops=job.revalidate_shops, refresh_features=False)
+                        job.draws_updated += int(result["draw_updated"])
+                        job.shops_updated += int(result["shops_updated"])
+                    except Exception as exc:
+                        db.session.rollback()
+                        error = f"{type(exc).__name__}: {exc}"
+                        job.failed_rounds += 1
+                        if len(failures) < MAX_RECORDED_FAILURES:
+                            failures.append({"round": round_no, "error": error})
+
+                    job.completed_rounds += 1
+                    job.last_completed_round = round_no
+                    job.status_message = f"{round_no}회 완료"
+                    metrics.update(tracker.round_finished(
+                        round_no, job.completed_rounds, job.total_rounds, error,
+                        draw_updated=result["draw_updated"], shops_updated=result["shops_updated"],
+                    ))
+                    job.metrics = json.dumps(metrics)
+                    _commit_if_owner(job, owner)
+
+            if job.shops_updated:
+                refresh_leaderboards()
+            if job.draws_updated:
+                _refresh_feature_store()
+
+            if job.completed_rounds < job.total_rounds and _cancel_requested(job.id):
+                _finish(job, metrics, "cancelled", "중지됨", tracker, owner)
+            elif job.total_rounds and job.failed_rounds == job.total_rounds:
+                _finish(job, metrics, "failed", f"오류: {failures[-1]['error']}" if failures else "오류", tracker,
+                        owner)
+            elif job.kind == "single":
+                _finish(job, metrics, "completed", f"{job.start_round}회 완료", tracker, owner)
+            else:
+                _finish(job, metrics, "completed", "누락 회차 완료" if job.kind == "missing" else "모든 회차 완료",
+                        tracker, owner)
+    except JobLost as exc:
+        # 작업은 새 워커가 체크포인트부터 이어서 실행한다
+        print(f"Crawl job {job_id}: {exc}")
+    except Exception as exc:
+        db.session.rollback()
+        job.error = f"{type(exc).__name__}: {exc}"
+        try:
+            _finish(job, metrics, "failed", f"오류: {exc}", tracker, owner)
+        except JobLost as lost:
+            print(f"Crawl job {job_id}: {lost}")
+    return job
+
+
+def _refresh_feature_store() -> None:
+    """조합 특성 저장소가 있으면 새 회차를 반영해 다시 빌드 (실패해도 작업 결과에는 영향 없음)"""
+    try:
+        refresh_feature_store()
+    except Exception as exc:
+        print(f"조합 특성 저장소 갱신 실패: {type(exc).__name__}: {exc}")
+
+
+def _finish(job: CrawlJob, metrics: Dict, status: str, message: str, tracker: JobProgressTracker,
+            owner: Optional[str]) -> None:
+    job.status = status
+    job.status_message = message
+    job.finished_at = datetime.utcnow()
+    metrics.update(rounds_per_second=None, eta_seconds=None)
+    if job.started_at and job.completed_rounds:
+        elapsed = (job.finished_at - job.started_at).total_seconds()
+        metrics["elapsed_seconds"] = round(elapsed, 1)
+        metrics["seconds_per_round"] = round(elapsed / job.completed_rounds, 3)
+    job.metrics = json.dumps(metrics)
+    _commit_if_owner(job, owner)
+    tracker.emit("job_finished", status=status, message=message, completed=job.completed_rounds,
+                 total=job.total_rounds, failed_rounds=job.failed_rounds, draws_updated=job.draws_updated,
+                 shops_updated=job.shops_updated, error=job.error)
+
+
+def job_to_dict(job: CrawlJob) -> Dict:
+    def iso(value):
+        return value.isoformat() if value else None
+
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "operation_type": job.operation_type,
+        "data_type": job.data_type,
+        "revalidate_shops": job.revalidate_shops,
+        "status": job.status,
+        "status_message": job.status_message,
+        "start_round": job.start_round,
+        "end_round": job.end_round,
+        "total_rounds": job.total_rounds,
+        "completed_rounds": job.completed_rounds,
+        "current_round": job.current_round,
+        "last_completed_round": job.last_completed_round,
+        "cancel_requested": job.cancel_requested,
+        "draws_updated": job.draws_updated,
+        "shops_updated": job.shops_updated,
+        "failed_rounds": job.failed_rounds,
+        "attempts": job.attempts,
+        "metrics": _load_json(job.metrics, {}),
+        "error": job.error,
+        "worker_id": job.worker_id,
+        "created_at": iso(job.created_at),
+        "started_at": iso(job.started_at),
+        "heartbeat_at": iso(job.heartbeat_at),
+        "finished_at": iso(job.finished_at),
+    }
+
+
+def get_progress(now: Optional[datetime] = None) -> Dict:
+    """/api/crawling-progress 응답 (가장 최근 작업 기준)"""
+    now = now or datetime.utcnow()
+    job = CrawlJob.query.order_by(CrawlJob.id.desc()).first()
+    if job is None or (not job.is_active and (job.finished_at is None or now - job.finished_at > RESULT_VISIBLE_FOR)):
+        return {
+            "is_running": False, "should_stop": False, "current_round": 0, "total_rounds": 0,
+            "completed_rounds": 0, "status": "대기중", "start_time": None, "operation_type": "",
+            "elapsed_seconds": 0, "estimated_remaining_seconds": 0, "job": None,
+        }
+
+    elapsed = 0
+    remaining = 0
+    if job.is_active and job.started_at:
+        elapsed = max(0, int((now - job.started_at).total_seconds()))
+        eta = _load_json(job.metrics, {}).get("eta_seconds")
+        if eta is not None:
+            # 최근 회차 처리 속도 기준 (재개/대기 시간이 섞인 전체 평균보다 정확)
+            remaining = eta
+        elif job.completed_rounds > 0 and job.total_rounds > 0:
+            remaining = int(elapsed / job.completed_rounds * (job.total_rounds - job.completed_rounds))
+
+    return {
+        "is_running": job.is_active,
+        "should_stop": job.cancel_requested,
+        "current_round": job.current_round or 0,
+        "total_rounds": job.total_rounds,
+        "completed_rounds": job.completed_rounds,
+        "status": job.status_message or job.status,
+        "start_time": (job.started_at - datetime(1970, 1, 1)).total_seconds() if job.started_at else None,
+        "operation_type": job.operation_type,
+        "elapsed_seconds": elapsed,
+        "estimated_remaining_seconds": remaining,
+        "job": job_to_dict(job),
+    }
+
+
+def recent_jobs(limit: int = 20) -> List[Dict]:
+    return [job_to_dict(job) for job in CrawlJob.query.order_by(CrawlJob.id.desc()).limit(limit)]
+
+
+# --- worker ----------------------------------------------------------------
+
+_wake_event = threading.Event()
+_embedded_lock = threading.Lock()
+_embedded_thread: Optional[threading.Thread] = None
+
+
+def run_worker(app: Flask, poll_interval: float = DEFAULT_POLL_INTERVAL, once: bool = False,
+               stop_event: Optional[threading.Event] = None, **run_options) -> None:
+    """
+    작업을 가져가 실행하는 루프
+
+    Args:
+        once: 대기 작업이 없으면 바로 종료 (cron 등에서 사용)
+        run_options: run_job에 전달 (prefetch, concurrency, rate)
+    """
+    worker_id = worker_name()
+    while stop_event is None or not stop_event.is_set():
+        with app.app_context():
+            try:
+                job_id = claim_next_job(worker_id)
+                if job_id is not None:
+                    run_job(job_id, **run_options)
+            except Exception as exc:
+                db.session.rollback()
+                job_id = None
+                print(f"Crawl job worker error: {type(exc).__name__}: {exc}")
+            finally:
+                db.session.remove()
+        if job_id is not None:
+            continue
+        if once:
+            return
+        _wake_event.wait(poll_interval)
+        _wake_event.clear()
+
+
+def ensure_embedded_worker(app: Flask) -> None:
+    """웹 프로세스 안의 워커 스레드 시작 (JOB_WORKER="external"이면 아무것도 하지 않음)"""
+    global _embedded_thread
+    if app.config.get("JOB_WORKER", "embedded") != "embedded":
+        return
+    with _embedded_lock:
+        if _embedded_thread is not None and _embedded_thread.is_alive():
+            return
+        _embedded_thread = threading.Thread(
+            target=run_worker, args=(app,), name="crawl-job-worker", daemon=True
+        )
+        _embedded_thread.start()
@@ -0,0 +1,153 @@
+"""
+당첨점/지역 순위 사전 계산
+
+당첨점 수집 후 (level, rank, window) 조합별 순위를 계산해 shop_leaderboards에
+JSON으로 저장한다. 통계 API는 board_key 하나로 바로 조회한다 (조회 경로에서는
+계산/정규화하지 않는다. 수집 경로, scripts/migrate.py, scripts/normalize_shops.py가 갱신).
+"""
+import json
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from ..extensions import db
+from ..models import Shop, ShopLeaderboard, WinningShop
+from .shop_normalizer import ensure_shops_normalized
+
+LEVELS = ('totals', 'sido', 'sigungu', 'shop')
+RANKS = (0, 1, 2)  # 0=전체
+
+# 집계 기간: 회차 수 (매주 1회 추첨이므로 52회차 = 최근 52주), None=전체
+WINDOWS = {
+    'all': None,
+    '52w': 52,
+}
+
+# 저장할 순위 개수
+REGION_LIMIT = 30
+SHOP_LIMIT = 50
+
+
+def board_key(level: str, rank: int, window: str) -> str:
+    return f"{level}:{rank}:{window}"
+
+
+def _region_entries(filters: List, with_sigungu: bool) -> List[Dict]:
+    columns = [Shop.sido, Shop.sigungu] if with_sigungu else [Shop.sido]
+    rows = db.session.query(
+        *columns, db.func.count(WinningShop.id).label('count')
+    ).join(
+        Shop, WinningShop.shop_id == Shop.id
+    ).filter(*filters).group_by(*columns).order_by(
+        db.func.count(WinningShop.id).desc(), *columns
+    ).limit(REGION_LIMIT).all()
+
+    entries = []
+    for row in rows:
+        region = row.sido or "알 수 없음"
+        if with_sigungu:
+            region = f"{region} {row.sigungu}" if row.sigungu else region
+        entries.append({"region": region, "sido": row.sido, "sigungu": row.sigungu if with_sigungu else None,
+                        "count": row.count})
+    return entries
+
+
+def _shop_entries(filters: List) -> List[Dict]:
+    # 여러 번 당첨된 판매점만 (rank, shop_id) 인덱스로 집계
+    win_counts = db.session.query(
+        WinningShop.shop_id,
+        db.func.count().label('win_count'),
+        db.func.max(WinningShop.round).label('last_round')
+    ).filter(
+        WinningShop.shop_id.isnot(None), *filters
+    ).group_by(WinningShop.shop_id).having(db.func.count() > 1).subquery()
+
+    rows = db.session.query(
+        Shop, win_counts.c.win_count, win_counts.c.last_round
+    ).join(
+        win_counts, win_counts.c.shop_id == Shop.id
+    ).order_by(win_counts.c.win_count.desc(), win_counts.c.last_round.desc(), Shop.id).limit(SHOP_LIMIT).all()
+
+    return [
+        {
+            "shop_id": shop.id,
+            "name": shop.name,
+            "address": shop.address,
+            "sido": shop.sido,
+            "sigungu": shop.sigungu,
+            "win_count": win_count,
+            "last_round": last_round
+        }
+        for shop, win_count, last_round in rows
+    ]
+
+
+def _totals_entry(filters: List) -> Dict:
+    counts = dict(db.session.query(
+        WinningShop.rank, db.func.count()
+    ).filter(*filters).group_by(WinningShop.rank).all())
+    return {
+        "total_shops": sum(counts.values()),
+        "rank1_shops": counts.get(1, 0),
+        "rank2_shops": counts.get(2, 0)
+    }
+
+
+def refresh_leaderboards() -> Dict:
+    """
+    모든 (level, rank, window) 순위를 다시 계산해 저장
+
+    Returns:
+        {'boards': 저장한 순위 수, 'through_round': 마지막 회차}
+    """
+    ensure_shops_normalized()
+
+    latest_round = db.session.query(db.func.max(WinningShop.round)).scalar()
+    existing = {board.board_key: board for board in ShopLeaderboard.query.all()}
+    now = datetime.utcnow()
+    saved = 0
+
+    def save(level: str, rank: int, window: str, entries):
+        nonlocal saved
+        key = board_key(level, rank, window)
+        board = existing.get(key)
+        if board is None:
+            board = ShopLeaderboard(board_key=key, level=level, rank=rank, window=window)
+            db.session.add(board)
+        board.entries = json.dumps(entries, ensure_ascii=False)
+        board.through_round = latest_round
+        board.updated_at = now
+        saved += 1
+
+    for window, rounds in WINDOWS.items():
+        window_filters = []
+        if rounds and latest_round:
+            window_filters.append(WinningShop.round > latest_round - rounds)
+
+        save('totals', 0, window, _totals_entry(window_filters))
+        for rank in RANKS:
+            filters = window_filters + ([WinningShop.rank == rank] if rank else [])
+            save('sido', rank, window, _region_entries(filters, with_sigungu=False))
+            save('sigungu', rank, window, _region_entries(filters, with_sigungu=True))
+            save('shop', rank, window, _shop_entries(filters))
+
+    db.session.commit()
+    return {'boards': saved, 'through_round': latest_round}
+
+
+def get_leaderboards(*keys: str) -> Dict[str, Optional[Dict]]:
+    """
+    board_key별 저장된 순위 조회 (아직 계산되지 않은 순위는 None)
+
+    Returns:
+        {board_key: {'entries', 'through_round', 'updated_at'} 또는 None}
+    """
+    boards = {board.board_key: board for board in ShopLeaderboard.query.filter(ShopLeaderboard.board_key.in_(keys))}
+
+    return {
+        key: {
+            "entries": json.loads(boards[key].entries),
+            "through_round": boards[key].through_round,
+            "updated_at": boards[key].updated_at.isoformat()
+        } if key in boards else None
+        for key in keys
+    }
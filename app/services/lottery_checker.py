@@ -1,6 +1,32 @@
 from typing import List, Tuple, Optional
+
+import numpy as np
+from sqlalchemy import case, func, update
+
 from ..models import Draw, Purchase
 from ..extensions import db
+from .combinations import numbers_to_mask, popcount, tickets_to_masks
+
+# 등수별 예상 당첨금 (실제 배당금이 없을 때 사용)
+ESTIMATED_PRIZES = {
+    1: 2000000000,  # 20억 (예상값)
+    2: 100000000,   # 1억 (예상값)
+    3: 1500000,     # 150만원 (예상값)
+    4: 50000,       # 5만원
+    5: 5000,        # 5천원
+}
+
+# 등수 -> Draw의 실제 1게임당 당첨금 컬럼
+PRIZE_COLUMNS = {
+    1: Draw.first_prize_amount,
+    2: Draw.second_prize_amount,
+    3: Draw.third_prize_amount,
+    4: Draw.fourth_prize_amount,
+    5: Draw.fifth_prize_amount,
+}
+
+# 맞춘 개수 -> 등수 (0=낙첨), 5개 일치는 보너스 여부로 2/3등 구분
+_RANK_BY_MATCH = np.array([0, 0, 0, 5, 4, 3, 1], dtype=np.int8)
 
 
 def check_winning_result(purchase_numbers: List[int], draw: Draw) -> Tuple[Optional[int], int, bool, Optional[int]]:
@@ -12,7 +38,7 @@ def check_winning_result(purchase_numbers: List[int], draw: Draw) -> Tuple[Optio
         winning_rank: 1~5등, None=낙첨
         matched_count: 맞춘 번호 개수
         bonus_matched: 보너스 번호 일치 여부
-        prize_amount: 당첨금 (실제 배당금은 API에서 가져와야 하므로 예상값)
+        prize_amount: 당첨금 (회차의 실제 배당금, 아직 없으면 예상값)
     """
     winning_numbers = draw.numbers_list()
     bonus_number = draw.bonus
@@ -29,27 +55,73 @@ def check_winning_result(purchase_numbers: List[int], draw: Draw) -> Tuple[Optio
 
     if matched_count == 6:
         winning_rank = 1
-        prize_amount = 2000000000  # 20억 (예상값)
     elif matched_count == 5 and bonus_matched:
         winning_rank = 2
-        prize_amount = 100000000   # 1억 (예상값)
     elif matched_count == 5:
         winning_rank = 3
-        prize_amount = 1500000     # 150만원 (예상값)
     elif matched_count == 4:
         winning_rank = 4
-        prize_amount = 50000       # 5만원
     elif matched_count == 3:
         winning_rank = 5
-        prize_amount = 5000        # 5천원
+
+    if winning_rank:
+        prize_amount = get_prize_amount(draw, winning_rank)
 
     return winning_rank, matched_count, bonus_matched, prize_amount
 
 
+def get_prize_amount(draw: Draw, rank: int) -> int:
+    """회차의 실제 등수별 당첨금 (수집 전이면 예상값)"""
+    amount = getattr(draw, PRIZE_COLUMNS[rank].key)
+    return amount if amount is not None else ESTIMATED_PRIZES[rank]
+
+
+def ranks_from_matches(matches: np.ndarray, bonus_hit: np.ndarray) -> np.ndarray:
+    """
+    맞춘 개수 배열과 보너스 번호 포함 여부로 등수 계산
+
+    Returns:
+        등수 int8 배열 (0=낙첨, 1~5등)
+    """
+    ranks = _RANK_BY_MATCH[matches]
+    ranks[(ranks == 3) & bonus_hit] = 2
+    return ranks
+
+
+def rank_masks(ticket_masks: np.ndarray, winning_masks: np.ndarray, bonus_masks: np.ndarray) -> np.ndarray:
+    """
+    비트마스크 단위 등수 계산 (티켓/당첨번호 배열은 브로드캐스트)
+
+    Returns:
+        등수 int8 배열 (0=낙첨, 1~5등)
+    """
+    return ranks_from_matches(popcount(ticket_masks & winning_masks), (ticket_masks & bonus_masks) != 0)
+
+
+def rank_tickets(ticket_masks: np.ndarray, winning_numbers: List[int], bonus_number: int) -> np.ndarray:
+    """
+    check_winning_result의 벡터화 버전 - 비트마스크 티켓 배열의 등수 계산
+
+    Args:
+        ticket_masks: 티켓별 uint64 비트마스크 (combinations.tickets_to_masks)
+
+    Returns:
+        티켓별 등수 int8 배열 (0=낙첨, 1~5등)
+    """
+    return rank_masks(
+        ticket_masks,
+        np.uint64(numbers_to_mask(winning_numbers)),
+        np.uint64(numbers_to_mask([bonus_number]))
+    )
+
+
 def update_purchase_results(purchase_round: int) -> int:
     """
     특정 회차의 모든 구매 기록에 대해 당첨 결과 업데이트
 
+    등수는 벡터화 체커로 한 번에 계산해 일괄 UPDATE하고, 당첨금은
+    reprice_purchases()로 회차의 실제 배당금 테이블과 조인해 채운다.
+
     Returns:
         업데이트된 구매 기록 수
     """
@@ -58,30 +130,71 @@ def update_purchase_results(purchase_round: int) -> int:
     if not draw:
         return 0
 
-    # 해당 회차의 미확인 구매 기록들 조회
-    purchases = Purchase.query.filter_by(
-        purchase_round=purchase_round,
-        result_checked=False
+    # 해당 회차의 미확인 구매 기록들 조회 (번호만)
+    rows = db.session.query(Purchase.id, Purchase.numbers).filter(
+        Purchase.purchase_round == purchase_round,
+        Purchase.result_checked == False
     ).all()
+    if not rows:
+        return 0
 
-    updated_count = 0
-    for purchase in purchases:
-        # 당첨 결과 확인
-        winning_rank, matched_count, bonus_matched, prize_amount = check_winning_result(
-            purchase.numbers_list(), draw
-        )
+    tickets = np.array([[int(x) for x in numbers.split(",") if x] for _, numbers in rows], dtype=np.int64)
+    masks = tickets_to_masks(tickets)
+    winning_mask = np.uint64(numbers_to_mask(draw.numbers_list()))
+    bonus_mask = np.uint64(numbers_to_mask([draw.bonus]))
 
-        # 결과 업데이트
-        purchase.result_checked = True
-        purchase.winning_rank = winning_rank
-        purchase.matched_count = matched_count
-        purchase.bonus_matched = bonus_matched
-        purchase.prize_amount = prize_amount
+    ranks = rank_masks(masks, winning_mask, bonus_mask)
+    matched = popcount(masks & winning_mask)
+    bonus_hits = (masks & bonus_mask) != 0
 
-        updated_count += 1
+    db.session.execute(update(Purchase), [
+        {
+            "id": purchase_id,
+            "result_checked": True,
+            "winning_rank": int(rank) or None,
+            "matched_count": int(match),
+            "bonus_matched": bool(bonus_hit),
+            "prize_amount": None,
+        }
+        for (purchase_id, _), rank, match, bonus_hit in zip(rows, ranks, matched, bonus_hits)
+    ])
+    reprice_purchases(purchase_round, commit=False)
 
     db.session.commit()
-    return updated_count
+    return len(rows)
+
+
+def reprice_purchases(purchase_round: Optional[int] = None, commit: bool = True) -> int:
+    """
+    확인된 당첨 구매 기록의 당첨금을 회차의 실제 배당금으로 다시 계산
+
+    purchases와 draws를 조인하는 UPDATE ... FROM 한 문장으로 처리한다.
+    배당금이 아직 없는 등수는 ESTIMATED_PRIZES를 사용하므로, 나중에 배당금이
+    수집되면 다시 호출해 소급 적용한다.
+
+    Args:
+        purchase_round: 대상 회차 (None이면 전체 회차)
+
+    Returns:
+        갱신된 구매 기록 수
+    """
+    prize = case(
+        *[(Purchase.winning_rank == rank, func.coalesce(column, ESTIMATED_PRIZES[rank]))
+          for rank, column in PRIZE_COLUMNS.items()],
+        else_=None
+    )
+    stmt = update(Purchase).where(
+        Purchase.purchase_round == Draw.round,
+        Purchase.result_checked == True,
+        Purchase.winning_rank.isnot(None)
+    ).values(prize_amount=prize).execution_options(synchronize_session=False)
+    if purchase_round is not None:
+        stmt = stmt.where(Purchase.purchase_round == purchase_round)
+
+    updated = db.session.execute(stmt).rowcount
+    if commit:
+        db.session.commit()
+    return updated
 
 
 def get_purchase_statistics(user_id: int = None) -> dict:
@@ -131,21 +244,21 @@ def get_recent_purchases_with_results(limit: int = 20) -> List[Purchase]:
 
 def check_all_pending_results() -> dict:
     """모든 미확인 결과를 확인하고 업데이트"""
-    # 결과가 확인되지 않은 구매 기록들의 회차 목록
-    pending_rounds = db.session.query(Purchase.purchase_round).filter_by(
-        result_checked=False
+    # 결과가 확인되지 않은 구매 기록 중 당첨 번호가 있는 회차 목록
+    pending_rounds = db.session.query(Purchase.purchase_round).join(
+        Draw, Draw.round == Purchase.purchase_round
+    ).filter(
+        Purchase.result_checked == False
     ).distinct().all()
 
     total_updated = 0
     updated_rounds = []
 
     for (round_no,) in pending_rounds:
-        # 해당 회차의 당첨 번호가 있는지 확인
-        if Draw.query.filter_by(round=round_no).first():
-            updated = update_purchase_results(round_no)
-            if updated > 0:
-                total_updated += updated
-                updated_rounds.append(round_no)
+        updated = update_purchase_results(round_no)
+        if updated > 0:
+            total_updated += updated
+            updated_rounds.append(round_no)
 
     return {
         "total_updated": total_updated,
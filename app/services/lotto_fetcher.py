@@ -1,12 +1,19 @@
 from datetime import datetime
 from typing import Iterable, Callable, TypeVar, Optional, List, Dict
-import time
+import hashlib
+import json
+import re
 import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
-from bs4 import BeautifulSoup
+
+from .http_cache import DEFAULT_TTL, cached_get, is_round_closed
+from .shop_page_parser import parse_tables
 
 # DNS 설정 최적화 (한국 DNS 서버 사용)
 try:
@@ -43,8 +50,15 @@ READ_TIMEOUT = 60
 # 요청 간격 설정 (서버 부하 방지)
 REQUEST_DELAY = 1.5  # 요청 간 1.5초 대기
 
+# 당첨점 페이지네이션
+MAX_SHOP_PAGES = 20  # 무한 루프 방지용 상한
+SHOP_PAGE_WORKERS = 4  # 페이지 동시 요청 수 (시작 간격은 _rate_limit이 보장)
+
 T = TypeVar("T")
 
+# 대기 알림 수신자 listener(reason, seconds, detail). reason: rate_limit(요청 간격), retry(재시도 대기)
+_wait_listeners: List[Callable[[str, float, Dict], None]] = []
+
 # 전역 세션 변수 (재사용을 위해)
 _global_session: Optional[requests.Session] = None
 
@@ -94,22 +108,46 @@ def _create_session() -> requests.Session:
     return session
 
 
-# 마지막 요청 시간 추적 (전역)
+# 마지막 요청 시간 추적 (전역, 여러 스레드가 공유)
 _last_request_time = 0.0
+_rate_limit_lock = threading.Lock()
+
+def add_wait_listener(listener: Callable[[str, float, Dict], None]) -> None:
+    _wait_listeners.append(listener)
+
+
+def remove_wait_listener(listener: Callable[[str, float, Dict], None]) -> None:
+    if listener in _wait_listeners:
+        _wait_listeners.remove(listener)
+
+
+def notify_wait(reason: str, seconds: float, **detail) -> None:
+    """요청 대기를 수신자에게 알림 (수신자 오류는 수집에 영향을 주지 않음)"""
+    for listener in list(_wait_listeners):
+        try:
+            listener(reason, seconds, detail)
+        except Exception as exc:
+            print(f"대기 알림 처리 실패: {type(exc).__name__}: {exc}")
+
 
 def _rate_limit():
-    """요청 간격 제한 (서버 부하 방지)"""
+    """요청 간격 제한 (서버 부하 방지)
+
+    스레드별로 다음 요청 시각을 예약하고 잠금 밖에서 대기하므로 동시 요청도
+    시작 간격은 REQUEST_DELAY 이상으로 유지된다.
+    """
     global _last_request_time
-    current_time = time.time()
-    elapsed = current_time - _last_request_time
+    with _rate_limit_lock:
+        current_time = time.time()
+        start_time = max(current_time, _last_request_time + REQUEST_DELAY)
+        _last_request_time = start_time
 
-    if elapsed < REQUEST_DELAY:
-        sleep_time = REQUEST_DELAY - elapsed
+    sleep_time = start_time - current_time
+    if sleep_time > 0:
         print(f"요청 간격 제한: {sleep_time:.1f}초 대기")
+        notify_wait("rate_limit", sleep_time)
         time.sleep(sleep_time)
 
-    _last_request_time = time.time()
-
 def _with_retries(fn: Callable[[], T], retries: int = 5, delay: float = 3.0) -> T:
     """재시도 로직 - 지수 백오프와 지연 시간 포함"""
     last_exc: Optional[Exception] = None
@@ -127,6 +165,7 @@ def _with_retries(fn: Callable[[], T], retries: int = 5, delay: float = 3.0) ->
             if attempt < retries - 1:  # 마지막 시도가 아닌 경우만 대기
                 wait_time = delay * (2 ** attempt)  # 지수 백오프
                 print(f"네트워크 오류로 재시도 {attempt + 1}/{retries}, {wait_time:.1f}초 후 재시도: {type(exc).__name__}: {str(exc)}")
+                notify_wait("retry", wait_time, attempt=attempt + 1, error=f"{type(exc).__name__}: {exc}")
                 time.sleep(wait_time)
             else:
                 print(f"모든 재시도 실패: {type(exc).__name__}: {str(exc)}")
@@ -135,6 +174,7 @@ def _with_retries(fn: Callable[[], T], retries: int = 5, delay: float = 3.0) ->
             if attempt < retries - 1:
                 wait_time = delay * (2 ** attempt)
                 print(f"요청 오류로 재시도 {attempt + 1}/{retries}, {wait_time:.1f}초 후 재시도: {type(exc).__name__}: {str(exc)}")
+                notify_wait("retry", wait_time, attempt=attempt + 1, error=f"{type(exc).__name__}: {exc}")
                 time.sleep(wait_time)
             else:
                 print(f"모든 재시도 실패 (요청 오류): {type(exc).__name__}: {str(exc)}")
@@ -147,20 +187,35 @@ def _with_retries(fn: Callable[[], T], retries: int = 5, delay: float = 3.0) ->
     raise last_exc
 
 
+def draw_response_ttl(resp) -> Optional[float]:
+    """추첨 결과 JSON 캐시 유효 시간: 추첨된 회차는 영구, 아직 없는 회차는 DEFAULT_TTL"""
+    try:
+        return None if resp.json().get("returnValue") == "success" else DEFAULT_TTL
+    except ValueError:
+        return 0
+
+
 def fetch_draw(round_no: int) -> Dict:
     """Fetch lotto draw info by round. Replace URL/parsing with real source later."""
     # Example placeholder using official API-like JSON endpoint if available.
     # Here we structure a mock example for wiring. Replace with actual endpoint.
     url = NUMBERS_URL.format(round=round_no)
-    def _req() -> Dict:
+    def _req():
         # 전역 세션 재사용
         session = get_session()
         # (연결 타임아웃, 읽기 타임아웃) 튜플로 지정
         resp = session.get(url, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT))
         resp.raise_for_status()
-        return resp.json()
+        resp.json()  # JSON이 아닌 응답(점검 페이지 등)은 재시도 없이 실패
+        return resp
 
-    data = _with_retries(_req)
+    # 캐시 적중 시 요청 간격 제한 없이 바로 반환
+    data = cached_get(url, lambda: _with_retries(_req), ttl_for=draw_response_ttl).json()
+    return parse_draw_data(round_no, data)
+
+
+def parse_draw_data(round_no: int, data: Dict) -> Dict:
+    """추첨 결과 API JSON -> fetch_draw 결과 형식"""
     if data.get("returnValue") != "success":
         raise ValueError("Invalid round or API response")
     numbers = [data[f"drwtNo{i}"] for i in range(1, 7)]
@@ -212,101 +267,198 @@ def fetch_draw(round_no: int) -> Dict:
     return result
 
 
-def fetch_winning_shops(round_no: int) -> List[Dict]:
-    """Fetch 1st/2nd winning shops by scraping with pagination support.
+_PAGE_NUMBER_RE = re.compile(r"(?:nowPage=|selfSubmit\()\s*'?(\d+)")
 
-    Note: This HTML structure may change; adjust selectors accordingly.
-    2nd rank shops may span multiple pages using nowPage parameter.
+
+def shop_row_key(shop: Dict):
+    """당첨점 행 식별 키: (등수, 순번). 순번이 없으면 (등수, 상호명, 주소)"""
+    if shop.get("sequence") is not None:
+        return (shop["rank"], shop["sequence"])
+    return (shop["rank"], shop.get("name"), shop.get("address"))
+
+
+def _shop_page_url(round_no: int, page: int) -> str:
+    url = SHOPS_URL.format(round=round_no)
+    return url if page == 1 else f"{url}&nowPage={page}"
+
+
+def _page_count(page_links: List[Dict]) -> Optional[int]:
+    """페이지네이션 링크에서 마지막 페이지 번호 (없으면 None)"""
+    numbers = []
+    for link in page_links:
+        if link["text"].isdigit():
+            numbers.append(int(link["text"]))
+        for attr in ("href", "onclick"):
+            match = _PAGE_NUMBER_RE.search(link[attr] or "")
+            if match:
+                numbers.append(int(match.group(1)))
+    return min(max(numbers), MAX_SHOP_PAGES) if numbers else None
+
+
+def parse_shop_page(html: str, round_no: int, page: int, backend: Optional[str] = None) -> Dict:
+    """당첨점 페이지 파싱
+
+    Args:
+        backend: shop_page_parser 백엔드 (생략 시 설치된 것 중 가장 빠른 것)
+
+    Returns:
+        {'rows': 1등(1페이지만) + 2등 행, 'page_count': 마지막 페이지 번호 또는 None}
     """
-    try:
-        result: List[Dict] = []
+    parsed = parse_tables(html, backend)
+    rows: List[Dict] = []
+
+    # Skip first table (navigation), process tables 2 and 3 for rank 1 and rank 2
+    tables = parsed["tables"]
+
+    # 1등 표는 모든 페이지에 반복되므로 1페이지에서만 읽음
+    if page == 1 and len(tables) > 1:
+        table = tables[1]
+        has_method_col = any("구분" in h for h in table["headers"])
+        rank = 1 if has_method_col else 2
+        for cols in table["rows"]:
+            shop_data = _parse_shop_row(cols, round_no, rank, has_method_col)
+            if shop_data:
+                rows.append(shop_data)
+
+    if len(tables) > 2:
+        for cols in tables[2]["rows"]:
+            shop_data = _parse_shop_row(cols, round_no, 2, False)
+            if shop_data:
+                rows.append(shop_data)
+
+    return {"rows": rows, "page_count": _page_count(parsed["page_links"])}
+
+
+def rows_hash(rows: List[Dict]) -> str:
+    """파싱된 행의 내용 해시 (페이지 HTML의 광고/토큰 변화와 무관)"""
+    payload = json.dumps(
+        [[r["rank"], r["sequence"], r["name"], r["method"], r["address"]] for r in rows],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
 
-        # First, get page 1 to parse 1st rank shops and first page of 2nd rank
-        url = SHOPS_URL.format(round=round_no)
-        # 전역 세션 재사용
-        session = get_session()
 
-        def _req_html(page_url: str) -> BeautifulSoup:
-            # (연결 타임아웃, 읽기 타임아웃) 튜플로 지정
-            resp = session.get(page_url, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT))
+def fetch_shop_page(round_no: int, page: int, etag: Optional[str] = None,
+                    last_modified: Optional[str] = None, refresh: bool = False) -> Dict:
+    """당첨점 한 페이지 조회 (ETag/Last-Modified가 있으면 조건부 요청)
+
+    조건부 요청이거나 refresh=True이면 디스크 캐시를 건너뛰고 서버에 다시 묻는다
+    (마감된 회차의 페이지는 영구 캐시되므로 캐시에서 답하면 재확인이 되지 않는다).
+
+    Returns:
+        {'page', 'not_modified', 'etag', 'last_modified', 'rows', 'content_hash', 'page_count'}
+        304 응답이면 not_modified=True이고 rows는 비어 있다.
+    """
+    session = get_session()
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+
+    def _req():
+        # (연결 타임아웃, 읽기 타임아웃) 튜플로 지정
+        resp = session.get(_shop_page_url(round_no, page), headers=headers,
+                           timeout=(CONNECT_TIMEOUT, READ_TIMEOUT))
+        if resp.status_code != 304:
             resp.raise_for_status()
-            return BeautifulSoup(resp.text, "html.parser")
+        return resp
 
-        soup = _with_retries(lambda: _req_html(url))
+    resp = cached_get(_shop_page_url(round_no, page), lambda: _with_retries(_req),
+                      ttl_for=lambda _: shop_page_ttl(round_no),
+                      refresh=refresh or bool(etag or last_modified))
+    return shop_page_result(resp, round_no, page, etag, last_modified)
 
-        # Skip first table (navigation), process tables 2 and 3 for rank 1 and rank 2
-        tables = soup.select("table.tbl_data")
 
-        # Process 1st rank table (index 1)
-        if len(tables) > 1:
-            table = tables[1]
-            headers = [th.get_text(strip=True) for th in table.select("thead th")]
-            has_method_col = any("구분" in h for h in headers)
-            rank = 1 if has_method_col else 2
+def shop_page_ttl(round_no: int) -> Optional[float]:
+    """마감된 회차의 페이지는 영구, 진행 중인 회차는 DEFAULT_TTL 동안 캐시"""
+    return None if is_round_closed(round_no) else DEFAULT_TTL
 
-            for row in table.select("tbody tr"):
-                shop_data = _parse_shop_row(row, round_no, rank, has_method_col)
-                if shop_data:
-                    result.append(shop_data)
 
-        # Process 2nd rank shops with pagination
-        page = 1
-        while True:
-            if page == 1:
-                # Use existing soup for first page
-                current_soup = soup
-            else:
-                # Fetch additional pages with extra delay for pagination
-                page_url = f"{SHOPS_URL.format(round=round_no)}&nowPage={page}"
-                try:
-                    # Add extra delay for pagination requests to reduce server load
-                    if page > 1:
-                        print(f"페이지네이션 {page}페이지 요청 전 추가 대기")
-                        time.sleep(REQUEST_DELAY)  # Extra delay for pagination
-                    current_soup = _with_retries(lambda: _req_html(page_url))
-                except Exception:
-                    # If page doesn't exist, break
-                    break
-
-            # Get 2nd rank table (index 2)
-            page_tables = current_soup.select("table.tbl_data")
-            if len(page_tables) <= 2:
-                break
+def shop_page_result(resp, round_no: int, page: int, etag: Optional[str] = None,
+                     last_modified: Optional[str] = None) -> Dict:
+    """당첨점 페이지 응답 -> fetch_shop_page 결과 형식"""
+    result = {
+        "page": page,
+        "not_modified": resp.status_code == 304,
+        "etag": resp.headers.get("ETag") or etag,
+        "last_modified": resp.headers.get("Last-Modified") or last_modified,
+        "rows": [],
+        "content_hash": None,
+        "page_count": None,
+    }
+    if not result["not_modified"]:
+        parsed = parse_shop_page(resp.text, round_no, page)
+        result["rows"] = parsed["rows"]
+        result["page_count"] = parsed["page_count"]
+        result["content_hash"] = rows_hash(parsed["rows"])
+    return result
 
-            rank2_table = page_tables[2]
-            rank2_rows = rank2_table.select("tbody tr")
 
-            # If no rows found, we've reached the end
-            if not rank2_rows:
-                break
+def fetch_shop_pages(round_no: int, pages: Iterable[int],
+                     validators: Optional[Dict[int, Dict]] = None,
+                     refresh: bool = False) -> Dict[int, object]:
+    """여러 페이지 동시 조회 ({page: fetch_shop_page 결과 또는 예외})
 
-            # Check if this page has the same data as previous (infinite loop protection)
-            first_row_cols = None
-            if rank2_rows:
-                first_tds = rank2_rows[0].select("td")
-                if first_tds:
-                    first_row_cols = [td.get_text(" ", strip=True) for td in first_tds]
-
-            page_shops_added = 0
-            for row in rank2_rows:
-                shop_data = _parse_shop_row(row, round_no, 2, False)
-                if shop_data:
-                    # Check for duplicates (sequence numbers should be unique)
-                    duplicate = any(s["sequence"] == shop_data["sequence"] and s["rank"] == 2
-                                  for s in result if s.get("sequence"))
-                    if not duplicate:
-                        result.append(shop_data)
-                        page_shops_added += 1
+    요청 시작 간격은 전역 _rate_limit이 제한하므로 동시성은 응답 대기 시간만 겹친다.
+    """
+    validators = validators or {}
+    pages = list(pages)
+    if not pages:
+        return {}
 
-            # If no new shops were added, we've reached the end
-            if page_shops_added == 0:
-                break
+    def _fetch(page: int):
+        try:
+            return fetch_shop_page(round_no, page, refresh=refresh, **validators.get(page, {}))
+        except Exception as exc:
+            return exc
 
-            # Move to next page
-            page += 1
+    with ThreadPoolExecutor(max_workers=min(SHOP_PAGE_WORKERS, len(pages))) as executor:
+        return dict(zip(pages, executor.map(_fetch, pages)))
 
-            # Safety limit to prevent infinite loops
-            if page > 20:  # Reasonable upper limit
+
+def fetch_winning_shops(round_no: int) -> List[Dict]:
+    """Fetch 1st/2nd winning shops by scraping with pagination support.
+
+    Note: This HTML structure may change; adjust selectors accordingly.
+    2nd rank shops may span multiple pages using nowPage parameter. When the
+    pagination links give the page count the remaining pages are fetched
+    concurrently; otherwise pages are walked until one adds no new rows.
+    Rows are deduplicated by shop_row_key.
+    """
+    try:
+        first = fetch_shop_page(round_no, 1)
+        result: List[Dict] = []
+        seen = set()
+
+        def _add(rows: List[Dict]) -> int:
+            added = 0
+            for shop_data in rows:
+                key = shop_row_key(shop_data)
+                if key not in seen:
+                    seen.add(key)
+                    result.append(shop_data)
+                    added += 1
+            return added
+
+        if not _add(first["rows"]):
+            return result
+
+        if first["page_count"]:
+            pages = fetch_shop_pages(round_no, range(2, first["page_count"] + 1))
+            for page in sorted(pages):
+                if not isinstance(pages[page], Exception):
+                    _add(pages[page]["rows"])
+            return result
+
+        for page in range(2, MAX_SHOP_PAGES + 1):
+            try:
+                page_result = fetch_shop_page(round_no, page)
+            except Exception:
+                # If page doesn't exist, break
+                break
+            # If no new shops were added, we've reached the end
+            if not _add(page_result["rows"]):
                 break
 
         return result
@@ -314,14 +466,11 @@ def fetch_winning_shops(round_no: int) -> List[Dict]:
         return []
 
 
-def _parse_shop_row(row, round_no: int, rank: int, has_method_col: bool) -> Optional[Dict]:
-    """Parse a single shop row from the table."""
-    tds = row.select("td")
-    if not tds:
+def _parse_shop_row(cols: List[str], round_no: int, rank: int, has_method_col: bool) -> Optional[Dict]:
+    """Parse a single shop row from its cell texts."""
+    if not cols:
         return None
 
-    cols = [td.get_text(" ", strip=True) for td in tds]
-
     # Basic columns
     sequence = None
     try:
@@ -0,0 +1,50 @@
+"""
+구매 목록의 회차 추첨 결과 일괄 로딩
+
+Purchase.draw는 purchase_round로 draws를 가리키는 읽기 전용 관계다. 목록 화면에서
+구매마다 지연 로딩하면 회차 수만큼 쿼리가 나가므로(N+1), 페이지에 필요한 회차를
+모아 IN 쿼리 한 번으로 읽고 각 구매에 붙인다.
+
+읽은 Draw는 요청 범위(flask.g)의 회차 -> Draw 캐시에 넣어 같은 요청 안에서
+다시 필요하면 DB를 읽지 않는다 (추첨 결과가 없는 회차도 None으로 기억).
+"""
+from typing import Dict, Iterable, List, Optional
+
+from flask import g, has_app_context
+from sqlalchemy.orm.attributes import set_committed_value
+
+from ..models import Draw, Purchase
+
+# SQLite 바인드 변수 제한(999)보다 작게 나눠 조회
+_IN_CHUNK = 500
+
+
+def _request_cache() -> Dict[int, Optional[Draw]]:
+    if not has_app_context():
+        return {}
+    cache = g.get('_draws_by_round')
+    if cache is None:
+        cache = g._draws_by_round = {}
+    return cache
+
+
+def load_draws(rounds: Iterable[int]) -> Dict[int, Optional[Draw]]:
+    """회차 목록 -> {회차: Draw 또는 None} (캐시에 없는 회차만 IN 쿼리로 조회)"""
+    cache = _request_cache()
+    wanted = {int(round_no) for round_no in rounds}
+    missing = sorted(wanted - cache.keys())
+    for start in range(0, len(missing), _IN_CHUNK):
+        chunk = missing[start:start + _IN_CHUNK]
+        found = {draw.round: draw for draw in Draw.query.filter(Draw.round.in_(chunk))}
+        for round_no in chunk:
+            cache[round_no] = found.get(round_no)
+    return {round_no: cache[round_no] for round_no in wanted}
+
+
+def attach_draws(purchases: Iterable[Purchase]) -> List[Purchase]:
+    """구매 목록의 draw 관계를 한 번에 채운다 (이후 purchase.draw 접근은 쿼리 없음)"""
+    purchases = list(purchases)
+    draws = load_draws(purchase.purchase_round for purchase in purchases)
+    for purchase in purchases:
+        set_committed_value(purchase, 'draw', draws[purchase.purchase_round])
+    return purchases
@@ -0,0 +1,247 @@
+"""
+구매 번호 역대 회차 대입 리포트
+
+사용자가 구매한 번호(중복 제거)를 역대 모든 회차에 대입해 티켓별 맞춘 개수
+분포, 등수별 횟수, 당첨금 합계를 계산한다. 티켓 x 45 포함 행렬과 회차 x 45
+포함 행렬의 곱이 곧 (티켓, 회차)별 맞춘 개수이므로 구매 수 x 회차 수 비교를
+BLAS 행렬곱 한 번으로 처리하고, 보너스는 보너스 번호 열을 모아 따로 확인한다.
+티켓은 REPORT_CHUNK개씩 나눠 메모리를 제한한다.
+
+리포트는 백그라운드 스레드에서 계산해 purchase_reports에 저장하고, 구매/추첨
+데이터가 바뀌지 않았으면(stamp) 저장된 결과를 그대로 돌려준다.
+"""
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+import numpy as np
+from flask import Flask
+from sqlalchemy import func, or_
+
+from ..extensions import db
+from ..models import Draw, Purchase, PurchaseReport
+from .backtest import load_history
+from .lottery_checker import ranks_from_matches
+from .sampler import NUMBER_COUNT, PICK_COUNT
+
+# 한 번에 행렬곱하는 티켓 수 (티켓 x 회차 float32 행렬 크기 제한)
+REPORT_CHUNK = 2048
+# 동시에 계산하는 리포트 수
+REPORT_WORKERS = 1
+# queued(요청 시각 기준)/running(시작 시각 기준) 상태로 이 시간이 지나면
+# (프로세스 재시작으로 실행기의 작업이 사라진 경우 등) 다시 계산
+REPORT_STALE_AFTER = timedelta(minutes=10)
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _incidence(tickets: np.ndarray) -> np.ndarray:
+    """(n, 6) 번호 -> (n, 45) 0/1 행렬"""
+    matrix = np.zeros((len(tickets), NUMBER_COUNT), dtype=np.float32)
+    np.put_along_axis(matrix, tickets.astype(np.int64) - 1, 1.0, axis=1)
+    return matrix
+
+
+def score_against_history(tickets: np.ndarray, history: Dict[str, np.ndarray],
+                          chunk_size: int = REPORT_CHUNK) -> Dict[str, np.ndarray]:
+    """
+    티켓들을 역대 모든 회차와 비교
+
+    Args:
+        tickets: (n, 6) 번호 배열
+        history: backtest.load_history() 결과
+
+    Returns:
+        {'match_histogram': (n, 7) 맞춘 개수별 회차 수, 'rank_counts': (n, 6) 등수별 회차 수 (0=낙첨),
+         'total_prize': (n,) 매 회차 한 게임씩 샀다면 받았을 당첨금 합계}
+    """
+    tickets = np.asarray(tickets).reshape(-1, PICK_COUNT)
+    draws = _incidence(history['numbers']).T  # (45, d)
+    bonus_columns = history['bonus'].astype(np.int64) - 1
+    prizes_by_rank = history['prizes'].T  # (6, d), 0등(낙첨)=0
+    draw_positions = np.arange(draws.shape[1])
+
+    n = len(tickets)
+    match_histogram = np.zeros((n, PICK_COUNT + 1), dtype=np.int32)
+    rank_counts = np.zeros((n, 6), dtype=np.int32)
+    total_prize = np.zeros(n, dtype=np.int64)
+
+    for start in range(0, n, chunk_size):
+        incidence = _incidence(tickets[start:start + chunk_size])
+        rows = len(incidence)
+        matches = (incidence @ draws).astype(np.int8)  # (rows, d)
+        bonus_hit = incidence[:, bonus_columns] > 0
+        ranks = ranks_from_matches(matches, bonus_hit)
+
+        # 행마다 bincount: 행 번호만큼 밀어서 한 번에 센다
+        offsets = np.arange(rows)[:, None]
+        match_histogram[start:start + rows] = np.bincount(
+            (matches + offsets * (PICK_COUNT + 1)).ravel(), minlength=rows * (PICK_COUNT + 1)
+        ).reshape(rows, PICK_COUNT + 1)
+        rank_counts[start:start + rows] = np.bincount(
+            (ranks + offsets * 6).ravel(), minlength=rows * 6
+        ).reshape(rows, 6)
+        total_prize[start:start + rows] = prizes_by_rank[ranks, draw_positions].sum(axis=1)
+
+    return {'match_histogram': match_histogram, 'rank_counts': rank_counts, 'total_prize': total_prize}
+
+
+def build_report(user_id: int) -> Dict:
+    """사용자의 전체 구매 번호 리포트 (동기 계산)"""
+    purchase_counts: Dict[tuple, int] = {}
+    for (numbers,) in db.session.query(Purchase.numbers).filter(Purchase.user_id == user_id):
+        ticket = tuple(sorted(int(x) for x in numbers.split(",") if x))
+        if len(ticket) == PICK_COUNT:
+            purchase_counts[ticket] = purchase_counts.get(ticket, 0) + 1
+
+    history = load_history()
+    draw_count = len(history['rounds'])
+    tickets = np.array(list(purchase_counts), dtype=np.int8).reshape(-1, PICK_COUNT)
+    scores = score_against_history(tickets, history)
+
+    entries = []
+    for i, ticket in enumerate(purchase_counts):
+        ranks = scores['rank_counts'][i]
+        best_rank = next((rank for rank in range(1, 6) if ranks[rank]), None)
+        prize = int(scores['total_prize'][i])
+        entries.append({
+            'numbers': list(ticket),
+            'purchases': purchase_counts[ticket],
+            'match_histogram': scores['match_histogram'][i].tolist(),
+            'rank_counts': {rank: int(ranks[rank]) for rank in range(1, 6)},
+            'best_rank': best_rank,
+            'total_prize': prize,
+            'prize_per_draw': prize / draw_count if draw_count else 0.0,
+        })
+    # 최고 등수가 높은 순, 같으면 당첨금 합계 순
+    entries.sort(key=lambda entry: (entry['best_rank'] or 6, -entry['total_prize']))
+
+    rank_totals = scores['rank_counts'].sum(axis=0) if len(tickets) else np.zeros(6, dtype=np.int64)
+    return {
+        'user_id': user_id,
+        'draws': draw_count,
+        'first_round': int(history['rounds'][0]) if draw_count else None,
+        'last_round': int(history['rounds'][-1]) if draw_count else None,
+        'tickets': len(entries),
+        'purchases': sum(purchase_counts.values()),
+        'summary': {
+            'match_histogram': scores['match_histogram'].sum(axis=0).tolist(),
+            'rank_counts': {rank: int(rank_totals[rank]) for rank in range(1, 6)},
+            'tickets_by_best_rank': {
+                rank: sum(1 for entry in entries if (entry['best_rank'] or 0) == rank) for rank in range(6)
+            },
+            'total_prize': int(scores['total_prize'].sum()),
+        },
+        'entries': entries,
+        'generated_at': datetime.utcnow().isoformat(),
+    }
+
+
+def report_stamp(user_id: int) -> str:
+    """
+    구매/추첨 데이터 상태 (바뀌면 리포트를 다시 계산)
+
+    당첨금이 나중에 채워지면(reprice_purchases, 일괄 저장 upsert) 행 수는 그대로이므로,
+    당첨금이 비어 있어 예상값(ESTIMATED_PRIZES)을 쓰는 회차 수도 함께 본다.
+    """
+    purchases = db.session.query(func.count(Purchase.id), func.max(Purchase.id)).filter(
+        Purchase.user_id == user_id
+    ).one()
+    draws = db.session.query(func.count(Draw.id), func.max(Draw.id)).one()
+    unpriced = db.session.query(func.count(Draw.id)).filter(or_(
+        Draw.first_prize_amount.is_(None), Draw.second_prize_amount.is_(None), Draw.third_prize_amount.is_(None),
+        Draw.fourth_prize_amount.is_(None), Draw.fifth_prize_amount.is_(None),
+    )).scalar()
+    return f"p{purchases[0]}:{purchases[1] or 0}/d{draws[0]}:{draws[1] or 0}:u{unpriced}"
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=REPORT_WORKERS, thread_name_prefix="purchase-report")
+        return _executor
+
+
+def run_report(app: Flask, report_id: int) -> None:
+    """리포트 계산 (워커 스레드)"""
+    with app.app_context():
+        report = db.session.get(PurchaseReport, report_id)
+        if report is None or report.status != 'queued':
+            return
+        report.status = 'running'
+        report.started_at = datetime.utcnow()
+        db.session.commit()
+        stamp = report.stamp
+        try:
+            result = build_report(report.user_id)
+            report = db.session.get(PurchaseReport, report_id)
+            # 계산 중에 새 요청으로 stamp가 바뀌었으면 그 요청의 결과가 덮어쓴다
+            if report.stamp == stamp:
+                report.result = json.dumps(result)
+                report.status = 'completed'
+                report.error = None
+                report.finished_at = datetime.utcnow()
+                db.session.commit()
+        except Exception as exc:
+            db.session.rollback()
+            report = db.session.get(PurchaseReport, report_id)
+            report.status = 'failed'
+            report.error = f"{type(exc).__name__}: {exc}"
+            report.finished_at = datetime.utcnow()
+            db.session.commit()
+        finally:
+            db.session.remove()
+
+
+def request_report(app: Flask, user_id: int) -> PurchaseReport:
+    """
+    리포트 요청
+
+    데이터가 그대로면 저장된 결과(완료) 또는 진행 중인 계산을 돌려주고,
+    아니면 계산을 예약한다.
+    """
+    stamp = report_stamp(user_id)
+    report = PurchaseReport.query.filter_by(user_id=user_id).first()
+    if report is not None and report.stamp == stamp:
+        if report.status == 'completed':
+            return report
+        since = report.requested_at if report.status == 'queued' else report.started_at
+        if report.status in ('queued', 'running') and since \
+                and datetime.utcnow() - since < REPORT_STALE_AFTER:
+            return report
+
+    if report is None:
+        report = PurchaseReport(user_id=user_id)
+        db.session.add(report)
+    report.stamp = stamp
+    report.status = 'queued'
+    report.error = None
+    report.requested_at = datetime.utcnow()
+    report.started_at = None
+    report.finished_at = None
+    db.session.commit()
+    _get_executor().submit(run_report, app, report.id)
+    return report
+
+
+def report_to_dict(report: Optional[PurchaseReport], limit: Optional[int] = None) -> Dict:
+    """API 응답 형식 (entries는 상위 limit개만)"""
+    if report is None:
+        return {'status': None}
+    data = {
+        'status': report.status,
+        'requested_at': report.requested_at.isoformat() if report.requested_at else None,
+        'finished_at': report.finished_at.isoformat() if report.finished_at else None,
+        'error': report.error,
+        'report': None,
+    }
+    if report.result:
+        result = json.loads(report.result)
+        if limit is not None:
+            result['entries'] = result['entries'][:limit]
+        data['report'] = result
+    return data
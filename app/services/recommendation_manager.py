@@ -127,9 +127,9 @@ def get_persistent_recommendations(draws: List, user_id: int = None) -> Tuple[Li
     return auto_recs, recommendation_reasons
 
 
-def refresh_recommendations(draws: List, user_id: int = None) -> Tuple[List[List[int]], List[List[str]]]:
-    """강제로 새로운 추천번호 생성"""
-    history = [d.numbers_list() for d in draws]
+def refresh_recommendations(draws: Optional[List], user_id: int = None) -> Tuple[List[List[int]], List[List[str]]]:
+    """강제로 새로운 추천번호 생성 (draws가 None이면 캐시된 전체 이력 빈도 사용)"""
+    history = [d.numbers_list() for d in draws] if draws is not None else None
     auto_recs, recommendation_reasons = enhanced_auto_recommend(history, user_id=user_id, count=5)
 
     store_recommendations(auto_recs, recommendation_reasons, user_id)
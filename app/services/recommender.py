@@ -3,28 +3,26 @@ from collections import Counter, defaultdict
 from typing import Iterable, List, Optional, Dict, Tuple
 from sqlalchemy import and_
 
+from .combinations import DEFAULT_CONSTRAINTS, constrained_tickets
+from .feature_store import get_feature_store
+from .sampler import WeightedTicketSampler, frequency_weights, get_history_counts, number_counts
 
-def auto_recommend(draw_numbers: Iterable[List[int]], count: int = 3) -> List[List[int]]:
+
+def _history_counts(draw_numbers: Optional[Iterable[List[int]]], limit: Optional[int]):
+    """Counts from the given history, or the cached per-version counts when None."""
+    if draw_numbers is None:
+        return get_history_counts(limit)
+    return number_counts(draw_numbers)
+
+
+def auto_recommend(draw_numbers: Optional[Iterable[List[int]]], count: int = 3,
+                   limit: Optional[int] = None) -> List[List[int]]:
     """Generate 'count' automatic recommendations based on historical frequency.
     Simple heuristic: weighted sampling by number frequency, ensure sorted unique set of 6.
+    Pass draw_numbers=None to use the cached history of the latest `limit` draws.
     """
-    freq = Counter(n for seq in draw_numbers for n in seq)
-    pool = list(range(1, 46))
-    weights = [freq.get(n, 1) for n in pool]
-    recs: List[List[int]] = []
-    for _ in range(count):
-        picks: set[int] = set()
-        # weighted choice without replacement
-        candidates = pool.copy()
-        w = weights.copy()
-        for _ in range(6):
-            n = random.choices(candidates, weights=w, k=1)[0]
-            idx = candidates.index(n)
-            candidates.pop(idx)
-            w.pop(idx)
-            picks.add(n)
-        recs.append(sorted(picks))
-    return recs
+    sampler = WeightedTicketSampler(frequency_weights(_history_counts(draw_numbers, limit)))
+    return sampler.sample(count).tolist()
 
 
 def semi_auto_recommend(fixed_numbers: Optional[Iterable[int]], count: int = 2) -> List[List[int]]:
@@ -202,29 +200,43 @@ def generate_recommendation_insights(user_id: int) -> Dict:
     }
 
 
-def enhanced_auto_recommend(draw_numbers: Iterable[List[int]], user_id: Optional[int] = None, count: int = 3) -> Tuple[List[List[int]], List[List[str]]]:
+def enhanced_auto_recommend(draw_numbers: Optional[Iterable[List[int]]], user_id: Optional[int] = None, count: int = 3,
+                            limit: Optional[int] = None) -> Tuple[List[List[int]], List[List[str]]]:
     """
     Enhanced recommendation system that considers:
     1. Historical frequency (기본)
     2. User's winning patterns (당첨 이력 기반)
     3. Balanced odd/even distribution
     4. Number range distribution
+
+    Balance rules (DEFAULT_CONSTRAINTS) are enforced by sampling only from the
+    pre-filtered combination index, not checked after the fact. When the
+    combination feature store is built, past 1st-prize combinations are excluded too.
+    Pass draw_numbers=None to use the cached history of the latest `limit` draws.
     """
     # Basic frequency analysis
-    freq = Counter(n for seq in draw_numbers for n in seq)
+    counts = _history_counts(draw_numbers, limit)
 
     # User's winning pattern analysis
-    user_patterns = {}
     user_lucky_numbers = []
     if user_id:
-        user_patterns = analyze_winning_patterns(user_id)
         user_lucky_numbers = get_user_lucky_numbers(user_id, 15)
 
+    # Strategy 2: Frequency-based selection with user bias
+    weights = frequency_weights(counts)
+    if user_lucky_numbers:
+        # Boost weight for user's lucky numbers
+        weights[[n - 1 for n in user_lucky_numbers]] *= 1.5
+    constraints = dict(DEFAULT_CONSTRAINTS)
+    if get_feature_store() is not None:
+        constraints['exclude_won'] = 1
+    tickets = constrained_tickets(count, weights=weights, **constraints).tolist()
+
     recommendations = []
     reasons = []
 
     for i in range(count):
-        picks = set()
+        final_picks = tickets[i]
         pick_reasons = []
 
         # Strategy 1: Include user's lucky numbers (if available)
@@ -233,65 +245,30 @@ def enhanced_auto_recommend(draw_numbers: Iterable[List[int]], user_id: Optional
             lucky_pool = user_lucky_numbers[:8]
             if len(lucky_pool) >= 3:
                 selected_lucky = random.sample(lucky_pool, min(3, len(lucky_pool)))
-                picks.update(selected_lucky)
+                try:
+                    final_picks = constrained_tickets(1, weights=weights, fixed=selected_lucky,
+                                                      **constraints)[0].tolist()
+                except ValueError:
+                    # 행운의 번호 조합이 균형 조건을 만족할 수 없는 경우
+                    final_picks = WeightedTicketSampler(weights).sample(1, fixed=selected_lucky)[0].tolist()
                 pick_reasons.append(f"행운의 번호 {len(selected_lucky)}개 포함")
 
-        # Strategy 2: Frequency-based selection with user bias
-        pool = list(range(1, 46))
-        weights = []
-
-        for n in pool:
-            base_weight = freq.get(n, 1)
-
-            # Boost weight for user's lucky numbers
-            if n in user_lucky_numbers:
-                base_weight *= 1.5
-
-            weights.append(base_weight)
-
-        # Fill remaining slots
-        candidates = [n for n in pool if n not in picks]
-        candidate_weights = [weights[n-1] for n in candidates]
-
-        while len(picks) < 6:
-            if not candidates:
-                break
-            selected = random.choices(candidates, weights=candidate_weights, k=1)[0]
-            picks.add(selected)
-
-            # Remove selected number from candidates
-            idx = candidates.index(selected)
-            candidates.pop(idx)
-            candidate_weights.pop(idx)
-
-        # Ensure we have exactly 6 numbers
-        if len(picks) < 6:
-            remaining = [n for n in range(1, 46) if n not in picks]
-            picks.update(random.sample(remaining, 6 - len(picks)))
-
-        final_picks = sorted(list(picks))
-
         # Generate reasons
         if not pick_reasons:
             # Analyze the recommendation
-            high_freq_count = sum(1 for n in final_picks if freq.get(n, 0) > 30)
+            high_freq_count = sum(1 for n in final_picks if counts[n - 1] > 30)
             if high_freq_count >= 3:
                 pick_reasons.append(f"빈출번호 {high_freq_count}개 포함")
 
+            # Guaranteed by DEFAULT_CONSTRAINTS
             odd_count = sum(1 for n in final_picks if n % 2 == 1)
-            if 2 <= odd_count <= 4:
-                pick_reasons.append(f"홀짝 균형 ({odd_count}홀{6-odd_count}짝)")
-
-            # Check number range distribution
-            low_count = sum(1 for n in final_picks if n <= 15)
-            mid_count = sum(1 for n in final_picks if 16 <= n <= 30)
-            high_count = sum(1 for n in final_picks if n >= 31)
+            pick_reasons.append(f"홀짝 균형 ({odd_count}홀{6-odd_count}짝)")
+            pick_reasons.append("구간별 균형 배치")
 
-            if min(low_count, mid_count, high_count) >= 1:
-                pick_reasons.append("구간별 균형 배치")
-
-        if not pick_reasons:
-            pick_reasons.append("빈도 기반 추천")
+            low, high = DEFAULT_CONSTRAINTS['sum_range']
+            pick_reasons.append(f"합계 적정범위 ({sum(final_picks)}, {low}~{high})")
+            if 'exclude_won' in constraints:
+                pick_reasons.append("역대 1등 당첨 조합 제외")
 
         recommendations.append(final_picks)
         reasons.append(pick_reasons)
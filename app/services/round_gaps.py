@@ -0,0 +1,102 @@
+"""
+누락 회차 구간 계산
+
+draws.round 인덱스를 LAG() 윈도 함수로 한 번 훑어 빠진 회차를 (시작, 끝) 구간으로
+바로 구한다. 회차 목록/집합을 만들지 않으므로 비교 비용이 저장된 회차 수에만
+비례하고 ORM 객체도 만들지 않는다.
+
+결과는 (범위, draws 상태) 기준으로 캐시한다. 상태는 (행 수, 최대 id)라 회차가
+추가/삭제되면(다른 프로세스의 워커가 넣은 경우 포함) 다음 조회에서 다시 계산된다.
+"""
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from ..extensions import db
+
+Range = Tuple[int, int]
+
+# 범위 양 끝에 가상의 회차(start-1, end+1)를 두어 앞/뒤 구간도 같은 규칙으로 계산
+_GAPS_SQL = text("""
+    WITH rounds AS (
+        SELECT :start - 1 AS round
+        UNION ALL
+        SELECT round FROM draws WHERE round BETWEEN :start AND :end
+        UNION ALL
+        SELECT :end + 1
+    ),
+    ordered AS (
+        SELECT round, LAG(round) OVER (ORDER BY round) AS prev FROM rounds
+    )
+    SELECT prev + 1 AS gap_start, round - 1 AS gap_end
+    FROM ordered
+    WHERE round - prev > 1
+    ORDER BY gap_start
+""")
+
+_STAMP_SQL = text("SELECT COUNT(*), MAX(id) FROM draws")
+
+_cache: Dict[Range, Tuple[Tuple, List[Range]]] = {}
+_cache_lock = threading.Lock()
+
+
+def _stamp() -> Tuple:
+    return tuple(db.session.execute(_STAMP_SQL).one())
+
+
+def missing_ranges(start: int = 1, end: Optional[int] = None) -> List[Range]:
+    """
+    start~end 사이의 빠진 회차 구간 [(시작, 끝), ...] (오름차순)
+
+    end를 생략하면 저장된 최대 회차까지
+    """
+    if end is None:
+        end = db.session.execute(text("SELECT MAX(round) FROM draws")).scalar() or 0
+    if end < start:
+        return []
+
+    key = (start, end)
+    stamp = _stamp()
+    with _cache_lock:
+        cached = _cache.get(key)
+    if cached is not None and cached[0] == stamp:
+        return list(cached[1])
+
+    ranges = [(row.gap_start, row.gap_end) for row in db.session.execute(_GAPS_SQL, {"start": start, "end": end})]
+    with _cache_lock:
+        _cache[key] = (stamp, ranges)
+    return list(ranges)
+
+
+def count_missing(ranges: List[Range]) -> int:
+    return sum(end - start + 1 for start, end in ranges)
+
+
+def iter_rounds(ranges: List[Range]) -> Iterator[int]:
+    for start, end in ranges:
+        yield from range(start, end + 1)
+
+
+def expand_ranges(ranges: List[Range], limit: Optional[int] = None) -> List[int]:
+    """구간을 회차 목록으로 (limit개까지만)"""
+    rounds = []
+    for round_no in iter_rounds(ranges):
+        if limit is not None and len(rounds) >= limit:
+            break
+        rounds.append(round_no)
+    return rounds
+
+
+def completeness(start: int, end: int) -> Dict:
+    """start~end 범위의 저장/누락 회차 수와 누락 구간"""
+    ranges = missing_ranges(start, end)
+    total = max(0, end - start + 1)
+    missing = count_missing(ranges)
+    return {
+        "range": {"start": start, "end": end},
+        "total_existing": total - missing,
+        "total_missing": missing,
+        "completion_rate": round((total - missing) / total * 100, 1) if total else 0.0,
+        "missing_ranges": ranges,
+    }
@@ -0,0 +1,306 @@
+"""
+판매점 지오코딩 및 근처 판매점 검색
+
+외부 API 없이 app/data/district_centroids.csv(행정구역 대표 좌표)로 shops의
+(시/도, 시/군/구, 읍/면/동)을 좌표로 바꾼다. 가장 구체적인 행정구역부터 찾으므로
+정확도는 데이터셋의 단위(기본 시/군/구)를 따른다.
+
+좌표는 shops_rtree(SQLite R*Tree 가상 테이블)에 트리거로 동기화되며, 근처 검색은
+반경으로 만든 경계 상자로 후보를 인덱스에서 고른 뒤 하버사인 거리로 정렬한다.
+
+지오코딩은 당첨점 수집 경로(updater, draw_ingest)와 scripts/migrate.py,
+scripts/normalize_shops.py에서만 하고, 근처 검색은 저장된 좌표만 읽는다.
+"""
+import csv
+import math
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event, text, update
+
+from ..extensions import db
+from ..models import Shop, WinningShop
+
+CENTROIDS_PATH = Path(__file__).resolve().parents[1] / "data" / "district_centroids.csv"
+RTREE_TABLE = "shops_rtree"
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+
+# 반경 없이 k개를 찾을 때 2km에서 시작해 두 배씩 넓힌다
+KNN_START_RADIUS_KM = 2.0
+MAX_RADIUS_KM = 500.0
+
+BATCH_SIZE = 1000
+
+_RTREE_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {RTREE_TABLE} USING rtree(id, min_lat, max_lat, min_lon, max_lon)",
+    f"""CREATE TRIGGER IF NOT EXISTS {RTREE_TABLE}_ai AFTER INSERT ON shops
+        WHEN new.latitude IS NOT NULL AND new.longitude IS NOT NULL BEGIN
+        INSERT OR REPLACE INTO {RTREE_TABLE} VALUES (new.id, new.latitude, new.latitude, new.longitude, new.longitude);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {RTREE_TABLE}_ad AFTER DELETE ON shops BEGIN
+        DELETE FROM {RTREE_TABLE} WHERE id = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {RTREE_TABLE}_au AFTER UPDATE OF latitude, longitude ON shops BEGIN
+        DELETE FROM {RTREE_TABLE} WHERE id = old.id;
+        INSERT INTO {RTREE_TABLE}
+            SELECT new.id, new.latitude, new.latitude, new.longitude, new.longitude
+            WHERE new.latitude IS NOT NULL AND new.longitude IS NOT NULL;
+    END""",
+]
+
+_centroids: Optional[Dict[Tuple[str, str, str], Tuple[float, float]]] = None
+_centroids_lock = threading.Lock()
+
+# 인덱스 존재를 확인한 엔진 (프로세스당 한 번만 확인)
+_ready_engines = set()
+
+_RTREE_EXISTS_SQL = text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name")
+
+
+def load_centroids() -> Dict[Tuple[str, str, str], Tuple[float, float]]:
+    """{(sido, sigungu, dong): (lat, lon)} - 빈 값은 상위 행정구역 대표 좌표"""
+    global _centroids
+    if _centroids is None:
+        with _centroids_lock:
+            if _centroids is None:
+                centroids = {}
+                with open(CENTROIDS_PATH, encoding="utf-8") as f:
+                    rows = csv.DictReader(line for line in f if not line.startswith("#"))
+                    for row in rows:
+                        key = (row["sido"].strip(), row["sigungu"].strip(), row["dong"].strip())
+                        centroids[key] = (float(row["lat"]), float(row["lon"]))
+                _centroids = centroids
+    return _centroids
+
+
+def geocode(sido: Optional[str], sigungu: Optional[str] = None,
+            dong: Optional[str] = None) -> Optional[Tuple[float, float, str]]:
+    """
+    행정구역 -> 대표 좌표
+
+    Returns:
+        (lat, lon, precision) - precision은 'dong', 'sigungu', 'sido'. 찾지 못하면 None
+    """
+    if not sido:
+        return None
+    centroids = load_centroids()
+    sigungu = sigungu or ""
+
+    candidates = []
+    if sigungu and dong:
+        candidates.append(((sido, sigungu, dong), "dong"))
+    if sigungu:
+        candidates.append(((sido, sigungu, ""), "sigungu"))
+        # 일반구 (예: 수원시 팔달구)는 데이터셋에 없으면 시 대표 좌표 사용
+        city = sigungu.split(" ")[0]
+        if city != sigungu:
+            if dong:
+                candidates.append(((sido, city, dong), "dong"))
+            candidates.append(((sido, city, ""), "sigungu"))
+    candidates.append(((sido, "", ""), "sido"))
+
+    for key, precision in candidates:
+        point = centroids.get(key)
+        if point:
+            return point[0], point[1], precision
+    return None
+
+
+def geocode_shops(rebuild: bool = False, batch_size: int = BATCH_SIZE) -> Dict:
+    """
+    좌표가 없는 판매점 지오코딩 (좌표 변경은 트리거로 R*Tree에 반영)
+
+    Args:
+        rebuild: 모든 판매점을 다시 지오코딩 (좌표 데이터셋 교체 시)
+
+    Returns:
+        {'geocoded': 좌표를 얻은 판매점 수, 'failed': 행정구역을 찾지 못한 판매점 수}
+    """
+    ensure_spatial_index()
+
+    geocoded = 0
+    failed = 0
+    last_id = 0
+    while True:
+        query = db.session.query(Shop.id, Shop.sido, Shop.sigungu, Shop.dong).filter(Shop.id > last_id)
+        if not rebuild:
+            query = query.filter(Shop.geo_precision.is_(None))
+        rows = query.order_by(Shop.id).limit(batch_size).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        values = []
+        for row in rows:
+            point = geocode(row.sido, row.sigungu, row.dong)
+            if point:
+                lat, lon, precision = point
+                geocoded += 1
+            else:
+                lat = lon = None
+                precision = "none"
+                failed += 1
+            values.append({"id": row.id, "latitude": lat, "longitude": lon, "geo_precision": precision})
+        db.session.execute(update(Shop), values)
+
+    db.session.commit()
+    return {"geocoded": geocoded, "failed": failed}
+
+
+def create_spatial_index(connection) -> bool:
+    """R*Tree 테이블과 동기화 트리거 생성 (SQLite 전용)
+
+    새로 만든 경우 좌표가 있는 기존 shops 행으로 인덱스를 채운다.
+
+    Returns:
+        새로 생성했으면 True
+    """
+    if connection.dialect.name != "sqlite":
+        return False
+
+    exists = connection.execute(_RTREE_EXISTS_SQL, {"name": RTREE_TABLE}).first()
+
+    for statement in _RTREE_DDL:
+        connection.execute(text(statement))
+    if not exists:
+        connection.execute(text(
+            f"INSERT INTO {RTREE_TABLE} SELECT id, latitude, latitude, longitude, longitude FROM shops "
+            f"WHERE latitude IS NOT NULL AND longitude IS NOT NULL"
+        ))
+    return not exists
+
+
+def ensure_spatial_index() -> bool:
+    """공간 인덱스 준비 (기존 DB는 첫 사용 시 생성). SQLite가 아니면 False"""
+    engine = db.engine
+    if engine.dialect.name != "sqlite":
+        return False
+    if engine.url not in _ready_engines:
+        with engine.begin() as connection:
+            create_spatial_index(connection)
+        _ready_engines.add(engine.url)
+    return True
+
+
+def has_spatial_index() -> bool:
+    """공간 인덱스가 있는지 (조회 경로용, 없어도 만들지 않는다). SQLite가 아니면 False"""
+    engine = db.engine
+    if engine.dialect.name != "sqlite":
+        return False
+    if engine.url not in _ready_engines:
+        if db.session.execute(_RTREE_EXISTS_SQL, {"name": RTREE_TABLE}).first() is None:
+            return False
+        _ready_engines.add(engine.url)
+    return True
+
+
+@event.listens_for(Shop.__table__, "after_create")
+def _create_index_with_table(target, connection, **kw):
+    # db.create_all()로 새 DB를 만들 때 함께 생성
+    create_spatial_index(connection)
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _bounding_box(lat: float, lon: float, radius_km: float) -> Dict[str, float]:
+    dlat = radius_km / KM_PER_DEGREE_LAT
+    # 고위도에서 경도 폭이 발산하지 않도록 cos 하한
+    dlon = radius_km / (KM_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 0.01))
+    return {"min_lat": lat - dlat, "max_lat": lat + dlat, "min_lon": lon - dlon, "max_lon": lon + dlon}
+
+
+def _within_radius(lat: float, lon: float, radius_km: float, rank: Optional[int]) -> List[Dict]:
+    params = _bounding_box(lat, lon, radius_km)
+    rank_filter = ""
+    if rank:
+        rank_filter = "AND EXISTS (SELECT 1 FROM winning_shops ws WHERE ws.shop_id = s.id AND ws.rank = :rank)"
+        params["rank"] = rank
+
+    if has_spatial_index():
+        sql = (
+            f"SELECT s.id, s.name, s.address, s.sido, s.sigungu, s.latitude, s.longitude, s.geo_precision "
+            f"FROM {RTREE_TABLE} r JOIN shops s ON s.id = r.id "
+            f"WHERE r.max_lat >= :min_lat AND r.min_lat <= :max_lat "
+            f"AND r.max_lon >= :min_lon AND r.min_lon <= :max_lon {rank_filter}"
+        )
+    else:
+        sql = (
+            f"SELECT s.id, s.name, s.address, s.sido, s.sigungu, s.latitude, s.longitude, s.geo_precision "
+            f"FROM shops s WHERE s.latitude BETWEEN :min_lat AND :max_lat "
+            f"AND s.longitude BETWEEN :min_lon AND :max_lon {rank_filter}"
+        )
+
+    results = []
+    for row in db.session.execute(text(sql), params):
+        distance = haversine_km(lat, lon, row.latitude, row.longitude)
+        if distance <= radius_km:
+            results.append({**row._asdict(), "distance_km": distance})
+    return results
+
+
+def find_nearby_shops(lat: float, lon: float, radius_km: Optional[float] = None, limit: int = 20,
+                      rank: Optional[int] = None) -> Dict:
+    """
+    좌표에서 가까운 판매점 k개 (좌표가 저장된 판매점만, 조회 중 DB에 쓰지 않는다)
+
+    Args:
+        radius_km: 검색 반경. None이면 k개를 찾을 때까지 반경을 넓힌다 (최대 MAX_RADIUS_KM)
+        rank: 1 또는 2로 해당 등수 당첨 이력이 있는 판매점만
+
+    Returns:
+        {'results': [{'shop_id', 'name', 'address', 'sido', 'sigungu', 'latitude', 'longitude',
+                      'geo_precision', 'distance_km', 'rank1_count', 'rank2_count', 'last_round'}],
+         'radius_km': 실제 검색 반경}
+    """
+    if radius_km is not None:
+        search_radius = min(radius_km, MAX_RADIUS_KM)
+        candidates = _within_radius(lat, lon, search_radius, rank)
+    else:
+        search_radius = KNN_START_RADIUS_KM
+        while True:
+            candidates = _within_radius(lat, lon, search_radius, rank)
+            if len(candidates) >= limit or search_radius >= MAX_RADIUS_KM:
+                break
+            search_radius = min(search_radius * 2, MAX_RADIUS_KM)
+
+    # 같은 행정구역 좌표를 공유하는 판매점은 id 순
+    candidates.sort(key=lambda shop: (shop["distance_km"], shop["id"]))
+    nearest = candidates[:limit]
+
+    stats = {}
+    if nearest:
+        rows = db.session.query(
+            WinningShop.shop_id, WinningShop.rank, db.func.count(), db.func.max(WinningShop.round)
+        ).filter(
+            WinningShop.shop_id.in_([shop["id"] for shop in nearest])
+        ).group_by(WinningShop.shop_id, WinningShop.rank).all()
+        for shop_id, shop_rank, count, last_round in rows:
+            entry = stats.setdefault(shop_id, {"rank1_count": 0, "rank2_count": 0, "last_round": None})
+            entry[f"rank{shop_rank}_count"] = count
+            entry["last_round"] = max(entry["last_round"] or 0, last_round)
+
+    return {
+        "results": [
+            {
+                "shop_id": shop["id"],
+                "name": shop["name"],
+                "address": shop["address"],
+                "sido": shop["sido"],
+                "sigungu": shop["sigungu"],
+                "latitude": shop["latitude"],
+                "longitude": shop["longitude"],
+                "geo_precision": shop["geo_precision"],
+                "distance_km": round(shop["distance_km"], 3),
+                **stats.get(shop["id"], {"rank1_count": 0, "rank2_count": 0, "last_round": None}),
+            }
+            for shop in nearest
+        ],
+        "radius_km": search_radius,
+    }
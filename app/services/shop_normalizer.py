@@ -0,0 +1,196 @@
+"""
+당첨점 정규화 - winning_shops 행을 shops(판매점 단위)로 묶는 배치 작업
+
+같은 판매점이 회차마다 "서울 강남구..." / "서울특별시 강남구..." 처럼 조금씩
+다르게 표기되므로 상호명/주소를 정규화한 canonical_key로 묶고, 주소에서
+시/도, 시/군/구, 읍/면/동을 파싱해 지역 집계를 인덱스 GROUP BY로 처리한다.
+"""
+import re
+import unicodedata
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from ..extensions import db
+from ..models import Shop, WinningShop
+
+# 시/도 표기 -> 짧은 표기 (동행복권 주소 표기 기준)
+SIDO_ALIASES = {
+    '서울특별시': '서울', '서울시': '서울', '서울': '서울',
+    '부산광역시': '부산', '부산시': '부산', '부산': '부산',
+    '대구광역시': '대구', '대구시': '대구', '대구': '대구',
+    '인천광역시': '인천', '인천시': '인천', '인천': '인천',
+    '광주광역시': '광주', '광주': '광주',
+    '대전광역시': '대전', '대전시': '대전', '대전': '대전',
+    '울산광역시': '울산', '울산시': '울산', '울산': '울산',
+    '세종특별자치시': '세종', '세종시': '세종', '세종': '세종',
+    '경기도': '경기', '경기': '경기',
+    '강원특별자치도': '강원', '강원도': '강원', '강원': '강원',
+    '충청북도': '충북', '충북': '충북',
+    '충청남도': '충남', '충남': '충남',
+    '전북특별자치도': '전북', '전라북도': '전북', '전북': '전북',
+    '전라남도': '전남', '전남': '전남',
+    '경상북도': '경북', '경북': '경북',
+    '경상남도': '경남', '경남': '경남',
+    '제주특별자치도': '제주', '제주도': '제주', '제주': '제주',
+}
+
+_PARENTHESIS_RE = re.compile(r'\(([^)]*)\)')
+_DASH_RE = re.compile(r'\s*[-‐‑‒–—―]\s*')
+_BUNJI_RE = re.compile(r'(\d)\s*번지')
+_SPACE_RE = re.compile(r'\s+')
+_DONG_RE = re.compile(r'^[가-힣0-9]+(동|읍|면|가|리)$')
+_NAME_NOISE_RE = re.compile(r'\(주\)|㈜|주식회사')
+
+BATCH_SIZE = 1000
+# SQLite 바인드 변수 제한(999)보다 작게 나눠 조회
+_IN_CHUNK = 500
+
+
+def _clean(value: Optional[str]) -> str:
+    value = unicodedata.normalize('NFC', value or '')
+    return _SPACE_RE.sub(' ', value).strip()
+
+
+def parse_address(address: Optional[str]) -> Dict[str, Optional[str]]:
+    """
+    주소 정규화 및 행정구역 파싱
+
+    Returns:
+        {'address': 정규화 주소, 'sido', 'sigungu', 'dong'} (없으면 None)
+    """
+    text = _clean(address)
+    if not text:
+        return {'address': None, 'sido': None, 'sigungu': None, 'dong': None}
+
+    # 괄호 안 내용은 주소 키에서 제외하되 도로명 주소의 (역삼동) 같은 동 정보로 활용
+    extras = [part.strip() for group in _PARENTHESIS_RE.findall(text) for part in group.split(',')]
+    text = _clean(_PARENTHESIS_RE.sub(' ', text))
+    text = _BUNJI_RE.sub(r'\1', _DASH_RE.sub('-', text))
+
+    tokens = text.split(' ')
+    sido = SIDO_ALIASES.get(tokens[0])
+    if sido:
+        tokens[0] = sido
+    rest = tokens[1:] if sido else tokens
+
+    sigungu = None
+    if rest and rest[0].endswith(('시', '군', '구')):
+        sigungu = rest[0]
+        rest = rest[1:]
+        # 일반구가 있는 시 (예: 수원시 팔달구)
+        if sigungu.endswith('시') and rest and rest[0].endswith('구'):
+            sigungu = f"{sigungu} {rest[0]}"
+            rest = rest[1:]
+
+    dong = None
+    if rest and _DONG_RE.match(rest[0]):
+        dong = rest[0]
+    else:
+        dong = next((part for part in extras if _DONG_RE.match(part)), None)
+
+    return {'address': ' '.join(tokens), 'sido': sido, 'sigungu': sigungu, 'dong': dong}
+
+
+def normalize_name(name: Optional[str]) -> str:
+    """표시용 상호명 (공백 정리)"""
+    return _clean(name)
+
+
+def canonical_key(name: Optional[str], normalized_address: Optional[str]) -> str:
+    """같은 판매점을 식별하는 키: 공백/법인 표기를 제거한 상호명|주소"""
+    name_key = _NAME_NOISE_RE.sub('', normalize_name(name)).replace(' ', '').lower()
+    address_key = (normalized_address or '').replace(' ', '')
+    return f"{name_key}|{address_key}"
+
+
+def _shop_fields(name: Optional[str], address: Optional[str]) -> Tuple[str, Dict]:
+    parsed = parse_address(address)
+    return canonical_key(name, parsed['address']), {
+        'name': normalize_name(name),
+        'address': parsed['address'],
+        'sido': parsed['sido'],
+        'sigungu': parsed['sigungu'],
+        'dong': parsed['dong'],
+    }
+
+
+def normalize_shops(rebuild: bool = False, batch_size: int = BATCH_SIZE) -> Dict:
+    """
+    shop_id가 없는 winning_shops 행을 정규화 판매점에 연결
+
+    Args:
+        rebuild: 모든 행을 다시 정규화 (정규화 규칙 변경 시). 기존 shops.id는
+                 같은 키면 유지되고, 더 이상 참조되지 않는 판매점은 삭제된다.
+
+    Returns:
+        {'linked': 연결된 당첨 행 수, 'created': 새 판매점 수, 'deleted': 삭제된 판매점 수}
+    """
+    if rebuild:
+        db.session.execute(update(WinningShop).values(shop_id=None).execution_options(synchronize_session=False))
+
+    shop_ids = dict(db.session.query(Shop.canonical_key, Shop.id).all())
+    # 이번 실행에서 본 키별 최신 필드 (id 오름차순이므로 마지막 값이 가장 최근에 수집된 표기)
+    latest: Dict[str, Dict] = {}
+    linked = 0
+    created = 0
+
+    last_id = 0
+    while True:
+        rows = db.session.query(
+            WinningShop.id, WinningShop.name, WinningShop.address
+        ).filter(
+            WinningShop.shop_id.is_(None),
+            WinningShop.id > last_id
+        ).order_by(WinningShop.id).limit(batch_size).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        keyed = []
+        new_shops = {}
+        for row in rows:
+            key, fields = _shop_fields(row.name, row.address)
+            latest[key] = fields
+            keyed.append((row.id, key))
+            if key not in shop_ids and key not in new_shops:
+                new_shops[key] = {'canonical_key': key, **fields}
+
+        if new_shops:
+            # 다른 프로세스(크롤링 워커 등)가 같은 키를 먼저 넣었으면 그 판매점을 사용
+            result = db.session.connection().execute(
+                sqlite_insert(Shop).on_conflict_do_nothing(index_elements=[Shop.canonical_key]),
+                list(new_shops.values())
+            )
+            created += max(result.rowcount, 0)
+            keys = list(new_shops)
+            for start in range(0, len(keys), _IN_CHUNK):
+                shop_ids.update(db.session.query(Shop.canonical_key, Shop.id).filter(
+                    Shop.canonical_key.in_(keys[start:start + _IN_CHUNK])
+                ))
+
+        db.session.execute(update(WinningShop), [
+            {'id': row_id, 'shop_id': shop_ids[key]} for row_id, key in keyed
+        ])
+        linked += len(keyed)
+
+    # 대표 표기/지역 정보를 가장 최근 행 기준으로 갱신 (지역이 바뀌었을 수 있으므로 좌표는 다시 계산)
+    if latest:
+        db.session.execute(update(Shop), [
+            {'id': shop_ids[key], **fields, 'geo_precision': None} for key, fields in latest.items()
+        ])
+
+    deleted = 0
+    if rebuild:
+        referenced = db.session.query(WinningShop.shop_id).filter(WinningShop.shop_id.isnot(None))
+        deleted = Shop.query.filter(Shop.id.notin_(referenced)).delete(synchronize_session=False)
+
+    db.session.commit()
+    return {'linked': linked, 'created': created, 'deleted': deleted}
+
+
+def ensure_shops_normalized() -> None:
+    """정규화되지 않은 당첨 행이 있으면 연결 (shop_id 인덱스로 확인)"""
+    if db.session.query(WinningShop.id).filter(WinningShop.shop_id.is_(None)).first():
+        normalize_shops()
@@ -0,0 +1,196 @@
+"""
+당첨점 페이지 HTML 파서
+
+당첨점 페이지에서 필요한 것은 table.tbl_data 표의 헤더/행 텍스트와 페이지네이션
+링크뿐이므로 전체 DOM을 만들 필요가 없다. 백엔드별로 같은 결과 구조를 반환한다.
+
+    {'tables': [{'headers': [th 텍스트], 'rows': [[td 텍스트]]}],
+     'page_links': [{'text', 'href', 'onclick'}]}
+
+셀 텍스트는 BeautifulSoup의 get_text(" ", strip=True)와 같다 (텍스트 조각마다
+strip 후 공백으로 연결). 행은 tbody 안의 tr만 포함한다.
+
+백엔드 (빠른 순):
+    selectolax - 설치된 경우
+    lxml       - 설치된 경우
+    regex      - 표/행/셀만 찾는 정규식 토크나이저 (표준 라이브러리만 사용)
+    bs4        - BeautifulSoup html.parser (기준 구현)
+"""
+import html as html_lib
+import re
+from typing import Callable, Dict, List, Optional
+
+try:
+    from selectolax.parser import HTMLParser as _SelectolaxParser
+except ImportError:
+    _SelectolaxParser = None
+
+try:
+    import lxml.html as _lxml_html
+except ImportError:
+    _lxml_html = None
+
+from bs4 import BeautifulSoup
+
+TABLE_CLASS = "tbl_data"
+PAGINATION_CLASS = "paginate"
+
+
+def _join_fragments(fragments) -> str:
+    return " ".join(text for text in (fragment.strip() for fragment in fragments) if text)
+
+
+def _has_class(class_attr: Optional[str], name: str) -> bool:
+    return name in (class_attr or "").split()
+
+
+# --- regex -----------------------------------------------------------------
+
+_FLAGS = re.IGNORECASE | re.DOTALL
+_COMMENT_RE = re.compile(r"<!--.*?-->", re.DOTALL)
+_SCRIPT_RE = re.compile(r"<(script|style)\b[^>]*>.*?</\1\s*>", _FLAGS)
+_TABLE_RE = re.compile(r"<table\b([^>]*)>(.*?)</table\s*>", _FLAGS)
+_THEAD_RE = re.compile(r"<thead\b[^>]*>(.*?)</thead\s*>", _FLAGS)
+_TBODY_RE = re.compile(r"<tbody\b[^>]*>(.*?)</tbody\s*>", _FLAGS)
+_TR_RE = re.compile(r"<tr\b[^>]*>(.*?)(?=<tr\b|</tbody\s*>|</thead\s*>|$)", _FLAGS)
+_TH_RE = re.compile(r"<th\b[^>]*>(.*?)(?=<t[hd]\b|</tr\s*>|$)", _FLAGS)
+_TD_RE = re.compile(r"<td\b[^>]*>(.*?)(?=<t[hd]\b|</tr\s*>|$)", _FLAGS)
+_TAG_RE = re.compile(r"<[^>]*>")
+_CLASS_ATTR_RE = re.compile(r"""\bclass\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))""", re.IGNORECASE)
+_PAGINATION_RE = re.compile(
+    r"<(\w+)\b[^>]*\bclass\s*=\s*[\"'][^\"']*" + PAGINATION_CLASS + r"[^\"']*[\"'][^>]*>", re.IGNORECASE
+)
+_LINK_RE = re.compile(r"<a\b([^>]*)>(.*?)</a\s*>", _FLAGS)
+_ATTR_RE = {
+    name: re.compile(r"\b" + name + r"""\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))""", re.IGNORECASE)
+    for name in ("href", "onclick")
+}
+
+
+def _attr(attrs: str, pattern) -> Optional[str]:
+    match = pattern.search(attrs)
+    if not match:
+        return None
+    return html_lib.unescape(next(group for group in match.groups() if group is not None))
+
+
+def _cell_text(fragment: str) -> str:
+    return _join_fragments(html_lib.unescape(part) for part in _TAG_RE.split(fragment))
+
+
+def _parse_regex(markup: str) -> Dict:
+    markup = _SCRIPT_RE.sub("", _COMMENT_RE.sub("", markup))
+    tables = []
+    for attrs, body in _TABLE_RE.findall(markup):
+        if not _has_class(_attr(attrs, _CLASS_ATTR_RE), TABLE_CLASS):
+            continue
+        headers = []
+        for thead in _THEAD_RE.findall(body):
+            headers.extend(_cell_text(cell) for cell in _TH_RE.findall(thead))
+        rows = []
+        for tbody in _TBODY_RE.findall(body):
+            for row in _TR_RE.findall(tbody):
+                rows.append([_cell_text(cell) for cell in _TD_RE.findall(row)])
+        tables.append({"headers": headers, "rows": rows})
+
+    page_links = []
+    for match in _PAGINATION_RE.finditer(markup):
+        # 컨테이너의 닫는 태그까지 (페이지네이션 안에는 같은 태그가 중첩되지 않는다고 가정)
+        end = re.compile(r"</" + match.group(1) + r"\s*>", re.IGNORECASE).search(markup, match.end())
+        section = markup[match.end():end.start() if end else len(markup)]
+        for attrs, text in _LINK_RE.findall(section):
+            page_links.append({
+                "text": _cell_text(text),
+                "href": _attr(attrs, _ATTR_RE["href"]),
+                "onclick": _attr(attrs, _ATTR_RE["onclick"]),
+            })
+    return {"tables": tables, "page_links": page_links}
+
+
+# --- bs4 -------------------------------------------------------------------
+
+def _parse_bs4(markup: str) -> Dict:
+    soup = BeautifulSoup(markup, "html.parser")
+    tables = [
+        {
+            "headers": [th.get_text(" ", strip=True) for th in table.select("thead th")],
+            "rows": [[td.get_text(" ", strip=True) for td in tr.select("td")] for tr in table.select("tbody tr")],
+        }
+        for table in soup.select(f"table.{TABLE_CLASS}")
+    ]
+    page_links = [
+        {"text": link.get_text(" ", strip=True), "href": link.get("href"), "onclick": link.get("onclick")}
+        for container in soup.select(f"[class*={PAGINATION_CLASS}]")
+        for link in container.select("a")
+    ]
+    return {"tables": tables, "page_links": page_links}
+
+
+# --- lxml ------------------------------------------------------------------
+
+_LXML_TABLES = f'//table[contains(concat(" ", normalize-space(@class), " "), " {TABLE_CLASS} ")]'
+
+
+def _parse_lxml(markup: str) -> Dict:
+    document = _lxml_html.fromstring(markup)
+    tables = [
+        {
+            "headers": [_join_fragments(th.itertext()) for th in table.xpath("./thead//th")],
+            "rows": [[_join_fragments(td.itertext()) for td in tr.xpath(".//td")]
+                     for tr in table.xpath("./tbody//tr")],
+        }
+        for table in document.xpath(_LXML_TABLES)
+    ]
+    page_links = [
+        {"text": _join_fragments(link.itertext()), "href": link.get("href"), "onclick": link.get("onclick")}
+        for container in document.xpath(f'//*[contains(@class, "{PAGINATION_CLASS}")]')
+        for link in container.xpath(".//a")
+    ]
+    return {"tables": tables, "page_links": page_links}
+
+
+# --- selectolax ------------------------------------------------------------
+
+def _node_text(node) -> str:
+    return node.text(deep=True, separator=" ", strip=True)
+
+
+def _parse_selectolax(markup: str) -> Dict:
+    tree = _SelectolaxParser(markup)
+    tables = [
+        {
+            "headers": [_node_text(th) for th in table.css("thead th")],
+            "rows": [[_node_text(td) for td in tr.css("td")] for tr in table.css("tbody tr")],
+        }
+        for table in tree.css(f"table.{TABLE_CLASS}")
+    ]
+    page_links = [
+        {"text": _node_text(link), "href": link.attributes.get("href"), "onclick": link.attributes.get("onclick")}
+        for container in tree.css(f"[class*={PAGINATION_CLASS}]")
+        for link in container.css("a")
+    ]
+    return {"tables": tables, "page_links": page_links}
+
+
+BACKENDS: Dict[str, Callable[[str], Dict]] = {}
+if _SelectolaxParser is not None:
+    BACKENDS["selectolax"] = _parse_selectolax
+if _lxml_html is not None:
+    BACKENDS["lxml"] = _parse_lxml
+BACKENDS["regex"] = _parse_regex
+BACKENDS["bs4"] = _parse_bs4
+
+DEFAULT_BACKEND = next(iter(BACKENDS))
+
+
+def parse_tables(markup: str, backend: Optional[str] = None) -> Dict:
+    """table.tbl_data 표와 페이지네이션 링크 추출 (backend 생략 시 가장 빠른 백엔드)"""
+    try:
+        parser = BACKENDS[backend or DEFAULT_BACKEND]
+    except KeyError:
+        raise ValueError(f"Unknown or unavailable parser backend: {backend}") from None
+    return parser(markup)
+
+
+def available_backends() -> List[str]:
+    return list(BACKENDS)
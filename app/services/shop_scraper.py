@@ -0,0 +1,197 @@
+"""
+당첨점 증분 수집
+
+회차별 페이지마다 ETag/Last-Modified와 파싱된 행의 해시를 shop_page_states에
+저장해 두고, 다음 수집 때는 상태가 없는(= 아직 저장되지 않은) 페이지만 받는다.
+revalidate=True이면 저장된 페이지도 조건부 요청으로 다시 확인해 바뀐 페이지만
+반영한다. 행은 (등수, 순번) 키의 집합으로 중복을 제거한다.
+
+페이지 상태 없이 당첨점만 있는 회차(이전 방식으로 수집, 일부 페이지만 저장되었을
+수 있음)는 1페이지부터 다시 받아 페이지 수를 확인하고 빠진 행을 채운다.
+
+페이지 상태는 그 페이지의 행이 winning_shops에 커밋된 뒤에만 저장되므로, 수집이
+중간에 실패하면 다음 실행에서 빠진 페이지부터 이어서 받는다.
+"""
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+from ..extensions import db
+from ..models import ShopPageState, WinningShop
+from .lotto_fetcher import MAX_SHOP_PAGES, fetch_shop_page, fetch_shop_pages, shop_row_key
+
+# 기존 행과 비교해 바뀌었으면 갱신하는 필드
+_ROW_FIELDS = ("name", "method", "address")
+
+
+def page_key(round_no: int, page: int) -> str:
+    return f"{round_no}:{page}"
+
+
+def _validators(state: Optional[ShopPageState]) -> Dict:
+    if state is None:
+        return {}
+    return {"etag": state.etag, "last_modified": state.last_modified}
+
+
+def is_round_complete(round_no: int) -> bool:
+    """페이지 수가 확인되었고 모든 페이지가 저장된 회차인지"""
+    states = {state.page: state for state in ShopPageState.query.filter_by(round=round_no)}
+    first = states.get(1)
+    return bool(first and first.page_count and all(page in states for page in range(1, first.page_count + 1)))
+
+
+def complete_shop_rounds(lo: int, hi: int) -> Set[int]:
+    """lo~hi 중 페이지 수가 확인되었고 모든 페이지가 저장된 회차 (is_round_complete를 한 번의 조회로)"""
+    page_counts: Dict[int, int] = {}
+    pages: Dict[int, Set[int]] = {}
+    for round_no, page, page_count in db.session.query(
+        ShopPageState.round, ShopPageState.page, ShopPageState.page_count
+    ).filter(ShopPageState.round.between(lo, hi)):
+        pages.setdefault(round_no, set()).add(page)
+        if page == 1 and page_count:
+            page_counts[round_no] = page_count
+    return {
+        round_no for round_no, page_count in page_counts.items()
+        if pages[round_no].issuperset(range(1, page_count + 1))
+    }
+
+
+def scrape_round_shops(round_no: int, revalidate: bool = False) -> Dict:
+    """
+    회차 당첨점을 빠진/바뀐 페이지만 받아 winning_shops에 반영
+
+    Args:
+        revalidate: 저장된 페이지도 조건부 요청으로 다시 확인
+
+    Returns:
+        {'round', 'added', 'updated', 'fetched', 'not_modified', 'unchanged',
+         'failed', 'page_count', 'complete'}
+    """
+    states: Dict[int, ShopPageState] = {
+        state.page: state for state in ShopPageState.query.filter_by(round=round_no)
+    }
+    existing = {
+        shop_row_key({"rank": row.rank, "sequence": row.sequence, "name": row.name, "address": row.address}): row
+        for row in WinningShop.query.filter_by(round=round_no)
+    }
+    stats = {"round": round_no, "added": 0, "updated": 0, "fetched": 0, "not_modified": 0,
+             "unchanged": 0, "failed": 0}
+
+    # 상태 없이 저장된 행은 어느 페이지 것인지 모르므로 페이지 끝 판정에 쓰지 않는다
+    legacy = not states and bool(existing)
+
+    # 페이지 결과를 모아 두었다가 한 번에 반영
+    results: Dict[int, Dict] = {}
+    # 이번 실행에서 받은 행의 키 (페이지 끝 판정용)
+    run_keys = set()
+
+    def fetch_one(page: int) -> Optional[Dict]:
+        try:
+            return fetch_shop_page(round_no, page, refresh=revalidate, **_validators(states.get(page)))
+        except Exception:
+            stats["failed"] += 1
+            return None
+
+    first_state = states.get(1)
+    if first_state is None or revalidate:
+        first = fetch_one(1)
+        if first is None:
+            stats.update(page_count=first_state.page_count if first_state else None, complete=False)
+            return stats
+        # 아직 당첨점이 공개되지 않은 회차: 상태를 남기지 않아 다음에 다시 시도
+        if not first["not_modified"] and not first["rows"]:
+            stats.update(page_count=None, complete=False)
+            return stats
+        results[1] = first
+        run_keys.update(shop_row_key(row) for row in first["rows"])
+        page_count = first["page_count"] or (first_state.page_count if first_state else None)
+    else:
+        page_count = first_state.page_count
+
+    def wanted(page: int) -> bool:
+        return page not in states or revalidate
+
+    if page_count:
+        pages = [page for page in range(2, page_count + 1) if wanted(page)]
+        for page, result in fetch_shop_pages(
+            round_no, pages, {page: _validators(states.get(page)) for page in pages}, refresh=revalidate
+        ).items():
+            if isinstance(result, Exception):
+                stats["failed"] += 1
+            else:
+                results[page] = result
+    else:
+        # 페이지 수를 모르면 새 행이 없는 페이지가 나올 때까지 순서대로
+        # (상태가 없는 페이지의 행은 아직 저장되지 않았으므로 저장된 행과 겹치면 끝 페이지의 반복,
+        #  단 이전 방식으로 저장된 회차는 이번 실행에서 받은 행만 비교)
+        for page in range(2, MAX_SHOP_PAGES + 1):
+            if not wanted(page):
+                continue
+            result = fetch_one(page)
+            if result is None:
+                break
+            if not result["not_modified"]:
+                keys = {shop_row_key(row) for row in result["rows"]}
+                if all(key in run_keys or (not revalidate and not legacy and key in existing) for key in keys):
+                    page_count = page - 1
+                    break
+                run_keys.update(keys)
+            results[page] = result
+        else:
+            page_count = MAX_SHOP_PAGES
+
+    now = datetime.utcnow()
+    for page in sorted(results):
+        result = results[page]
+        state = states.get(page)
+        if result["not_modified"]:
+            stats["not_modified"] += 1
+        elif state is not None and state.content_hash == result["content_hash"]:
+            stats["unchanged"] += 1
+        else:
+            stats["fetched"] += 1
+            _apply_rows(round_no, result["rows"], existing, stats)
+
+        if state is None:
+            state = ShopPageState(page_key=page_key(round_no, page), round=round_no, page=page)
+            db.session.add(state)
+            states[page] = state
+        state.etag = result["etag"]
+        state.last_modified = result["last_modified"]
+        if not result["not_modified"]:
+            state.content_hash = result["content_hash"]
+            state.row_count = len(result["rows"])
+        state.fetched_at = now
+
+    if 1 in states and page_count:
+        states[1].page_count = page_count
+    db.session.commit()
+
+    stats["page_count"] = page_count
+    stats["complete"] = bool(page_count) and all(page in states for page in range(1, page_count + 1))
+    return stats
+
+
+def _apply_rows(round_no: int, rows: List[Dict], existing: Dict, stats: Dict) -> None:
+    for shop_data in rows:
+        key = shop_row_key(shop_data)
+        row = existing.get(key)
+        if row is None:
+            row = WinningShop(
+                round=round_no,
+                rank=shop_data["rank"],
+                sequence=shop_data.get("sequence"),
+                name=shop_data["name"],
+                method=shop_data.get("method"),
+                address=shop_data.get("address"),
+                winners_count=shop_data.get("winners_count"),
+            )
+            db.session.add(row)
+            existing[key] = row
+            stats["added"] += 1
+        elif any(getattr(row, field) != shop_data.get(field) for field in _ROW_FIELDS):
+            for field in _ROW_FIELDS:
+                setattr(row, field, shop_data.get(field))
+            # 표기가 바뀌었으므로 정규화 판매점에 다시 연결
+            row.shop_id = None
+            stats["updated"] += 1
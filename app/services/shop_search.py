@@ -0,0 +1,187 @@
+"""
+당첨점 전문 검색 - SQLite FTS5 trigram 인덱스
+
+winning_shops_fts는 winning_shops를 content 테이블로 삼는 외부 콘텐츠
+FTS5 테이블이며 INSERT/UPDATE/DELETE 트리거로 동기화된다. trigram 토크나이저라
+한글 부분 문자열 검색도 인덱스를 탄다. trigram은 3글자 이상부터 매칭되므로
+더 짧은 검색어는 LIKE 조건으로 처리한다.
+"""
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event, text
+
+from ..extensions import db
+from ..models import WinningShop
+
+FTS_TABLE = "winning_shops_fts"
+MIN_TRIGRAM_LENGTH = 3
+
+_FTS_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, address,
+        content='winning_shops', content_rowid='id',
+        tokenize='trigram'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON winning_shops BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, address) VALUES (new.id, new.name, new.address);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON winning_shops BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, address) VALUES ('delete', old.id, old.name, old.address);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name, address ON winning_shops BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, address) VALUES ('delete', old.id, old.name, old.address);
+        INSERT INTO {FTS_TABLE}(rowid, name, address) VALUES (new.id, new.name, new.address);
+    END""",
+]
+
+# 인덱스 존재를 확인한 엔진 (프로세스당 한 번만 확인)
+_ready_engines = set()
+
+
+def create_shop_search_index(connection) -> bool:
+    """FTS 테이블과 동기화 트리거 생성 (SQLite 전용)
+
+    새로 만든 경우 기존 winning_shops 행으로 인덱스를 채운다.
+
+    Returns:
+        새로 생성했으면 True
+    """
+    if connection.dialect.name != "sqlite":
+        return False
+
+    exists = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": FTS_TABLE}
+    ).first()
+
+    for statement in _FTS_DDL:
+        connection.execute(text(statement))
+    if not exists:
+        connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    return not exists
+
+
+def rebuild_shop_search_index() -> None:
+    """content 테이블 기준으로 FTS 인덱스 전체 재구성"""
+    with db.engine.begin() as connection:
+        create_shop_search_index(connection)
+        connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+
+def ensure_shop_search_index() -> bool:
+    """검색 인덱스 준비 (기존 DB는 첫 검색 시 생성). SQLite가 아니면 False"""
+    engine = db.engine
+    if engine.dialect.name != "sqlite":
+        return False
+    if engine.url not in _ready_engines:
+        with engine.begin() as connection:
+            create_shop_search_index(connection)
+        _ready_engines.add(engine.url)
+    return True
+
+
+@event.listens_for(WinningShop.__table__, "after_create")
+def _create_index_with_table(target, connection, **kw):
+    # db.create_all()로 새 DB를 만들 때 함께 생성
+    create_shop_search_index(connection)
+
+
+def _split_terms(query: str) -> Tuple[List[str], List[str]]:
+    """(trigram으로 찾을 검색어, LIKE로 찾을 짧은 검색어)"""
+    terms = [term for term in query.split() if term]
+    long_terms = [term for term in terms if len(term) >= MIN_TRIGRAM_LENGTH]
+    short_terms = [term for term in terms if len(term) < MIN_TRIGRAM_LENGTH]
+    return long_terms, short_terms
+
+
+def _match_expression(terms: List[str]) -> str:
+    # 각 검색어를 구문(phrase)으로 감싸 FTS 연산자 문자를 그대로 검색
+    return " AND ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+def _escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def search_shops(query: str, rank: Optional[int] = None, page: int = 1, per_page: int = 100,
+                 sort: str = "relevance") -> Dict:
+    """
+    판매점명/주소 검색
+
+    Args:
+        query: 공백으로 구분된 검색어 (모두 포함하는 행만 반환)
+        rank: 1 또는 2로 등수 필터 (None이면 전체)
+        sort: 'relevance' (bm25 순위) 또는 'recent' (최근 회차순)
+
+    Returns:
+        {'results', 'total_count', 'rank1_count', 'rank2_count', 'page', 'per_page', 'total_pages'}
+        rank1_count/rank2_count는 등수 필터와 무관한 전체 일치 건수
+    """
+    long_terms, short_terms = _split_terms(query)
+    params = {}
+    conditions = []
+
+    use_fts = bool(long_terms) and ensure_shop_search_index()
+    if use_fts:
+        source = f"{FTS_TABLE} JOIN winning_shops ws ON ws.id = {FTS_TABLE}.rowid"
+        conditions.append(f"{FTS_TABLE} MATCH :match")
+        params["match"] = _match_expression(long_terms)
+        like_terms = short_terms
+    else:
+        source = "winning_shops ws"
+        like_terms = long_terms + short_terms
+
+    for i, term in enumerate(like_terms):
+        conditions.append(
+            f"(ws.name LIKE :like{i} ESCAPE '\\' OR ws.address LIKE :like{i} ESCAPE '\\')"
+        )
+        params[f"like{i}"] = f"%{_escape_like(term)}%"
+
+    where = " AND ".join(conditions) or "1 = 1"
+
+    # 등수별 정확한 전체 건수 (인덱스에서 집계)
+    rank_counts = {
+        row_rank: count
+        for row_rank, count in db.session.execute(
+            text(f"SELECT ws.rank, COUNT(*) FROM {source} WHERE {where} GROUP BY ws.rank"), params
+        )
+    }
+    total_count = rank_counts.get(rank, 0) if rank else sum(rank_counts.values())
+
+    if sort == "relevance" and use_fts:
+        order_by = f"{FTS_TABLE}.rank, ws.round DESC, ws.rank ASC"
+    else:
+        order_by = "ws.round DESC, ws.rank ASC"
+
+    page_where = where
+    if rank:
+        page_where += " AND ws.rank = :rank"
+        params["rank"] = rank
+
+    page = max(page, 1)
+    params["limit"] = per_page
+    params["offset"] = (page - 1) * per_page
+    rows = db.session.execute(text(
+        f"SELECT ws.round, ws.rank, ws.name, ws.address, ws.method, ws.winners_count "
+        f"FROM {source} WHERE {page_where} ORDER BY {order_by} LIMIT :limit OFFSET :offset"
+    ), params).all()
+
+    return {
+        "results": [
+            {
+                "round": row.round,
+                "rank": row.rank,
+                "name": row.name,
+                "address": row.address,
+                "method": row.method,
+                "winners_count": row.winners_count
+            }
+            for row in rows
+        ],
+        "total_count": total_count,
+        "rank1_count": rank_counts.get(1, 0),
+        "rank2_count": rank_counts.get(2, 0),
+        "page": page,
+        "per_page": per_page,
+        "total_pages": (total_count + per_page - 1) // per_page,
+    }
@@ -0,0 +1,148 @@
+"""
+Monte Carlo expected-value simulation for a ticket set.
+
+Simulated draws are uniform over all C(45, 6) combinations plus a bonus number.
+The prize paid per tier is taken from a historical round picked at random for
+each simulated draw, so the payout follows the real prize/winner distribution
+instead of fixed estimates.
+"""
+from typing import Dict, Iterator, Optional, Sequence
+
+import numpy as np
+
+from ..extensions import db
+from ..models import Draw
+from .combinations import TOTAL_COMBINATIONS, get_combination_index, tickets_to_masks
+from .lottery_checker import ESTIMATED_PRIZES, rank_masks
+from .sampler import NUMBER_COUNT
+
+TICKET_PRICE = 1000
+
+# Simulated draws per vectorized batch (~400MB peak at 10^7)
+SIMULATION_BATCH_SIZE = 10_000_000
+
+
+def load_prize_table() -> np.ndarray:
+    """(H, 6) per-ticket prize by rank for rounds with complete prize data.
+
+    Column 0 (no prize) is always 0. Falls back to a single row of
+    ESTIMATED_PRIZES when no round has prize data yet.
+    """
+    rows = db.session.query(
+        Draw.first_prize_amount, Draw.second_prize_amount, Draw.third_prize_amount,
+        Draw.fourth_prize_amount, Draw.fifth_prize_amount
+    ).filter(
+        Draw.first_prize_amount.isnot(None),
+        Draw.second_prize_amount.isnot(None),
+        Draw.third_prize_amount.isnot(None),
+        Draw.fourth_prize_amount.isnot(None),
+        Draw.fifth_prize_amount.isnot(None)
+    ).all()
+
+    if not rows:
+        rows = [tuple(ESTIMATED_PRIZES[rank] for rank in range(1, 6))]
+
+    table = np.zeros((len(rows), 6), dtype=np.int64)
+    table[:, 1:] = np.array(rows, dtype=np.int64)
+    return table
+
+
+def _random_draws(count: int, rng: np.random.Generator):
+    """(winning masks, bonus masks) for `count` uniform random draws."""
+    winning = get_combination_index().masks[rng.integers(TOTAL_COMBINATIONS, size=count)]
+
+    # Bonus is uniform over the 39 remaining numbers: redraw the few that collide
+    bonus = np.left_shift(np.uint64(1), rng.integers(NUMBER_COUNT, size=count).astype(np.uint64))
+    clash = np.flatnonzero(bonus & winning)
+    while len(clash):
+        bonus[clash] = np.left_shift(np.uint64(1), rng.integers(NUMBER_COUNT, size=len(clash)).astype(np.uint64))
+        clash = clash[(bonus[clash] & winning[clash]) != 0]
+    return winning, bonus
+
+
+def iter_simulation(tickets: Sequence[Sequence[int]], simulations: int = 1_000_000,
+                    batch_size: int = SIMULATION_BATCH_SIZE, seed: Optional[int] = None,
+                    prize_table: Optional[np.ndarray] = None) -> Iterator[Dict]:
+    """
+    Run the simulation batch by batch.
+
+    Yields {'type': 'progress', 'done', 'total'} after every batch and finally
+    {'type': 'result', ...} (see simulate()).
+    """
+    ticket_masks = tickets_to_masks(np.asarray(tickets, dtype=np.int64).reshape(-1, 6))
+    if prize_table is None:
+        prize_table = load_prize_table()
+    flat_prizes = prize_table.ravel()
+    rng = np.random.default_rng(seed)
+
+    tier_hits = np.zeros((len(ticket_masks), 6), dtype=np.int64)
+    any_win = 0
+    # Running mean / sum of squared deviations of the per-draw payout (Chan et al.)
+    mean = 0.0
+    m2 = 0.0
+    max_payout = 0
+
+    done = 0
+    while done < simulations:
+        n = min(batch_size, simulations - done)
+        winning, bonus = _random_draws(n, rng)
+        prize_rows = rng.integers(len(prize_table), size=n) * 6
+
+        payout = np.zeros(n, dtype=np.int64)
+        won = np.zeros(n, dtype=bool)
+        for i, mask in enumerate(ticket_masks):
+            ranks = rank_masks(mask, winning, bonus)
+            tier_hits[i] += np.bincount(ranks, minlength=6)
+            payout += flat_prizes[prize_rows + ranks]
+            won |= ranks > 0
+
+        batch_mean = float(payout.mean())
+        batch_m2 = float(((payout - batch_mean) ** 2).sum())
+        total = done + n
+        delta = batch_mean - mean
+        mean += delta * n / total
+        m2 += batch_m2 + delta * delta * done * n / total
+        any_win += int(np.count_nonzero(won))
+        max_payout = max(max_payout, int(payout.max()))
+
+        done = total
+        yield {'type': 'progress', 'done': done, 'total': simulations}
+
+    cost = len(ticket_masks) * TICKET_PRICE
+    variance = m2 / (done - 1) if done > 1 else 0.0
+    per_ticket = tier_hits / done if done else tier_hits.astype(float)
+
+    yield {
+        'type': 'result',
+        'simulations': done,
+        'tickets': len(ticket_masks),
+        'cost': cost,
+        'expected_payout': mean,
+        'expected_value': mean - cost,
+        'expected_return_rate': mean / cost if cost else 0.0,
+        'variance': variance,
+        'std': variance ** 0.5,
+        'std_error': (variance / done) ** 0.5 if done else 0.0,
+        'win_probability': any_win / done if done else 0.0,
+        'max_payout': max_payout,
+        'tier_probabilities': {rank: float(per_ticket[:, rank].mean()) for rank in range(1, 6)},
+        'ticket_tier_hits': [{rank: int(row[rank]) for rank in range(1, 6)} for row in tier_hits],
+        'prize_rounds': len(prize_table),
+    }
+
+
+def simulate(tickets: Sequence[Sequence[int]], simulations: int = 1_000_000,
+             batch_size: int = SIMULATION_BATCH_SIZE, seed: Optional[int] = None) -> Dict:
+    """
+    Estimate expected value and variance of a ticket set for the next round.
+
+    Returns:
+        {'simulations', 'tickets', 'cost', 'expected_payout', 'expected_value',
+         'expected_return_rate', 'variance', 'std', 'std_error', 'win_probability',
+         'max_payout', 'tier_probabilities', 'ticket_tier_hits', 'prize_rounds'}
+    """
+    result = None
+    for event in iter_simulation(tickets, simulations, batch_size, seed):
+        result = event
+    result.pop('type')
+    return result
@@ -0,0 +1,278 @@
+"""
+draws / winning_shops 컬럼 스냅샷 (Arrow IPC, Parquet)
+
+새 인스턴스를 dhlottery에서 다시 수집하거나 SQLite 파일을 복사하지 않고
+스냅샷 디렉터리 하나로 채운다. 같은 파일을 오프라인 분석(pandas, DuckDB,
+scripts/backtest.py --snapshot)에서도 그대로 읽을 수 있다.
+
+    <스냅샷>/manifest.json          생성 시각, 행 수, 회차 범위, 파일 목록
+    <스냅샷>/draws.arrow            Arrow IPC 파일 (비압축: 메모리 맵으로 복사 없이 로드)
+    <스냅샷>/winning_shops.arrow
+    <스냅샷>/draws.parquet          Parquet (zstd 압축, 외부 도구/보관용)
+    <스냅샷>/winning_shops.parquet
+
+draws.numbers는 int8 6개 고정 길이 리스트라 Arrow 파일을 메모리 맵으로 열면
+(회차 수, 6) NumPy 행렬을 복사 없이 얻는다 (load_draw_arrays).
+
+pyarrow가 필요하다 (선택 의존성, 없으면 SnapshotUnavailable).
+"""
+import json
+import os
+import re
+import shutil
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from sqlalchemy import select
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+from ..extensions import db
+from ..models import Draw, WinningShop
+from .draw_ingest import PRIZE_FIELDS, ingest_rounds
+from .leaderboards import refresh_leaderboards
+from .sampler import PICK_COUNT
+
+FORMATS = ("arrow", "parquet")
+TABLES = ("draws", "winning_shops")
+MANIFEST = "manifest.json"
+SNAPSHOT_VERSION = 1
+
+# 스냅샷 이름 (디렉터리 이름으로 쓰므로 경로 구분자 불가)
+_NAME_RE = re.compile(r"^[A-Za-z0-9_.-]+$")
+
+
+class SnapshotUnavailable(RuntimeError):
+    """pyarrow가 설치되지 않은 경우"""
+
+
+def _require_pyarrow() -> None:
+    if pa is None:
+        raise SnapshotUnavailable("pyarrow가 설치되어 있지 않습니다 (pip install pyarrow)")
+
+
+def _draw_schema():
+    return pa.schema(
+        [
+            ("round", pa.int32()),
+            ("draw_date", pa.date32()),
+            ("numbers", pa.list_(pa.int8(), PICK_COUNT)),
+            ("bonus", pa.int8()),
+        ]
+        + [(field, pa.int64()) for field in PRIZE_FIELDS]
+        + [("created_at", pa.timestamp("us"))],
+        metadata={"snapshot_version": str(SNAPSHOT_VERSION)},
+    )
+
+
+def _shop_schema():
+    return pa.schema([
+        ("round", pa.int32()),
+        ("rank", pa.int8()),
+        ("sequence", pa.int32()),
+        ("name", pa.string()),
+        ("method", pa.string()),
+        ("address", pa.string()),
+        ("winners_count", pa.int32()),
+        ("created_at", pa.timestamp("us")),
+    ], metadata={"snapshot_version": str(SNAPSHOT_VERSION)})
+
+
+def draws_table():
+    """draws 전체를 Arrow 테이블로 (ORM 객체 없이 한 번 조회)"""
+    _require_pyarrow()
+    columns = [Draw.round, Draw.draw_date, Draw.numbers, Draw.bonus] + \
+        [getattr(Draw, field) for field in PRIZE_FIELDS] + [Draw.created_at]
+    rows = db.session.execute(select(*columns).order_by(Draw.round)).all()
+
+    numbers = np.array([[int(x) for x in row.numbers.split(",") if x] for row in rows],
+                       dtype=np.int8).reshape(-1, PICK_COUNT)
+    arrays = [
+        pa.array([row.round for row in rows], pa.int32()),
+        pa.array([row.draw_date for row in rows], pa.date32()),
+        pa.FixedSizeListArray.from_arrays(pa.array(numbers.ravel(), pa.int8()), PICK_COUNT),
+        pa.array([row.bonus for row in rows], pa.int8()),
+    ]
+    arrays += [pa.array([getattr(row, field) for row in rows], pa.int64()) for field in PRIZE_FIELDS]
+    arrays.append(pa.array([row.created_at for row in rows], pa.timestamp("us")))
+    return pa.Table.from_arrays(arrays, schema=_draw_schema())
+
+
+def winning_shops_table():
+    _require_pyarrow()
+    schema = _shop_schema()
+    rows = db.session.execute(
+        select(*(getattr(WinningShop, name) for name in schema.names)).order_by(WinningShop.round, WinningShop.id)
+    ).all()
+    return pa.Table.from_arrays(
+        [pa.array([row[i] for row in rows], field.type) for i, field in enumerate(schema)], schema=schema
+    )
+
+
+def _write(table, path: Path, fmt: str) -> None:
+    if fmt == "arrow":
+        with pa.OSFile(str(path), "wb") as sink, pa_ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        pq.write_table(table, str(path), compression="zstd")
+
+
+def export_snapshot(directory, formats: Iterable[str] = FORMATS) -> Dict:
+    """
+    draws / winning_shops를 스냅샷 디렉터리로 내보내기 (임시 디렉터리에 쓴 뒤 교체)
+
+    Returns:
+        manifest dict
+    """
+    _require_pyarrow()
+    formats = list(formats)
+    for fmt in formats:
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown snapshot format: {fmt}")
+
+    directory = Path(directory)
+    directory.parent.mkdir(parents=True, exist_ok=True)
+    tables = {"draws": draws_table(), "winning_shops": winning_shops_table()}
+    rounds = tables["draws"].column("round")
+
+    manifest = {
+        "version": SNAPSHOT_VERSION,
+        "created_at": datetime.utcnow().isoformat(),
+        "min_round": pc.min(rounds).as_py() if len(rounds) else None,
+        "max_round": pc.max(rounds).as_py() if len(rounds) else None,
+        "tables": {name: {"rows": table.num_rows} for name, table in tables.items()},
+        "files": [],
+    }
+
+    staging = Path(tempfile.mkdtemp(dir=directory.parent, prefix=f".{directory.name}-"))
+    try:
+        for name, table in tables.items():
+            for fmt in formats:
+                filename = f"{name}.{fmt}"
+                _write(table, staging / filename, fmt)
+                manifest["files"].append({"name": filename, "bytes": (staging / filename).stat().st_size})
+        (staging / MANIFEST).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+        if directory.exists():
+            shutil.rmtree(directory)
+        os.replace(staging, directory)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return manifest
+
+
+def _read_table(directory: Path, name: str):
+    """Arrow 파일이 있으면 메모리 맵으로, 없으면 Parquet에서 읽기"""
+    arrow_path = directory / f"{name}.arrow"
+    if arrow_path.exists():
+        return pa_ipc.open_file(pa.memory_map(str(arrow_path), "r")).read_all()
+    parquet_path = directory / f"{name}.parquet"
+    if parquet_path.exists():
+        return pq.read_table(str(parquet_path))
+    raise FileNotFoundError(f"{name} 스냅샷 파일이 없습니다: {directory}")
+
+
+def _column_numpy(table, name: str) -> np.ndarray:
+    column = table.column(name)
+    if column.num_chunks == 1:
+        return column.chunk(0).to_numpy(zero_copy_only=column.null_count == 0)
+    return column.to_numpy()
+
+
+def load_draw_arrays(directory) -> Dict[str, np.ndarray]:
+    """
+    스냅샷의 추첨 결과를 NumPy 배열로 (회차 오름차순)
+
+    Arrow 파일은 메모리 맵으로 열어 rounds/numbers/bonus를 복사 없이 반환한다
+    (읽기 전용). 당첨금은 수집되지 않은 값(NULL)을 -1로 채운 사본이다.
+
+    Returns:
+        {'rounds': int32 (n,), 'numbers': int8 (n, 6), 'bonus': int8 (n,),
+         'prizes': {필드: int64 (n,)}}
+    """
+    _require_pyarrow()
+    table = _read_table(Path(directory), "draws")
+    numbers = table.column("numbers")
+    if numbers.num_chunks == 1:
+        values = numbers.chunk(0).values.to_numpy(zero_copy_only=True)
+    else:
+        values = numbers.combine_chunks().values.to_numpy()
+    return {
+        "rounds": _column_numpy(table, "round"),
+        "numbers": values.reshape(-1, PICK_COUNT),
+        "bonus": _column_numpy(table, "bonus"),
+        "prizes": {field: table.column(field).fill_null(-1).to_numpy() for field in PRIZE_FIELDS},
+    }
+
+
+def import_snapshot(directory, data_type: str = "both") -> Dict:
+    """
+    스냅샷을 DB에 반영 (draw_ingest의 일괄 저장 경로 사용)
+
+    없는 회차는 추가하고, 당첨금이 비어 있는 회차는 채우며, 당첨점은 새 행만 추가한다.
+    당첨점이 추가되면 순위표를 다시 계산한다 (조합 특성 저장소는 ingest_rounds가 갱신).
+
+    Returns:
+        {'rounds', 'draws_updated', 'shops_updated', 'manifest'}
+    """
+    _require_pyarrow()
+    directory = Path(directory)
+    manifest = json.loads((directory / MANIFEST).read_text(encoding="utf-8")) \
+        if (directory / MANIFEST).exists() else None
+
+    payloads: Dict[int, Dict] = {}
+    if data_type in ("both", "numbers"):
+        for row in _read_table(directory, "draws").to_pylist():
+            payloads[row["round"]] = {"round": row["round"], "draw": row, "shops": None}
+    if data_type in ("both", "shops"):
+        shops: Dict[int, List[Dict]] = {}
+        for row in _read_table(directory, "winning_shops").to_pylist():
+            shops.setdefault(row["round"], []).append(row)
+        for round_no, rows in shops.items():
+            payloads.setdefault(round_no, {"round": round_no, "draw": None, "shops": None})["shops"] = rows
+
+    results = ingest_rounds(payloads.values(), data_type)
+    shops_updated = sum(1 for result in results if result["shops_updated"])
+    if shops_updated:
+        refresh_leaderboards()
+    return {
+        "rounds": len(results),
+        "draws_updated": sum(1 for result in results if result["draw_updated"]),
+        "shops_updated": shops_updated,
+        "manifest": manifest,
+    }
+
+
+def snapshot_root(instance_path: str) -> Path:
+    return Path(instance_path) / "snapshots"
+
+
+def resolve_snapshot(instance_path: str, name: str) -> Optional[Path]:
+    """instance/snapshots 아래의 스냅샷 경로 (이름이 잘못되었거나 없으면 None)"""
+    if not _NAME_RE.match(name or "") or name.startswith("."):
+        return None
+    path = snapshot_root(instance_path) / name
+    return path if (path / MANIFEST).exists() else None
+
+
+def list_snapshots(instance_path: str) -> List[Dict]:
+    root = snapshot_root(instance_path)
+    snapshots = []
+    for path in sorted(root.glob(f"*/{MANIFEST}"), reverse=True):
+        if path.parent.name.startswith("."):
+            continue
+        try:
+            manifest = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        snapshots.append({"name": path.parent.name, **manifest})
+    return snapshots
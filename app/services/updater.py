@@ -1,20 +1,38 @@
 import requests
 import time
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
 
 from flask import Flask
 
 from ..extensions import db
 from ..models import Draw, WinningShop
-from .lotto_fetcher import fetch_draw, fetch_winning_shops, NUMBERS_URL, DEFAULT_HEADERS, CONNECT_TIMEOUT, READ_TIMEOUT
-
-
-def perform_update(round_no: int, data_type: str = 'both') -> dict:
+from .leaderboards import refresh_leaderboards
+from .lottery_checker import reprice_purchases
+from .shop_geo import geocode_shops
+from .shop_normalizer import normalize_shops
+from .shop_scraper import complete_shop_rounds, scrape_round_shops
+from . import http_cache
+from .async_fetcher import DEFAULT_CONCURRENCY, DEFAULT_RATE, run_fetch_rounds
+from .draw_ingest import ingest_rounds
+from .feature_store import schedule_refresh as schedule_feature_store_refresh
+from .round_gaps import expand_ranges, missing_ranges
+from .http_cache import cached_get
+from .lotto_fetcher import fetch_draw, draw_response_ttl, NUMBERS_URL, DEFAULT_HEADERS, CONNECT_TIMEOUT, READ_TIMEOUT
+
+
+def perform_update(round_no: int, data_type: str = 'both', refresh_boards: bool = True,
+                   revalidate_shops: bool = False, refresh_features: bool = True) -> dict:
     """Update draw data and/or winning shops for a round based on data_type.
 
     Args:
         round_no: Round number to update
         data_type: 'both', 'numbers', or 'shops'
+        refresh_boards: Recompute shop leaderboards when new shops were saved
+            (bulk callers pass False and refresh once at the end)
+        revalidate_shops: Re-check already scraped shop pages with conditional
+            requests instead of only fetching missing pages
+        refresh_features: Rebuild the combination feature store in the background
+            when the draw was saved (bulk callers pass False and schedule once at the end)
 
     Handles draw and shops independently - if draw exists, only updates missing data.
     """
@@ -67,34 +85,24 @@ def perform_update(round_no: int, data_type: str = 'both') -> dict:
             existing_draw.fifth_prize_winners = data.get("fifth_prize_winners")
             existing_draw.total_tickets_sold = data.get("total_tickets_sold")
             db.session.commit()
+            # 예상값으로 계산된 기존 당첨금을 실제 배당금으로 소급 적용
+            reprice_purchases(round_no)
             draw_updated = True
 
+        if draw_updated and refresh_features:
+            schedule_feature_store_refresh()
+
     # Update shops data if requested
     if data_type in ['both', 'shops']:
-        existing_shops_count = WinningShop.query.filter_by(round=round_no).count()
-
-        if existing_shops_count == 0:
-            # Fetch and save winning shops
-            shops = fetch_winning_shops(round_no)
-            if shops:
-                # Clear any existing shops first (safety measure)
-                WinningShop.query.filter_by(round=round_no).delete()
-
-                # Add new shops
-                for s in shops:
-                    db.session.add(
-                        WinningShop(
-                            round=round_no,
-                            rank=s["rank"],
-                            sequence=s.get("sequence"),
-                            name=s["name"],
-                            method=s.get("method"),
-                            address=s.get("address"),
-                            winners_count=s.get("winners_count"),
-                        )
-                    )
-                db.session.commit()
-                shops_updated = True
+        # 빠진/바뀐 페이지만 받아 반영 (모든 페이지를 받은 회차는 요청 없이 건너뜀)
+        scrape = scrape_round_shops(round_no, revalidate=revalidate_shops)
+        if scrape["added"] or scrape["updated"]:
+            # 새 당첨 행을 정규화 판매점에 연결하고 좌표 부여
+            normalize_shops()
+            geocode_shops()
+            shops_updated = True
+            if refresh_boards:
+                refresh_leaderboards()
 
     # Determine status
     if draw_updated and shops_updated:
@@ -113,20 +121,133 @@ def perform_update(round_no: int, data_type: str = 'both') -> dict:
     }
 
 
-def update_range(start_round: int, end_round: int, data_type: str = 'both') -> dict:
-    """Update a range of rounds, handling draws and shops based on data_type."""
-    results: list[dict] = []
-    for r in range(start_round, end_round + 1):
-        results.append(perform_update(r, data_type))
+def rounds_needing_fetch(rounds: List[int], data_type: str = 'both') -> List[int]:
+    """Rounds whose draw is missing or whose shop pages are not fully scraped yet.
+
+    Draws without prize info (total_sales or first_prize_amount NULL) count as
+    missing, matching perform_update, so the bulk path refills and reprices them.
+    Rounds with shop rows but no page state (scraped before page states
+    existed, possibly partially) count as not scraped.
+    """
+    rounds = list(rounds)
+    if not rounds:
+        return []
+    lo, hi = min(rounds), max(rounds)
+    have_draw = {r for (r,) in db.session.query(Draw.round).filter(
+        Draw.round.between(lo, hi),
+        Draw.total_sales.isnot(None),
+        Draw.first_prize_amount.isnot(None),
+    )}
+    have_shops = complete_shop_rounds(lo, hi)
+
+    needed = []
+    for r in rounds:
+        if (data_type in ('both', 'numbers') and r not in have_draw) or \
+                (data_type in ('both', 'shops') and r not in have_shops):
+            needed.append(r)
+    return needed
+
+
+def prefetch_rounds(rounds: List[int], data_type: str = 'both', concurrency: int = DEFAULT_CONCURRENCY,
+                    rate: float = DEFAULT_RATE, on_round: Optional[Callable[[int], None]] = None) -> Optional[dict]:
+    """Warm the HTTP response cache for rounds with the asyncio fetcher.
+
+    The per-round DB update that follows then reads every response from the
+    cache instead of fetching one request at a time. Only runs in the 'normal'
+    cache mode (replay needs no fetching; refresh/off would not use the cache).
+    on_round is called after each round is fetched (see run_fetch_rounds).
+
+    Returns the fetcher stats, or None when skipped.
+    """
+    if http_cache.get_mode() != 'normal':
+        return None
+    rounds = rounds_needing_fetch(rounds, data_type)
+    if not rounds:
+        return None
+    result = run_fetch_rounds(
+        rounds,
+        draws=data_type in ('both', 'numbers'),
+        shops=data_type in ('both', 'shops'),
+        concurrency=concurrency,
+        rate=rate,
+        on_round=on_round,
+    )
+    return {"rounds": len(rounds), "transport": result["transport"], **result["stats"]}
+
+
+def bulk_update_rounds(rounds: List[int], data_type: str = 'both', concurrency: int = DEFAULT_CONCURRENCY,
+                       rate: float = DEFAULT_RATE) -> dict:
+    """Fetch rounds concurrently and write them with the bulk ingestion path.
+
+    Only rounds that still need data (see rounds_needing_fetch) are fetched;
+    the payloads are written in chunked transactions by draw_ingest.ingest_rounds.
+    Rounds that needed nothing are reported as 'skipped'.
+
+    Returns:
+        {'results': per-round results in perform_update's shape, 'stats': fetcher stats or None}
+    """
+    needed = rounds_needing_fetch(rounds, data_type)
+    ingested: Dict[int, dict] = {}
+    stats = None
+    if needed:
+        fetched = run_fetch_rounds(
+            needed,
+            draws=data_type in ('both', 'numbers'),
+            shops=data_type in ('both', 'shops'),
+            concurrency=concurrency,
+            rate=rate,
+        )
+        stats = {"rounds": len(needed), "transport": fetched["transport"], **fetched["stats"]}
+        ingested = {result["round"]: result for result in ingest_rounds(fetched["results"].values(), data_type)}
+
+    results = [
+        ingested.get(r) or {"round": r, "status": "skipped", "draw_updated": False, "shops_updated": False,
+                            "shops_count": None}
+        for r in rounds
+    ]
+    return {"results": results, "stats": stats}
+
+
+def update_range(start_round: int, end_round: int, data_type: str = 'both', prefetch: bool = False,
+                 concurrency: int = DEFAULT_CONCURRENCY, rate: float = DEFAULT_RATE, bulk: bool = False,
+                 revalidate_shops: bool = False) -> dict:
+    """Update a range of rounds, handling draws and shops based on data_type.
+
+    With prefetch=True the network responses are fetched concurrently first
+    (see prefetch_rounds) and the rounds are then applied one by one.
+    With bulk=True the fetched rounds are written in chunked transactions
+    instead (see bulk_update_rounds); prefetch is then not needed.
+    revalidate_shops re-checks stored shop pages with conditional requests
+    (perform_update); it always uses the per-round path, so bulk is ignored.
+    """
+    prefetch_stats = None
+    bulk_stats = None
+    if bulk and not revalidate_shops:
+        bulk_result = bulk_update_rounds(list(range(start_round, end_round + 1)), data_type, concurrency, rate)
+        results = bulk_result["results"]
+        bulk_stats = bulk_result["stats"]
+    else:
+        if prefetch:
+            prefetch_stats = prefetch_rounds(list(range(start_round, end_round + 1)), data_type, concurrency, rate)
+
+        results = []
+        for r in range(start_round, end_round + 1):
+            results.append(perform_update(r, data_type, refresh_boards=False, revalidate_shops=revalidate_shops,
+                                          refresh_features=False))
 
     # Count different statuses
     updated = sum(1 for x in results if x["status"] == "updated")
     partial = sum(1 for x in results if x["status"] == "partial")
     skipped = sum(1 for x in results if x["status"] == "skipped")
+    errors = sum(1 for x in results if x["status"] == "error")
 
     # Count actual updates
     draws_updated = sum(1 for x in results if x["draw_updated"])
     shops_updated = sum(1 for x in results if x["shops_updated"])
+    if shops_updated:
+        refresh_leaderboards()
+    if draws_updated:
+        schedule_feature_store_refresh()
 
     return {
         "range": [start_round, end_round],
@@ -134,8 +255,11 @@ def update_range(start_round: int, end_round: int, data_type: str = 'both') -> d
         "updated": updated,
         "partial": partial,
         "skipped": skipped,
+        "errors": errors,
         "draws_updated": draws_updated,
-        "shops_updated": shops_updated
+        "shops_updated": shops_updated,
+        "prefetch": prefetch_stats,
+        "bulk": bulk_stats
     }
 
 
@@ -145,19 +269,12 @@ def find_missing_rounds() -> List[int]:
     if not latest_round:
         return []
 
-    # Get all existing rounds from database
-    existing_rounds = set(
-        row[0] for row in db.session.query(Draw.round).filter(Draw.round <= latest_round).all()
-    )
-
-    # Find missing rounds
-    all_rounds = set(range(1, latest_round + 1))
-    missing_rounds = sorted(all_rounds - existing_rounds)
-
-    return missing_rounds
+    # Gaps come back as (start, end) ranges from one scan of the round index
+    return expand_ranges(missing_ranges(1, latest_round))
 
 
-def update_missing_rounds() -> dict:
+def update_missing_rounds(prefetch: bool = False, concurrency: int = DEFAULT_CONCURRENCY,
+                          rate: float = DEFAULT_RATE, bulk: bool = False) -> dict:
     """Update all missing rounds between 1 and the latest available round."""
     missing = find_missing_rounds()
     if not missing:
@@ -170,16 +287,37 @@ def update_missing_rounds() -> dict:
 
     updated = 0
     failed = 0
+    shops_updated = False
+    draws_updated = False
 
-    for round_no in missing:
-        try:
-            result = perform_update(round_no)
+    if bulk:
+        for result in bulk_update_rounds(missing, concurrency=concurrency, rate=rate)["results"]:
+            shops_updated = shops_updated or result["shops_updated"]
+            draws_updated = draws_updated or result["draw_updated"]
             if result["status"] in ["updated", "partial"]:
                 updated += 1
             else:
                 failed += 1
-        except Exception:
-            failed += 1
+    else:
+        if prefetch:
+            prefetch_rounds(missing, concurrency=concurrency, rate=rate)
+
+        for round_no in missing:
+            try:
+                result = perform_update(round_no, refresh_boards=False, refresh_features=False)
+                shops_updated = shops_updated or result["shops_updated"]
+                draws_updated = draws_updated or result["draw_updated"]
+                if result["status"] in ["updated", "partial"]:
+                    updated += 1
+                else:
+                    failed += 1
+            except Exception:
+                failed += 1
+
+    if shops_updated:
+        refresh_leaderboards()
+    if draws_updated:
+        schedule_feature_store_refresh()
 
     return {
         "status": "completed",
@@ -190,7 +328,8 @@ def update_missing_rounds() -> dict:
     }
 
 
-def update_to_latest() -> dict:
+def update_to_latest(prefetch: bool = False, concurrency: int = DEFAULT_CONCURRENCY,
+                     rate: float = DEFAULT_RATE, bulk: bool = False) -> dict:
     """Update from current max round + 1 to the latest available round."""
     latest_round = get_latest_round()
     if not latest_round:
@@ -207,7 +346,21 @@ def update_to_latest() -> dict:
             "latest_available": latest_round
         }
 
-    return update_range(start_round, latest_round)
+    return update_range(start_round, latest_round, prefetch=prefetch, concurrency=concurrency, rate=rate, bulk=bulk)
+
+
+def revalidate_recent_shops(count: int, concurrency: int = DEFAULT_CONCURRENCY,
+                            rate: float = DEFAULT_RATE) -> dict:
+    """Re-check the shop pages of the latest `count` stored rounds with conditional requests.
+
+    Only changed pages are applied; stored rounds without page state are
+    scraped in full (see scrape_round_shops).
+    """
+    current_max = db.session.query(db.func.max(Draw.round)).scalar()
+    if not current_max or count <= 0:
+        return {"status": "skipped", "message": "No stored rounds"}
+    return update_range(max(1, current_max - count + 1), current_max, data_type='shops',
+                        concurrency=concurrency, rate=rate, revalidate_shops=True)
 
 
 def get_latest_round() -> Optional[int]:
@@ -219,7 +372,11 @@ def get_latest_round() -> Optional[int]:
     def exists(r: int) -> bool:
         try:
             url = NUMBERS_URL.format(round=r)
-            resp = requests.get(url, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), headers=DEFAULT_HEADERS)
+            resp = cached_get(
+                url,
+                lambda: requests.get(url, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), headers=DEFAULT_HEADERS),
+                ttl_for=draw_response_ttl
+            )
             resp.raise_for_status()
             data = resp.json()
             return data.get("returnValue") == "success"
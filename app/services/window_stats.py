@@ -0,0 +1,174 @@
+"""
+회차 구간 통계 (누적 합)
+
+회차 순으로 정렬한 추첨 결과에서 번호별 출현 횟수, 홀짝 패턴, 합계 구간, 연속
+번호 수 등의 누적 합(prefix sum) 배열을 한 번 만들어 두면, 임의의 회차 구간
+[a, b]의 통계는 구간 양 끝 위치의 누적 값 차이(배열 조회 두 번)로 바로 나온다.
+구간 크기와 관계없이 일정 시간이라 최근 N회차 통계나 범위 슬라이더 조회에도
+DB를 다시 읽지 않는다.
+
+누적 배열은 draws 상태(행 수, 최대 id)가 바뀌면 다시 만든다 (round_gaps와 같은 방식).
+"""
+import threading
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import text
+
+from ..extensions import db
+from ..models import Draw
+from .sampler import NUMBER_COUNT, PICK_COUNT
+
+# analyze_patterns의 합계 구간 (상한 포함)
+SUM_BUCKETS = (
+    ("낮음(~120)", 120),
+    ("중간(121~150)", 150),
+    ("높음(151~180)", 180),
+    ("매우높음(181~)", None),
+)
+
+# 번호 구간 (1-10, 11-20, 21-30, 31-40, 41-45)
+RANGE_BUCKETS = ((1, 10), (11, 20), (21, 30), (31, 40), (41, 45))
+
+# 핫/콜드 기준 (평균 출현 횟수 대비)
+HOT_RATIO = 1.2
+COLD_RATIO = 0.8
+
+_STAMP_SQL = text("SELECT COUNT(*), MAX(id) FROM draws")
+
+
+class DrawPrefixSums:
+    """
+    회차 순 누적 합 배열 (행 i = 처음 i개 회차의 합계, 0행은 0)
+
+        numbers      (n+1, 45) 번호별 출현 횟수
+        bonus        (n+1, 45) 보너스 번호 출현 횟수
+        odd          (n+1, 7)  홀수 개수별 회차 수
+        sum_buckets  (n+1, 4)  SUM_BUCKETS 구간별 회차 수
+        consecutive  (n+1, 6)  연속 번호 쌍 수별 회차 수
+        sums         (n+1,)    번호 합
+    """
+
+    def __init__(self, rounds: np.ndarray, numbers: np.ndarray, bonus: np.ndarray):
+        self.rounds = rounds
+        n = len(rounds)
+        rows = np.arange(n)
+
+        def cumulative(per_draw: np.ndarray) -> np.ndarray:
+            out = np.zeros((n + 1,) + per_draw.shape[1:], dtype=np.int32)
+            np.cumsum(per_draw, axis=0, out=out[1:])
+            return out
+
+        hits = np.zeros((n, NUMBER_COUNT), dtype=np.int32)
+        np.put_along_axis(hits, numbers.astype(np.int64) - 1, 1, axis=1)
+        self.numbers = cumulative(hits)
+
+        bonus_hits = np.zeros((n, NUMBER_COUNT), dtype=np.int32)
+        bonus_hits[rows, bonus.astype(np.int64) - 1] = 1
+        self.bonus = cumulative(bonus_hits)
+
+        def one_hot(values: np.ndarray, width: int) -> np.ndarray:
+            out = np.zeros((n, width), dtype=np.int32)
+            out[rows, values] = 1
+            return out
+
+        sorted_numbers = np.sort(numbers, axis=1).astype(np.int64)
+        self.odd = cumulative(one_hot((sorted_numbers % 2).sum(axis=1), PICK_COUNT + 1))
+        totals = sorted_numbers.sum(axis=1)
+        limits = [limit for _, limit in SUM_BUCKETS if limit is not None]
+        self.sum_buckets = cumulative(one_hot(np.searchsorted(limits, totals, side='left'), len(SUM_BUCKETS)))
+        self.consecutive = cumulative(one_hot((np.diff(sorted_numbers, axis=1) == 1).sum(axis=1), PICK_COUNT))
+        self.sums = np.concatenate([[0], np.cumsum(totals)])
+
+    def __len__(self) -> int:
+        return len(self.rounds)
+
+    def positions(self, from_round: Optional[int] = None, to_round: Optional[int] = None) -> Tuple[int, int]:
+        """회차 구간 -> 누적 배열 위치 [start, end) (저장된 회차만 포함)"""
+        start = 0 if from_round is None else int(np.searchsorted(self.rounds, from_round, side='left'))
+        end = len(self.rounds) if to_round is None else int(np.searchsorted(self.rounds, to_round, side='right'))
+        return start, max(start, end)
+
+    def last(self, count: Optional[int]) -> Tuple[int, int]:
+        """최근 count개 회차의 위치 (None/0이면 전체)"""
+        end = len(self.rounds)
+        return (max(0, end - count) if count else 0), end
+
+    def frequency(self, start: int, end: int) -> np.ndarray:
+        return self.numbers[end] - self.numbers[start]
+
+    def window(self, start: int, end: int) -> Dict:
+        """위치 [start, end) 구간 통계"""
+        draws = end - start
+        frequency = self.frequency(start, end)
+        odd = self.odd[end] - self.odd[start]
+        sum_buckets = self.sum_buckets[end] - self.sum_buckets[start]
+        consecutive = self.consecutive[end] - self.consecutive[start]
+        bonus = self.bonus[end] - self.bonus[start]
+        odd_numbers = int(frequency[0::2].sum())
+
+        average = frequency.sum() / NUMBER_COUNT if draws else 0.0
+        order = np.argsort(-frequency, kind='stable')
+        return {
+            "from_round": int(self.rounds[start]) if draws else None,
+            "to_round": int(self.rounds[end - 1]) if draws else None,
+            "draws": draws,
+            "frequency": {n + 1: int(frequency[n]) for n in range(NUMBER_COUNT)},
+            "bonus_frequency": {n + 1: int(bonus[n]) for n in range(NUMBER_COUNT)},
+            "most_frequent": [(int(n) + 1, int(frequency[n])) for n in order[:10]],
+            "least_frequent": [(int(n) + 1, int(frequency[n])) for n in order[::-1][:10]],
+            "hot_numbers": [int(n) + 1 for n in order if frequency[n] > average * HOT_RATIO],
+            "cold_numbers": [int(n) + 1 for n in order[::-1] if frequency[n] < average * COLD_RATIO],
+            "avg_frequency": float(average),
+            "odd_even": {"odd": odd_numbers, "even": int(frequency.sum()) - odd_numbers},
+            "odd_even_patterns": {
+                f"{k}홀/{PICK_COUNT - k}짝": int(odd[k]) for k in np.argsort(-odd, kind='stable') if odd[k]
+            },
+            "range_distribution": {
+                f"{low}-{high}": int(frequency[low - 1:high].sum()) for low, high in RANGE_BUCKETS
+            },
+            "sum_ranges": {
+                SUM_BUCKETS[k][0]: int(sum_buckets[k]) for k in np.argsort(-sum_buckets, kind='stable')
+                if sum_buckets[k]
+            },
+            "average_sum": float((self.sums[end] - self.sums[start]) / draws) if draws else 0.0,
+            "consecutive_counts": {
+                int(k): int(consecutive[k]) for k in np.argsort(-consecutive, kind='stable') if consecutive[k]
+            },
+        }
+
+
+_cache: Optional[Tuple[Tuple, DrawPrefixSums]] = None
+_cache_lock = threading.Lock()
+
+
+def get_prefix_sums() -> DrawPrefixSums:
+    """draws와 동기화된 누적 합 (상태가 바뀌었을 때만 다시 계산)"""
+    global _cache
+    stamp = tuple(db.session.execute(_STAMP_SQL).one())
+    cached = _cache
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+
+    rows = db.session.query(Draw.round, Draw.numbers, Draw.bonus).order_by(Draw.round).all()
+    prefix = DrawPrefixSums(
+        np.array([row.round for row in rows], dtype=np.int32),
+        np.array([[int(x) for x in row.numbers.split(",") if x] for row in rows],
+                 dtype=np.int8).reshape(-1, PICK_COUNT),
+        np.array([row.bonus for row in rows], dtype=np.int8),
+    )
+    with _cache_lock:
+        _cache = (stamp, prefix)
+    return prefix
+
+
+def window_stats(from_round: Optional[int] = None, to_round: Optional[int] = None) -> Dict:
+    """회차 구간 [from_round, to_round] 통계 (생략하면 처음/마지막 회차까지)"""
+    prefix = get_prefix_sums()
+    return prefix.window(*prefix.positions(from_round, to_round))
+
+
+def recent_stats(limit: Optional[int] = None) -> Dict:
+    """최근 limit개 회차 통계 (None/0이면 전체)"""
+    prefix = get_prefix_sums()
+    return prefix.window(*prefix.last(limit))
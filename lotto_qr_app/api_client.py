@@ -5,9 +5,10 @@ API client for communicating with the web app
 import requests
 import json
 import hashlib
+from requests.adapters import HTTPAdapter
 from typing import Dict, List, Optional
 from datetime import datetime
-from config import API_ENDPOINT, WEB_APP_URL, SERVERS
+from config import API_ENDPOINT, WEB_APP_URL, SERVERS, UPLOAD_WORKERS
 
 
 class APIClient:
@@ -24,6 +25,11 @@ class APIClient:
             'User-Agent': 'LottoOCR-LocalApp/1.0'
         })
 
+        # 업로드 워커들이 세션을 공유하므로 커넥션 풀을 워커 수 이상으로 설정
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(10, UPLOAD_WORKERS * 2))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
         # 인증 상태
         self.is_authenticated = False
         self.user_info = None
@@ -479,6 +485,109 @@ class APIClient:
                 "details": f"오류: {str(e)}\n상세: {traceback.format_exc()}"
             }
 
+    def upload_purchase_batch(self, purchases: List[Dict]) -> Dict:
+        """
+        여러 게임을 /api/purchases/batch 한 번의 요청으로 업로드
+
+        Returns:
+            success: 요청 자체의 성공 여부
+            retryable: 네트워크/서버 오류로 나중에 재시도할 수 있는지 여부
+            results: 입력 순서와 같은 항목별 결과 ({"status": created|duplicate|failed, "error": ...})
+        """
+        # 로컬 검증에 실패한 항목은 전송하지 않음
+        results: List[Optional[Dict]] = [None] * len(purchases)
+        to_send = []
+        for i, purchase in enumerate(purchases):
+            validation_result = self._validate_purchase_data(purchase)
+            if validation_result["valid"]:
+                to_send.append(i)
+            else:
+                results[i] = {"status": "failed", "error": "; ".join(validation_result["errors"])}
+
+        if not to_send:
+            return {"success": True, "retryable": False, "results": results}
+
+        if not self.is_authenticated:
+            return {
+                "success": False,
+                "retryable": True,
+                "error": "인증 필요",
+                "details": "먼저 로그인해주세요."
+            }
+
+        try:
+            batch_url = f"{self.api_endpoint}/batch"
+            response = self.session.post(
+                batch_url,
+                json={"purchases": [purchases[i] for i in to_send]},
+                timeout=30
+            )
+
+            if response.status_code in [200, 206, 400] and \
+                    response.headers.get('content-type', '').startswith('application/json'):
+                data = response.json()
+                item_results = data.get("results")
+
+                if item_results is None:
+                    # 항목별 결과를 주지 않는 서버: 전체 성공/실패로만 판단
+                    status = "created" if response.status_code == 200 else "failed"
+                    error = None if status == "created" else "; ".join(data.get("errors", [])) or data.get("error")
+                    item_results = [{"index": n, "status": status, "error": error} for n in range(len(to_send))]
+
+                for item in item_results:
+                    results[to_send[item["index"]]] = {
+                        "status": item.get("status", "failed"),
+                        "error": item.get("error")
+                    }
+                for i in to_send:
+                    if results[i] is None:
+                        results[i] = {"status": "failed", "error": "서버 응답에 결과 없음"}
+
+                return {"success": True, "retryable": False, "results": results}
+            elif response.status_code == 401:
+                return {
+                    "success": False,
+                    "retryable": True,
+                    "error": "인증 실패",
+                    "details": "다시 로그인해주세요."
+                }
+            elif response.status_code == 429 or response.status_code >= 500:
+                return {
+                    "success": False,
+                    "retryable": True,
+                    "error": f"서버 오류 ({response.status_code})",
+                    "details": response.text[:200]
+                }
+            else:
+                return {
+                    "success": False,
+                    "retryable": False,
+                    "error": f"서버 응답 오류 ({response.status_code})",
+                    "details": response.text[:200]
+                }
+
+        except requests.exceptions.ConnectionError as e:
+            return {
+                "success": False,
+                "retryable": True,
+                "error": "연결 실패",
+                "details": f"웹 앱 서버({self.base_url})에 연결할 수 없습니다. 상세: {str(e)}"
+            }
+        except requests.exceptions.Timeout as e:
+            return {
+                "success": False,
+                "retryable": True,
+                "error": "요청 시간 초과",
+                "details": f"서버 응답 시간이 초과되었습니다. 상세: {str(e)}"
+            }
+        except Exception as e:
+            return {
+                "success": False,
+                "retryable": False,
+                "error": "예상치 못한 오류",
+                "details": str(e)
+            }
+
     def test_connection(self) -> Dict:
         """
         웹 앱 서버 연결 테스트
@@ -21,6 +21,12 @@ DEFAULT_SERVER = "local"
 WEB_APP_URL = SERVERS[DEFAULT_SERVER]["url"]
 API_ENDPOINT = f"{WEB_APP_URL}/api/purchases"
 
+# 업로드 대기열 설정
+UPLOAD_WORKERS = 3  # 동시 업로드 워커 수
+UPLOAD_BATCH_SIZE = 20  # 배치 API 1회 호출당 최대 게임 수
+UPLOAD_MAX_RETRIES = 5  # 게임별 최대 업로드 시도 횟수
+UPLOAD_RETRY_BASE_DELAY = 2.0  # 재시도 지수 백오프 기본 대기 (초)
+
 # 앱 버전
 APP_VERSION = "1.2.0"
 APP_NAME = "로또 QR 인식 앱"
@@ -5,6 +5,8 @@ QR 앱 로컬 데이터베이스 관리
 import sqlite3
 import json
 import os
+import time
+from collections import defaultdict
 from datetime import datetime
 from typing import List, Dict, Optional, Tuple
 
@@ -60,14 +62,152 @@ class QRDatabase:
             )
         ''')
 
+        # 업로드 대기열 (outbox) 테이블 - 게임 단위 업로드 작업
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS upload_outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_id TEXT NOT NULL,
+                scan_id INTEGER,
+                payload TEXT NOT NULL,  -- JSON 형태로 저장
+                status TEXT NOT NULL DEFAULT 'pending',  -- pending, in_flight, done, duplicate, failed
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,  -- epoch seconds
+                last_error TEXT,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            )
+        ''')
+
         # 인덱스 생성
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_upload_outbox_status ON upload_outbox(status, next_attempt_at)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_upload_outbox_job ON upload_outbox(job_id)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_qr_scans_round ON qr_scans(round_number)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_qr_scans_date ON qr_scans(scan_date)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_game_numbers_scan ON game_numbers(scan_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_upload_status_scan ON upload_status(scan_id)')
+
+        # 통계 대시보드용 집계 테이블 (일자/시간/회차/포맷 단위)
+        rollup_exists = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'scan_rollup'"
+        ).fetchone() is not None
+        self._create_scan_rollup(cursor)
+        if not rollup_exists:
+            # 기존 데이터베이스는 최초 1회 집계 테이블을 채움
+            self._rebuild_scan_rollup(cursor)
 
         conn.commit()
         conn.close()
 
+    def _create_scan_rollup(self, cursor):
+        """집계 테이블과 동기화 트리거 생성"""
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS scan_rollup (
+                scan_day TEXT NOT NULL,
+                scan_hour INTEGER NOT NULL,
+                round_number INTEGER NOT NULL,
+                qr_format TEXT NOT NULL,  -- NULL 포맷은 빈 문자열로 저장
+                scan_count INTEGER NOT NULL DEFAULT 0,
+                upload_success INTEGER NOT NULL DEFAULT 0,
+                upload_failed INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (scan_day, scan_hour, round_number, qr_format)
+            )
+        ''')
+
+        # 스캔 추가/삭제 시 집계 갱신
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_scan_rollup_scan_insert
+            AFTER INSERT ON qr_scans
+            BEGIN
+                INSERT INTO scan_rollup (scan_day, scan_hour, round_number, qr_format, scan_count)
+                VALUES (
+                    DATE(NEW.scan_date),
+                    CAST(strftime('%H', NEW.scan_date) AS INTEGER),
+                    NEW.round_number,
+                    COALESCE(NEW.qr_format, ''),
+                    1
+                )
+                ON CONFLICT (scan_day, scan_hour, round_number, qr_format)
+                DO UPDATE SET scan_count = scan_count + 1;
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_scan_rollup_scan_delete
+            AFTER DELETE ON qr_scans
+            BEGIN
+                UPDATE scan_rollup SET
+                    scan_count = scan_count - 1,
+                    upload_success = upload_success - (
+                        SELECT COUNT(*) FROM upload_status WHERE scan_id = OLD.id AND upload_success = 1
+                    ),
+                    upload_failed = upload_failed - (
+                        SELECT COUNT(*) FROM upload_status WHERE scan_id = OLD.id AND upload_success = 0
+                    )
+                WHERE scan_day = DATE(OLD.scan_date)
+                  AND scan_hour = CAST(strftime('%H', OLD.scan_date) AS INTEGER)
+                  AND round_number = OLD.round_number
+                  AND qr_format = COALESCE(OLD.qr_format, '');
+                DELETE FROM scan_rollup WHERE scan_count <= 0;
+            END
+        ''')
+
+        # 업로드 상태 저장/삭제 시 성공/실패 집계 갱신
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_scan_rollup_upload_insert
+            AFTER INSERT ON upload_status
+            BEGIN
+                UPDATE scan_rollup SET
+                    upload_success = upload_success + (NEW.upload_success = 1),
+                    upload_failed = upload_failed + (NEW.upload_success = 0)
+                WHERE (scan_day, scan_hour, round_number, qr_format) IN (
+                    SELECT DATE(scan_date), CAST(strftime('%H', scan_date) AS INTEGER),
+                           round_number, COALESCE(qr_format, '')
+                    FROM qr_scans WHERE id = NEW.scan_id
+                );
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_scan_rollup_upload_delete
+            AFTER DELETE ON upload_status
+            BEGIN
+                UPDATE scan_rollup SET
+                    upload_success = upload_success - (OLD.upload_success = 1),
+                    upload_failed = upload_failed - (OLD.upload_success = 0)
+                WHERE (scan_day, scan_hour, round_number, qr_format) IN (
+                    SELECT DATE(scan_date), CAST(strftime('%H', scan_date) AS INTEGER),
+                           round_number, COALESCE(qr_format, '')
+                    FROM qr_scans WHERE id = OLD.scan_id
+                );
+            END
+        ''')
+
+    def _rebuild_scan_rollup(self, cursor):
+        """원본 테이블로부터 집계 테이블 재생성"""
+        cursor.execute('DELETE FROM scan_rollup')
+        cursor.execute('''
+            INSERT INTO scan_rollup
+            (scan_day, scan_hour, round_number, qr_format, scan_count, upload_success, upload_failed)
+            SELECT
+                DATE(qs.scan_date),
+                CAST(strftime('%H', qs.scan_date) AS INTEGER),
+                qs.round_number,
+                COALESCE(qs.qr_format, ''),
+                COUNT(*),
+                SUM(CASE WHEN us.upload_success = 1 THEN 1 ELSE 0 END),
+                SUM(CASE WHEN us.upload_success = 0 THEN 1 ELSE 0 END)
+            FROM qr_scans qs
+            LEFT JOIN upload_status us ON qs.id = us.scan_id
+            GROUP BY 1, 2, 3, 4
+        ''')
+
+    def rebuild_statistics(self):
+        """통계 집계 테이블 전체 재계산 (데이터 수동 수정 후 사용)"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            self._rebuild_scan_rollup(conn.cursor())
+            conn.commit()
+        finally:
+            conn.close()
+
     def check_duplicate_scan(self, qr_data: Dict, parsed_lottery_data: Dict) -> Optional[Dict]:
         """동일한 회차의 동일한 용지가 이미 존재하는지 확인"""
         conn = sqlite3.connect(self.db_path)
@@ -316,6 +456,198 @@ class QRDatabase:
         conn.close()
         return failed_uploads
 
+    # ======================
+    # 업로드 대기열 (outbox)
+    # ======================
+
+    def enqueue_uploads(self, job_id: str, payloads: List[Dict], scan_id: Optional[int] = None) -> int:
+        """업로드할 게임들을 대기열에 추가"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        due = time.time()
+
+        try:
+            cursor.executemany('''
+                INSERT INTO upload_outbox
+                (job_id, scan_id, payload, status, attempts, next_attempt_at, created_at, updated_at)
+                VALUES (?, ?, ?, 'pending', 0, ?, ?, ?)
+            ''', [
+                (job_id, scan_id, json.dumps(payload, ensure_ascii=False), due, now, now)
+                for payload in payloads
+            ])
+            conn.commit()
+            return len(payloads)
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            conn.close()
+
+    def claim_uploads(self, limit: int) -> List[Dict]:
+        """처리 시점이 된 대기 항목을 in_flight 상태로 전환하며 가져옴 (워커 간 중복 방지)"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.execute('''
+                SELECT id, job_id, scan_id, payload, attempts
+                FROM upload_outbox
+                WHERE status = 'pending' AND next_attempt_at <= ?
+                ORDER BY next_attempt_at, id
+                LIMIT ?
+            ''', (time.time(), limit))
+            rows = cursor.fetchall()
+
+            if rows:
+                now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                cursor.executemany(
+                    "UPDATE upload_outbox SET status = 'in_flight', updated_at = ? WHERE id = ?",
+                    [(now, row[0]) for row in rows]
+                )
+            conn.commit()
+
+            return [{
+                'id': row[0],
+                'job_id': row[1],
+                'scan_id': row[2],
+                'payload': json.loads(row[3]),
+                'attempts': row[4]
+            } for row in rows]
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            conn.close()
+
+    def complete_uploads(self, outcomes: List[Tuple[int, str, Optional[str]]]):
+        """업로드 결과 반영 - (outbox id, status, error) 목록"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        cursor = conn.cursor()
+
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+        try:
+            cursor.executemany('''
+                UPDATE upload_outbox
+                SET status = ?, attempts = attempts + 1, last_error = ?, updated_at = ?
+                WHERE id = ?
+            ''', [(status, error, now, outbox_id) for outbox_id, status, error in outcomes])
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            conn.close()
+
+    def reschedule_uploads(self, schedule: List[Tuple[int, float]], error: str, max_attempts: int) -> int:
+        """재시도 예약 - (outbox id, 다음 시도 시각) 목록. 최대 시도 횟수 초과 항목은 failed 처리
+
+        Returns:
+            최종 실패 처리된 항목 수
+        """
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        cursor = conn.cursor()
+
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        ids = [outbox_id for outbox_id, _ in schedule]
+
+        try:
+            cursor.executemany('''
+                UPDATE upload_outbox
+                SET attempts = attempts + 1,
+                    status = CASE WHEN attempts + 1 >= ? THEN 'failed' ELSE 'pending' END,
+                    next_attempt_at = ?, last_error = ?, updated_at = ?
+                WHERE id = ?
+            ''', [(max_attempts, due, error, now, outbox_id) for outbox_id, due in schedule])
+
+            failed = 0
+            if ids:
+                placeholders = ','.join('?' * len(ids))
+                cursor.execute(
+                    f"SELECT COUNT(*) FROM upload_outbox WHERE status = 'failed' AND id IN ({placeholders})",
+                    ids
+                )
+                failed = cursor.fetchone()[0]
+            conn.commit()
+            return failed
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            conn.close()
+
+    def requeue_in_flight_uploads(self) -> int:
+        """비정상 종료로 in_flight 상태에 남은 항목을 대기 상태로 복구"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        cursor = conn.cursor()
+
+        cursor.execute(
+            "UPDATE upload_outbox SET status = 'pending', next_attempt_at = ? WHERE status = 'in_flight'",
+            (time.time(),)
+        )
+        requeued = cursor.rowcount
+
+        conn.commit()
+        conn.close()
+        return requeued
+
+    def next_upload_due(self) -> Optional[float]:
+        """가장 빠른 대기 항목의 처리 예정 시각 (없으면 None)"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT MIN(next_attempt_at) FROM upload_outbox WHERE status = 'pending'")
+        due = cursor.fetchone()[0]
+
+        conn.close()
+        return due
+
+    def get_outbox_counts(self) -> Dict[str, int]:
+        """상태별 대기열 항목 수"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute('SELECT status, COUNT(*) FROM upload_outbox GROUP BY status')
+        counts = {'pending': 0, 'in_flight': 0, 'done': 0, 'duplicate': 0, 'failed': 0}
+        for status, count in cursor.fetchall():
+            counts[status] = count
+
+        conn.close()
+        return counts
+
+    def get_upload_job_summary(self, job_id: str) -> Dict:
+        """업로드 작업(job) 단위 진행 현황"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            SELECT status, COUNT(*), MAX(scan_id)
+            FROM upload_outbox
+            WHERE job_id = ?
+            GROUP BY status
+        ''', (job_id,))
+
+        summary = {'job_id': job_id, 'scan_id': None, 'total': 0,
+                   'pending': 0, 'in_flight': 0, 'done': 0, 'duplicate': 0, 'failed': 0}
+        for status, count, scan_id in cursor.fetchall():
+            summary[status] = count
+            summary['total'] += count
+            if scan_id is not None:
+                summary['scan_id'] = scan_id
+
+        cursor.execute('''
+            SELECT last_error FROM upload_outbox
+            WHERE job_id = ? AND status = 'failed' AND last_error IS NOT NULL
+            ORDER BY id
+        ''', (job_id,))
+        summary['errors'] = [row[0] for row in cursor.fetchall()]
+
+        conn.close()
+        return summary
+
     def delete_round_data(self, round_number: int) -> int:
         """특정 회차 데이터 삭제"""
         conn = sqlite3.connect(self.db_path)
@@ -378,118 +710,67 @@ class QRDatabase:
         }
 
     def get_statistics_for_visualization(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> Dict:
-        """시각화를 위한 상세 통계 데이터"""
+        """시각화를 위한 상세 통계 데이터
+
+        scan_rollup 집계 테이블을 한 번만 조회해 모든 차트 데이터를 구성한다.
+        날짜 필터는 일 단위로 적용된다 (시각 부분은 무시).
+        """
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
 
-        # 날짜 필터 조건
+        # 날짜 필터 조건 (PRIMARY KEY 선두 컬럼 scan_day 범위 검색)
         date_filter = ""
-        date_and_filter = ""
         params = []
         if start_date and end_date:
-            date_filter = "WHERE qs.scan_date BETWEEN ? AND ?"
-            date_and_filter = "AND qs.scan_date BETWEEN ? AND ?"
-            params = [start_date, end_date]
+            date_filter = "WHERE scan_day BETWEEN ? AND ?"
+            params = [start_date[:10], end_date[:10]]
 
-        # 1. 일별 스캔 횟수
         cursor.execute(f'''
-            SELECT DATE(qs.scan_date) as scan_day, COUNT(*) as count
-            FROM qr_scans qs
+            SELECT scan_day, scan_hour, round_number, qr_format,
+                   scan_count, upload_success, upload_failed
+            FROM scan_rollup
             {date_filter}
-            GROUP BY scan_day
-            ORDER BY scan_day
         ''', params)
-        daily_scans = [{'date': row[0], 'count': row[1]} for row in cursor.fetchall()]
+        rows = cursor.fetchall()
+        conn.close()
 
-        # 2. 회차별 스캔 분포
-        if start_date and end_date:
-            cursor.execute(f'''
-                SELECT round_number, COUNT(*) as count
-                FROM qr_scans qs
-                WHERE qs.round_number > 0 AND qs.scan_date BETWEEN ? AND ?
-                GROUP BY round_number
-                ORDER BY round_number DESC
-                LIMIT 20
-            ''', params)
-        else:
-            cursor.execute('''
-                SELECT round_number, COUNT(*) as count
-                FROM qr_scans
-                WHERE round_number > 0
-                GROUP BY round_number
-                ORDER BY round_number DESC
-                LIMIT 20
-            ''')
-        round_distribution = [{'round': row[0], 'count': row[1]} for row in cursor.fetchall()]
-
-        # 3. 업로드 성공률
-        cursor.execute(f'''
-            SELECT
-                SUM(CASE WHEN us.upload_success = 1 THEN 1 ELSE 0 END) as success_count,
-                SUM(CASE WHEN us.upload_success = 0 THEN 1 ELSE 0 END) as fail_count,
-                COUNT(CASE WHEN us.id IS NULL THEN 1 END) as pending_count
-            FROM qr_scans qs
-            LEFT JOIN upload_status us ON qs.id = us.scan_id
-            {date_filter}
-        ''', params)
-        result = cursor.fetchone()
-        upload_stats = {
-            'success': result[0] or 0,
-            'failed': result[1] or 0,
-            'pending': result[2] or 0
-        }
+        daily = defaultdict(int)
+        hourly = defaultdict(int)
+        rounds = defaultdict(int)
+        formats = defaultdict(int)
+        upload_stats = {'success': 0, 'failed': 0, 'pending': 0}
+
+        for scan_day, scan_hour, round_number, qr_format, scan_count, success, failed in rows:
+            daily[scan_day] += scan_count
+            hourly[scan_hour] += scan_count
+            if round_number > 0:
+                rounds[round_number] += scan_count
+            if qr_format:
+                formats[qr_format] += scan_count
+            upload_stats['success'] += success
+            upload_stats['failed'] += failed
+            upload_stats['pending'] += scan_count - success - failed
+
+        # 1. 일별 스캔 횟수
+        daily_scans = [{'date': day, 'count': count} for day, count in sorted(daily.items())]
+
+        # 2. 회차별 스캔 분포 (최근 20개 회차)
+        round_distribution = [
+            {'round': round_number, 'count': rounds[round_number]}
+            for round_number in sorted(rounds, reverse=True)[:20]
+        ]
 
         # 4. 시간대별 스캔 분포
-        cursor.execute(f'''
-            SELECT
-                CAST(strftime('%H', qs.scan_date) AS INTEGER) as hour,
-                COUNT(*) as count
-            FROM qr_scans qs
-            {date_filter}
-            GROUP BY hour
-            ORDER BY hour
-        ''', params)
-        hourly_distribution = [{'hour': row[0], 'count': row[1]} for row in cursor.fetchall()]
+        hourly_distribution = [{'hour': hour, 'count': count} for hour, count in sorted(hourly.items())]
 
         # 5. QR 포맷별 분포
-        if start_date and end_date:
-            cursor.execute(f'''
-                SELECT qr_format, COUNT(*) as count
-                FROM qr_scans qs
-                WHERE qs.qr_format IS NOT NULL AND qs.scan_date BETWEEN ? AND ?
-                GROUP BY qr_format
-            ''', params)
-        else:
-            cursor.execute('''
-                SELECT qr_format, COUNT(*) as count
-                FROM qr_scans
-                WHERE qr_format IS NOT NULL
-                GROUP BY qr_format
-            ''')
-        format_distribution = [{'format': row[0], 'count': row[1]} for row in cursor.fetchall()]
+        format_distribution = [{'format': fmt, 'count': count} for fmt, count in formats.items()]
 
         # 6. 상위 10개 회차 (스캔 횟수 기준)
-        if start_date and end_date:
-            cursor.execute(f'''
-                SELECT round_number, COUNT(*) as scan_count
-                FROM qr_scans qs
-                WHERE qs.round_number > 0 AND qs.scan_date BETWEEN ? AND ?
-                GROUP BY round_number
-                ORDER BY scan_count DESC
-                LIMIT 10
-            ''', params)
-        else:
-            cursor.execute('''
-                SELECT round_number, COUNT(*) as scan_count
-                FROM qr_scans
-                WHERE round_number > 0
-                GROUP BY round_number
-                ORDER BY scan_count DESC
-                LIMIT 10
-            ''')
-        top_rounds = [{'round': row[0], 'count': row[1]} for row in cursor.fetchall()]
-
-        conn.close()
+        top_rounds = [
+            {'round': round_number, 'count': count}
+            for round_number, count in sorted(rounds.items(), key=lambda x: x[1], reverse=True)[:10]
+        ]
 
         return {
             'daily_scans': daily_scans,
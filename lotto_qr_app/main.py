@@ -74,6 +74,7 @@ from api_client import APIClient
 from image_preprocessor import ImagePreprocessor
 from database import QRDatabase
 from text_parser import parse_lottery_text
+from upload_queue import UploadQueue
 
 
 class LottoQRApp:
@@ -88,6 +89,14 @@ class LottoQRApp:
         self.preprocessor = ImagePreprocessor()
         self.db = QRDatabase()  # 로컬 데이터베이스
 
+        # 업로드 대기열 (로컬 outbox + 배치 업로드 워커)
+        self.upload_queue = UploadQueue(
+            self.api_client,
+            self.db,
+            on_progress=lambda stats: self.root.after(0, self._on_upload_progress, stats),
+            on_job_complete=lambda summary: self.root.after(0, self._on_upload_job_complete, summary)
+        )
+
         # 변수
         self.current_image_path = None
         self.qr_data = None
@@ -117,6 +126,9 @@ class LottoQRApp:
         self.log(f"웹 앱 URL: {WEB_APP_URL}")
         self.log(f"📁 로그 파일: {self.log_file_path}")
 
+        # 이전 실행에서 남은 업로드 대기 항목은 로그인 후 이어서 전송됨
+        self.upload_queue.start()
+
     def setup_ui(self):
         """UI 구성"""
         # 메인 프레임
@@ -677,7 +689,7 @@ class LottoQRApp:
         threading.Thread(target=self._upload_data_thread, daemon=True).start()
 
     def _upload_data_thread(self):
-        """업로드 스레드 - 개별 게임 데이터 업로드"""
+        """업로드 스레드 - 게임들을 업로드 대기열에 추가 (전송은 업로드 워커가 배치로 처리)"""
         try:
             # 업로드할 데이터 내용 로그 출력
             self.root.after(0, lambda: self.log("=" * 40))
@@ -702,127 +714,21 @@ class LottoQRApp:
                 self.root.after(0, lambda: self.update_login_ui())
                 return
 
-            # 각 게임을 개별적으로 업로드
-            success_count = 0
-            failed_count = 0
-            duplicate_count = 0
-            errors = []
-
-            for i, game in enumerate(self.parsed_lottery_data['games'], 1):
+            games = self.parsed_lottery_data['games']
+            for i, game in enumerate(games, 1):
                 numbers_str = " ".join(f"{n:02d}" for n in game['numbers'])
                 self.root.after(0, lambda i=i, numbers=numbers_str: self.log(f"게임 {i}: {numbers}"))
 
-                # 웹앱 형식에 맞는 개별 게임 데이터 생성
-                game_data = {
-                    "numbers": game['numbers'],
-                    "draw_number": self.parsed_lottery_data['round'],
-                    "purchase_date": self.qr_data.get('purchase_date') or datetime.now().strftime('%Y-%m-%d')
-                }
-
-                # 개별 게임 업로드
-                self.root.after(0, lambda data=game_data: self.log(f"📤 업로드 요청 데이터: {data}"))
-                result = self.api_client.upload_purchase_data(game_data)
-                self.root.after(0, lambda res=result: self.log(f"📨 서버 응답: {res}"))
-
-                if result["success"]:
-                    success_count += 1
-                    self.root.after(0, lambda i=i: self.log(f"  ✅ 게임 {i} 업로드 성공"))
-                else:
-                    error_msg = result.get('error', '알 수 없는 오류')
-                    error_details = result.get('details', '')
-
-                    # 중복은 스킵으로 처리 (오류가 아님)
-                    if error_msg == "중복 데이터":
-                        duplicate_count += 1
-                        self.root.after(0, lambda i=i, details=error_details: self.log(f"  ℹ️ 게임 {i} 스킵: 이미 등록된 번호입니다"))
-                    else:
-                        failed_count += 1
-                        errors.append(f"게임 {i}: {error_msg}")
-                        self.root.after(0, lambda i=i, err=error_msg: self.log(f"  ❌ 게임 {i} 업로드 실패: {err}"))
-
+            # 웹앱 형식에 맞는 게임 데이터로 대기열에 추가
+            job_id = self.upload_queue.enqueue_games(
+                self.parsed_lottery_data['round'],
+                games,
+                self.qr_data.get('purchase_date') or datetime.now().strftime('%Y-%m-%d'),
+                scan_id=self.current_scan_id
+            )
+            self.root.after(0, lambda n=len(games), job=job_id: self.log(f"📥 {n}개 게임을 업로드 대기열에 추가 (작업 {job[:8]})"))
             self.root.after(0, lambda: self.log("=" * 40))
 
-            # 전체 결과 정리
-            total_games = len(self.parsed_lottery_data['games'])
-
-            if success_count == total_games:
-                # 모든 게임이 성공
-                result = {
-                    "success": True,
-                    "message": f"✅ {success_count}개 게임이 모두 성공적으로 업로드되었습니다."
-                }
-            elif success_count > 0 and failed_count == 0:
-                # 일부 성공, 나머지는 중복
-                result = {
-                    "success": True,
-                    "message": f"✅ {success_count}개 게임 업로드 완료, {duplicate_count}개 게임은 이미 등록되어 스킵되었습니다."
-                }
-            elif success_count > 0 and failed_count > 0:
-                # 성공, 실패, 중복 혼재
-                message_parts = [f"✅ {success_count}개 게임 업로드 완료"]
-                if duplicate_count > 0:
-                    message_parts.append(f"ℹ️ {duplicate_count}개 게임 스킵(중복)")
-                if failed_count > 0:
-                    message_parts.append(f"❌ {failed_count}개 게임 실패")
-                    message_parts.append(f"실패 원인: {'; '.join(errors[:3])}")
-
-                result = {
-                    "success": True,
-                    "message": "\n".join(message_parts)
-                }
-            elif duplicate_count == total_games:
-                # 모든 게임이 중복
-                result = {
-                    "success": True,
-                    "message": f"ℹ️ 모든 게임({duplicate_count}개)이 이미 등록되어 있어 스킵되었습니다."
-                }
-            elif failed_count > 0 and duplicate_count > 0:
-                # 실패와 중복만 있음
-                result = {
-                    "success": False,
-                    "error": f"❌ {failed_count}개 게임 실패, {duplicate_count}개 게임 스킵(중복)\n실패 원인: {'; '.join(errors[:3])}"
-                }
-            else:
-                # 모든 게임이 실패
-                result = {
-                    "success": False,
-                    "error": f"❌ 모든 게임({failed_count}개) 업로드 실패\n원인: {'; '.join(errors[:3])}"
-                }
-
-            # 결과 처리
-            if result["success"]:
-                message_data = result.get('data', {})
-                saved_count = message_data.get('saved_count', 0)
-                duplicate_count = message_data.get('duplicate_count', 0)
-                total_parsed = message_data.get('parsed_games', 0)
-
-                message = result.get('message', '업로드 완료')
-
-                self.root.after(0, lambda msg=message: self.log(f"✅ {msg}"))
-
-                # 데이터베이스에 업로드 상태 저장
-                if self.current_scan_id:
-                    self.db.save_upload_status(self.current_scan_id, True, message)
-                    self.refresh_database_tab()
-
-            else:
-                error_msg = result.get('error', '알 수 없는 오류')
-                error_details = result.get('details', '')
-
-                message = f"❌ 업로드 실패: {error_msg}"
-                if error_details:
-                    message += f"\n상세: {error_details}"
-
-                self.root.after(0, lambda msg=error_msg: self.log(f"❌ 업로드 실패: {msg}"))
-
-                # 데이터베이스에 업로드 실패 상태 저장
-                if self.current_scan_id:
-                    self.db.save_upload_status(self.current_scan_id, False, error_msg)
-                    self.refresh_database_tab()
-
-            self.root.after(0, lambda msg=message: messagebox.showinfo("업로드 결과", msg))
-            self.root.after(0, lambda: self.status_var.set("업로드 완료"))
-
         except Exception as e:
             import traceback
             error_detail = traceback.format_exc()
@@ -830,6 +736,81 @@ class LottoQRApp:
             self.root.after(0, lambda: self.log(f"🔍 상세 오류:\n{error_detail}"))
             self.root.after(0, self._handle_error, f"업로드 오류: {e}")
 
+    def _on_upload_progress(self, stats: Dict):
+        """업로드 대기열 진행 상황을 프로그레스 바에 표시 (메인 스레드)"""
+        if stats['session_total'] == 0:
+            return
+
+        status = (f"업로드 중... {stats['session_done']}/{stats['session_total']}게임 "
+                  f"({stats['throughput']:.1f}게임/초, 대기 {stats['queue_depth']}건)")
+        if stats['queue_depth'] == 0:
+            status = "업로드 완료"
+        self.update_progress(stats['percent'], status)
+
+    def _on_upload_job_complete(self, summary: Dict):
+        """업로드 작업 완료 처리 (메인 스레드)"""
+        success_count = summary['done']
+        duplicate_count = summary['duplicate']
+        failed_count = summary['failed']
+        total_games = summary['total']
+        errors = summary['errors']
+
+        if success_count == total_games:
+            # 모든 게임이 성공
+            result = {
+                "success": True,
+                "message": f"✅ {success_count}개 게임이 모두 성공적으로 업로드되었습니다."
+            }
+        elif success_count > 0 and failed_count == 0:
+            # 일부 성공, 나머지는 중복
+            result = {
+                "success": True,
+                "message": f"✅ {success_count}개 게임 업로드 완료, {duplicate_count}개 게임은 이미 등록되어 스킵되었습니다."
+            }
+        elif success_count > 0 and failed_count > 0:
+            # 성공, 실패, 중복 혼재
+            message_parts = [f"✅ {success_count}개 게임 업로드 완료"]
+            if duplicate_count > 0:
+                message_parts.append(f"ℹ️ {duplicate_count}개 게임 스킵(중복)")
+            message_parts.append(f"❌ {failed_count}개 게임 실패")
+            message_parts.append(f"실패 원인: {'; '.join(errors[:3])}")
+
+            result = {
+                "success": True,
+                "message": "\n".join(message_parts)
+            }
+        elif duplicate_count == total_games:
+            # 모든 게임이 중복
+            result = {
+                "success": True,
+                "message": f"ℹ️ 모든 게임({duplicate_count}개)이 이미 등록되어 있어 스킵되었습니다."
+            }
+        elif failed_count > 0 and duplicate_count > 0:
+            # 실패와 중복만 있음
+            result = {
+                "success": False,
+                "error": f"❌ {failed_count}개 게임 실패, {duplicate_count}개 게임 스킵(중복)\n실패 원인: {'; '.join(errors[:3])}"
+            }
+        else:
+            # 모든 게임이 실패
+            result = {
+                "success": False,
+                "error": f"❌ 모든 게임({failed_count}개) 업로드 실패\n원인: {'; '.join(errors[:3])}"
+            }
+
+        if result["success"]:
+            message = result["message"]
+            self.log(f"✅ {message}")
+        else:
+            message = f"❌ 업로드 실패: {result['error']}"
+            self.log(message)
+
+        # 스캔별 업로드 상태는 업로드 대기열에서 저장됨
+        if summary['scan_id']:
+            self.refresh_database_tab()
+
+        messagebox.showinfo("업로드 결과", message)
+
     def log(self, message: str):
         """로그 메시지 추가"""
         from datetime import datetime
@@ -1587,6 +1568,9 @@ class LottoQRApp:
 
             self.log(f"✅ {result['message']}")
             self.status_var.set("로그인 완료")
+
+            # 로그인 대기 중이던 업로드 재개
+            self.upload_queue.wakeup()
         else:
             error_msg = result.get("details", result.get("error", "로그인 실패"))
             self.log(f"❌ 로그인 실패: {error_msg}")
@@ -1754,33 +1738,6 @@ class LottoQRApp:
         if status:
             self.status_var.set(status)
 
-    def upload_with_retry(self, game_data: Dict, max_retries: int = 3) -> Dict:
-        """자동 재시도 로직이 포함된 업로드"""
-        import time
-
-        for attempt in range(max_retries):
-            try:
-                result = self.api_client.upload_purchase_data(game_data)
-                if result["success"]:
-                    return result
-                elif result.get("error") == "중복 데이터":
-                    # 중복은 재시도하지 않음
-                    return result
-            except Exception as e:
-                if attempt == max_retries - 1:
-                    # 마지막 시도 실패 시 DB에 저장
-                    if self.current_scan_id:
-                        error_msg = f"업로드 실패 ({attempt + 1}회 시도): {str(e)}"
-                        self.db.save_failed_upload(self.current_scan_id, error_msg)
-                    raise
-                # 지수 백오프 대기
-                wait_time = 2 ** attempt
-                self.root.after(0, lambda a=attempt+1, w=wait_time:
-                               self.log(f"⚠️ 업로드 실패 (시도 {a}/{max_retries}), {w}초 후 재시도..."))
-                time.sleep(wait_time)
-
-        return {"success": False, "error": "최대 재시도 횟수 초과"}
-
     def select_folder(self):
         """폴더 선택 및 일괄 처리"""
         folder_path = filedialog.askdirectory(
@@ -2114,27 +2071,13 @@ E 수동 (낙첨)121517303135"""
                         messagebox.showwarning("인증 필요", "먼저 로그인해주세요.")
                         return
 
-                    # 각 게임을 개별로 업로드
-                    success_count = 0
-                    for game in data['games']:
-                        upload_data = {
-                            'round': data['round'],
-                            'draw_number': data['round'],
-                            'numbers': game['numbers'],
-                            'purchase_date': data.get('purchase_date', datetime.now().strftime('%Y-%m-%d'))
-                        }
-
-                        upload_result = self.api_client.upload_purchase_data(upload_data)
-                        if upload_result['success']:
-                            success_count += 1
-                        else:
-                            self.log(f"⚠️ 게임 {game['game_type']} 업로드 실패: {upload_result.get('error')}")
-
-                    if success_count > 0:
-                        messagebox.showinfo("성공", f"{success_count}/{len(data['games'])}개 게임이 서버에 업로드되었습니다.")
-                        self.log(f"✅ {success_count}개 게임 업로드 완료")
-                    else:
-                        messagebox.showerror("실패", "게임 업로드에 모두 실패했습니다.")
+                    # 스캔 업로드와 같은 대기열로 전송 (실패 시 outbox에 남아 재시도, 결과는 완료 콜백에서 표시)
+                    job_id = self.upload_queue.enqueue_games(
+                        data['round'],
+                        data['games'],
+                        data.get('purchase_date') or datetime.now().strftime('%Y-%m-%d')
+                    )
+                    self.log(f"📥 {len(data['games'])}개 게임을 업로드 대기열에 추가 (작업 {job_id[:8]})")
                 else:
                     messagebox.showinfo("완료", "로컬 DB에 저장되었습니다.")
 
@@ -2412,6 +2355,9 @@ E 수동 (낙첨)121517303135"""
     def on_closing(self):
         """앱 종료 시 로그 저장 및 정리"""
         try:
+            # 업로드 워커 종료 (남은 항목은 outbox에 보존되어 다음 실행 시 재개)
+            self.upload_queue.stop()
+
             # 버퍼에 남은 로그 저장
             if self.log_buffer:
                 self.save_log_to_file()
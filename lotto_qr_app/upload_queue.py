@@ -0,0 +1,234 @@
+"""
+업로드 대기열 - 로컬 outbox 기반 병렬 배치 업로드
+
+게임 단위 업로드 작업을 QRDatabase의 upload_outbox 테이블에 저장하고,
+소수의 워커 스레드가 APIClient의 세션을 공유하며 /api/purchases/batch로
+묶어서 전송한다. 재시도는 next_attempt_at 예약으로 처리하므로 워커가
+백오프 동안 sleep으로 묶이지 않는다.
+"""
+
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+from config import UPLOAD_WORKERS, UPLOAD_BATCH_SIZE, UPLOAD_MAX_RETRIES, UPLOAD_RETRY_BASE_DELAY
+
+# 처리량 계산 구간 (초)
+THROUGHPUT_WINDOW = 10.0
+
+# 대기 항목이 없을 때 워커가 다시 확인하기까지의 최대 대기 시간 (초)
+IDLE_WAIT = 5.0
+
+
+class UploadQueue:
+    def __init__(self, api_client, db,
+                 workers: int = UPLOAD_WORKERS,
+                 batch_size: int = UPLOAD_BATCH_SIZE,
+                 max_retries: int = UPLOAD_MAX_RETRIES,
+                 retry_base_delay: float = UPLOAD_RETRY_BASE_DELAY,
+                 on_progress: Optional[Callable[[Dict], None]] = None,
+                 on_job_complete: Optional[Callable[[Dict], None]] = None):
+        """
+        Args:
+            api_client: 업로드에 사용할 APIClient (세션 공유)
+            db: outbox를 보관하는 QRDatabase
+            on_progress: 배치 처리/대기열 추가 시 get_stats() 결과로 호출 (워커 스레드에서 호출됨)
+            on_job_complete: 작업(job)의 모든 게임이 종료 상태가 되면 요약 정보로 호출
+        """
+        self.api_client = api_client
+        self.db = db
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.on_progress = on_progress
+        self.on_job_complete = on_job_complete
+
+        self._wakeup = threading.Condition()
+        self._stop_event = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+        # 진행률/처리량 추적
+        self._lock = threading.Lock()
+        self._completions = deque()  # (timestamp, 처리된 게임 수)
+        self._session_total = 0  # 대기열이 비워진 이후 추가된 게임 수
+        self._session_done = 0  # 그 중 종료 상태가 된 게임 수
+        self._finished_jobs = set()
+
+    def start(self):
+        """워커 스레드 시작 (이전 실행에서 남은 대기 항목도 이어서 처리)"""
+        if self._threads:
+            return
+
+        self.db.requeue_in_flight_uploads()
+        counts = self.db.get_outbox_counts()
+        with self._lock:
+            self._session_total = counts['pending']
+            self._session_done = 0
+
+        self._stop_event.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker_loop, name=f"upload-worker-{i + 1}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 2.0):
+        """워커 스레드 종료 (처리 중인 항목은 다음 실행 시 복구됨)"""
+        self._stop_event.set()
+        self.wakeup()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def wakeup(self):
+        """대기 중인 워커 깨우기 (새 항목 추가, 로그인 완료 등)"""
+        with self._wakeup:
+            self._wakeup.notify_all()
+
+    def enqueue_games(self, round_number: int, games: List[Dict], purchase_date: str,
+                      scan_id: Optional[int] = None) -> str:
+        """게임 목록을 하나의 업로드 작업으로 대기열에 추가
+
+        Returns:
+            작업 ID (on_job_complete 콜백의 job_id와 동일)
+        """
+        job_id = uuid.uuid4().hex
+        payloads = [{
+            "numbers": game['numbers'],
+            "draw_number": round_number,
+            "purchase_date": purchase_date
+        } for game in games]
+
+        self.db.enqueue_uploads(job_id, payloads, scan_id)
+
+        with self._lock:
+            self._session_total += len(payloads)
+
+        self._emit_progress()
+        self.wakeup()
+        return job_id
+
+    def get_stats(self) -> Dict:
+        """대기열 깊이, 처리량(게임/초), 현재 진행률"""
+        counts = self.db.get_outbox_counts()
+        depth = counts['pending'] + counts['in_flight']
+        now = time.time()
+
+        with self._lock:
+            while self._completions and now - self._completions[0][0] > THROUGHPUT_WINDOW:
+                self._completions.popleft()
+            recent = sum(n for _, n in self._completions)
+            elapsed = now - self._completions[0][0] if self._completions else 0.0
+            throughput = recent / max(elapsed, 1.0) if recent else 0.0
+
+            total = self._session_total
+            done = self._session_done
+            if depth == 0:
+                # 대기열이 비면 다음 업로드부터 진행률을 새로 계산
+                self._session_total = 0
+                self._session_done = 0
+
+        return {
+            'queue_depth': depth,
+            'pending': counts['pending'],
+            'in_flight': counts['in_flight'],
+            'failed': counts['failed'],
+            'throughput': throughput,
+            'session_total': total,
+            'session_done': done,
+            'percent': (done / total * 100) if total else (100.0 if depth == 0 else 0.0),
+        }
+
+    def _worker_loop(self):
+        while not self._stop_event.is_set():
+            try:
+                # 로그인 전에는 시도 횟수를 소모하지 않고 대기
+                if not self.api_client.is_authenticated:
+                    self._wait(IDLE_WAIT)
+                    continue
+
+                items = self.db.claim_uploads(self.batch_size)
+                if not items:
+                    due = self.db.next_upload_due()
+                    timeout = IDLE_WAIT if due is None else min(IDLE_WAIT, max(0.05, due - time.time()))
+                    self._wait(timeout)
+                    continue
+
+                self._process_batch(items)
+            except Exception as e:
+                print(f"업로드 워커 오류: {e}")
+                self._wait(IDLE_WAIT)
+
+    def _wait(self, timeout: float):
+        with self._wakeup:
+            if not self._stop_event.is_set():
+                self._wakeup.wait(timeout)
+
+    def _process_batch(self, items: List[Dict]):
+        result = self.api_client.upload_purchase_batch([item['payload'] for item in items])
+        finished = 0
+
+        if result.get('retryable'):
+            # 지수 백오프로 재시도 예약 - 워커는 즉시 다음 배치로 이동
+            now = time.time()
+            schedule = [
+                (item['id'], now + self.retry_base_delay * (2 ** item['attempts']))
+                for item in items
+            ]
+            error = result.get('error', '알 수 없는 오류')
+            if result.get('details'):
+                error = f"{error}: {result['details']}"
+            finished = self.db.reschedule_uploads(schedule, error, self.max_retries)
+        elif result.get('success'):
+            outcomes = []
+            for item, item_result in zip(items, result['results']):
+                status = item_result['status']
+                outcomes.append((
+                    item['id'],
+                    'done' if status == 'created' else status,
+                    item_result.get('error')
+                ))
+            self.db.complete_uploads(outcomes)
+            finished = len(outcomes)
+        else:
+            # 재시도해도 해결되지 않는 오류 - 배치 전체 실패 처리
+            error = result.get('error', '알 수 없는 오류')
+            self.db.complete_uploads([(item['id'], 'failed', error) for item in items])
+            finished = len(items)
+
+        if finished:
+            with self._lock:
+                self._completions.append((time.time(), finished))
+                self._session_done += finished
+
+        self._emit_progress()
+        self._check_jobs({item['job_id'] for item in items})
+
+    def _check_jobs(self, job_ids):
+        """종료된 작업의 스캔 업로드 상태 저장 및 완료 콜백 호출"""
+        for job_id in job_ids:
+            summary = self.db.get_upload_job_summary(job_id)
+            if summary['pending'] or summary['in_flight']:
+                continue
+
+            with self._lock:
+                if job_id in self._finished_jobs:
+                    continue
+                self._finished_jobs.add(job_id)
+
+            if summary['scan_id']:
+                success = summary['failed'] == 0
+                message = (f"업로드 {summary['done']}건, 중복 {summary['duplicate']}건, "
+                           f"실패 {summary['failed']}건")
+                if summary['errors']:
+                    message += f" ({'; '.join(summary['errors'][:3])})"
+                self.db.save_upload_status(summary['scan_id'], success, message)
+
+            if self.on_job_complete:
+                self.on_job_complete(summary)
+
+    def _emit_progress(self):
+        if self.on_progress:
+            self.on_progress(self.get_stats())
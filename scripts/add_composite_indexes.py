@@ -81,6 +81,19 @@ def add_composite_indexes():
                 'columns': ['round', 'rank'],
                 'description': '회차별 등수별 당첨점 조회'
             },
+            {
+                'table': 'winning_shops',
+                'name': 'idx_winning_shops_rank_shop',
+                'columns': ['rank', 'shop_id'],
+                'description': '등수별 판매점 당첨 횟수 집계'
+            },
+            # Shop 테이블 복합 인덱스
+            {
+                'table': 'shops',
+                'name': 'idx_shops_region',
+                'columns': ['sido', 'sigungu'],
+                'description': '시/도, 시/군/구별 지역 집계'
+            },
         ]
 
         added_count = 0
@@ -135,6 +148,7 @@ def add_composite_indexes():
             print("   - 회차별 구매 내역 조회 속도 향상")
             print("   - 당첨 결과 필터링 속도 향상")
             print("   - 입력 소스별 통계 조회 속도 향상")
+            print("   - 판매점별/지역별 당첨 통계 집계 속도 향상")
             print()
 
         # 인덱스 상태 확인
@@ -0,0 +1,51 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Ensure project root is on sys.path when running as a script
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app import create_app
+from app.services.backtest import STRATEGIES, run_backtest
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="추천 전략 과거 회차 백테스트")
+    parser.add_argument("--strategies", default=",".join(STRATEGIES), help="쉼표로 구분된 전략 목록")
+    parser.add_argument("--tickets", type=int, default=1000, help="회차당 전략별 생성 티켓 수")
+    parser.add_argument("--start", type=int, default=None, help="시작 회차")
+    parser.add_argument("--end", type=int, default=None, help="종료 회차")
+    parser.add_argument("--window", type=int, default=None, help="빈도 계산에 사용할 직전 회차 수")
+    parser.add_argument("--workers", type=int, default=None, help="워커 프로세스 수")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--snapshot", default=None, help="DB 대신 사용할 스냅샷 디렉터리 (scripts/snapshot.py export)")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        started = time.time()
+        result = run_backtest(
+            strategies=[s.strip() for s in args.strategies.split(",") if s.strip()],
+            tickets_per_round=args.tickets,
+            start_round=args.start,
+            end_round=args.end,
+            window=args.window,
+            workers=args.workers,
+            seed=args.seed,
+            snapshot=args.snapshot,
+        )
+        elapsed = time.time() - started
+
+    print(f"Rounds {result['first_round']}-{result['last_round']} ({result['rounds']}), "
+          f"{result['tickets_per_round']} tickets/round, seed={result['seed']}, {elapsed:.1f}s")
+    for name, stats in result['strategies'].items():
+        tiers = " ".join(f"{rank}등:{count}" for rank, count in stats['tiers'].items())
+        print(f"  {name:<10} hit={stats['hit_rate']:.4f} EV/ticket={stats['expected_return']:.1f}원 "
+              f"ROI={stats['roi'] * 100:.1f}% [{tiers}]")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+# Ensure project root is on sys.path when running as a script
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.services.lotto_fetcher import _shop_page_url, get_session, parse_shop_page, CONNECT_TIMEOUT, READ_TIMEOUT
+from app.services.shop_page_parser import available_backends
+
+FIXTURES_DIR = PROJECT_ROOT / "scripts" / "fixtures" / "shop_pages"
+
+# 파싱 결과 비교 기준 백엔드
+REFERENCE_BACKEND = "bs4"
+
+
+def save_fixture(round_no: int, page: int) -> Path:
+    """실제 당첨점 페이지를 받아 fixture로 저장"""
+    resp = get_session().get(_shop_page_url(round_no, page), timeout=(CONNECT_TIMEOUT, READ_TIMEOUT))
+    resp.raise_for_status()
+    path = FIXTURES_DIR / f"live_{round_no}_page{page}.html"
+    path.write_text(resp.text, encoding="utf-8")
+    return path
+
+
+def bench(path: Path, backends, repeat: int) -> dict:
+    html = path.read_text(encoding="utf-8")
+    page = 1 if "page1" in path.stem else 2
+    reference = parse_shop_page(html, 0, page, backend=REFERENCE_BACKEND)
+
+    result = {"fixture": path.name, "bytes": len(html.encode("utf-8")), "rows": len(reference["rows"]),
+              "backends": {}}
+    for backend in backends:
+        parsed = parse_shop_page(html, 0, page, backend=backend)
+        started = time.perf_counter()
+        for _ in range(repeat):
+            parse_shop_page(html, 0, page, backend=backend)
+        elapsed = (time.perf_counter() - started) / repeat
+        result["backends"][backend] = {"ms_per_page": elapsed * 1000, "matches_reference": parsed == reference}
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="당첨점 페이지 파서 백엔드별 파싱 시간 측정")
+    parser.add_argument("--backends", default=",".join(available_backends()), help="쉼표로 구분된 백엔드 목록")
+    parser.add_argument("--repeat", type=int, default=50, help="fixture당 반복 횟수")
+    parser.add_argument("--save", type=int, nargs=2, metavar=("ROUND", "PAGE"),
+                        help="실제 페이지를 받아 fixture로 저장한 뒤 측정")
+    parser.add_argument("--output", help="결과를 JSON 파일로 저장 (실행 간 비교용)")
+    args = parser.parse_args()
+
+    if args.save:
+        print(f"Saved {save_fixture(*args.save)}")
+
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    results = [bench(path, backends, args.repeat) for path in sorted(FIXTURES_DIR.glob("*.html"))]
+
+    mismatched = False
+    for result in results:
+        print(f"{result['fixture']} ({result['bytes'] // 1024}KB, {result['rows']} rows)")
+        for backend, stats in result["backends"].items():
+            mark = "" if stats["matches_reference"] else "  MISMATCH"
+            mismatched = mismatched or not stats["matches_reference"]
+            print(f"  {backend:<10} {stats['ms_per_page']:8.3f} ms/page{mark}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps({"repeat": args.repeat, "results": results}, indent=2))
+
+    if mismatched:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
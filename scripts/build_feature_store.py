@@ -0,0 +1,38 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Ensure project root is on sys.path when running as a script
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app import create_app
+from app.services.feature_store import build_feature_store, get_feature_store, store_path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="C(45, 6) 조합 특성 저장소(메모리 맵 파일) 생성")
+    parser.add_argument("--path", default=None, help="저장소 파일 경로 (기본: instance/combination_features.bin)")
+    parser.add_argument("--if-stale", action="store_true", help="파일이 있고 DB와 같으면 건너뜀")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        if args.if_stale and not args.path:
+            store = get_feature_store()
+            if store is not None and not store.is_stale():
+                print(f"Feature store is up to date (round {store.built_round}): {store.path}")
+                return
+
+        started = time.time()
+        header = build_feature_store(args.path)
+        path = args.path or store_path()
+        size_mb = Path(path).stat().st_size / (1 << 20)
+        print(f"Built {path} ({size_mb:.0f}MB) through round {header['built_round']} "
+              f"({header['draw_count']} draws) in {time.time() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+import argparse
+import sys
+from pathlib import Path
+
+# Ensure project root is on sys.path when running as a script
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app import create_app
+from app.extensions import db
+from app.services.async_fetcher import DEFAULT_CONCURRENCY, DEFAULT_RATE
+from app.services.job_queue import DEFAULT_POLL_INTERVAL, run_worker
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="크롤링 작업 큐 워커 (웹 서버는 LOTTO_JOB_WORKER=external로 실행)"
+    )
+    parser.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL, help="대기 작업 확인 간격(초)")
+    parser.add_argument("--once", action="store_true", help="대기 작업을 모두 처리하면 종료")
+    parser.add_argument("--no-prefetch", action="store_true", help="asyncio 수집기로 응답을 미리 받지 않음")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="미리받기 동시 요청 수")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="미리받기 초당 최대 요청 수")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+    try:
+        run_worker(app, poll_interval=args.poll_interval, once=args.once,
+                   prefetch=not args.no_prefetch, concurrency=args.concurrency, rate=args.rate)
+    except KeyboardInterrupt:
+        print("Worker stopped.")
+
+
+if __name__ == "__main__":
+    main()
@@ -101,8 +101,81 @@ def main() -> None:
                 print(f"Error checking draws table (table may not exist yet): {e}")
                 # This is okay - the table will be created by db.create_all()
 
+            # winning_shops.shop_id (정규화 판매점 참조)
+            try:
+                existing_shop_columns = [col['name'] for col in inspector.get_columns('winning_shops')]
+                if 'shop_id' not in existing_shop_columns:
+                    connection.execute(text("ALTER TABLE winning_shops ADD COLUMN shop_id INTEGER REFERENCES shops(id)"))
+                    connection.execute(text("CREATE INDEX IF NOT EXISTS ix_winning_shops_shop_id ON winning_shops (shop_id)"))
+                    connection.commit()
+                    print("Added shop_id column to winning_shops table")
+                else:
+                    print("winning_shops.shop_id column already exists")
+            except Exception as e:
+                print(f"Error checking winning_shops table (table may not exist yet): {e}")
+
+            # shops 좌표 컬럼 (지오코딩)
+            try:
+                existing_shops_columns = [col['name'] for col in inspector.get_columns('shops')]
+                for column_name, column_def in [
+                    ('latitude', 'FLOAT'),
+                    ('longitude', 'FLOAT'),
+                    ('geo_precision', 'VARCHAR(10)')
+                ]:
+                    if column_name not in existing_shops_columns:
+                        connection.execute(text(f"ALTER TABLE shops ADD COLUMN {column_name} {column_def}"))
+                        connection.commit()
+                        print(f"Added {column_name} column to shops table")
+                    else:
+                        print(f"shops.{column_name} column already exists")
+            except Exception as e:
+                print(f"Error checking shops table (table may not exist yet): {e}")
+
+            # crawl_jobs.revalidate_shops (저장된 당첨점 페이지 재확인 옵션)
+            try:
+                existing_job_columns = [col['name'] for col in inspector.get_columns('crawl_jobs')]
+                if 'revalidate_shops' not in existing_job_columns:
+                    connection.execute(text(
+                        "ALTER TABLE crawl_jobs ADD COLUMN revalidate_shops BOOLEAN NOT NULL DEFAULT 0"
+                    ))
+                    connection.commit()
+                    print("Added revalidate_shops column to crawl_jobs table")
+                else:
+                    print("crawl_jobs.revalidate_shops column already exists")
+            except Exception as e:
+                print(f"Error checking crawl_jobs table (table may not exist yet): {e}")
+
         # Create all tables (will only create missing ones)
         db.create_all()
+
+        # 당첨점 전문 검색 인덱스 (기존 DB는 winning_shops 데이터로 채움)
+        from app.services.shop_search import create_shop_search_index
+        with db.engine.begin() as connection:
+            if create_shop_search_index(connection):
+                print("Created winning_shops_fts search index")
+            else:
+                print("winning_shops_fts search index already exists")
+
+        # 기존 당첨점을 정규화 판매점(shops)에 연결
+        from app.services.shop_normalizer import normalize_shops
+        result = normalize_shops()
+        print(f"Normalized winning shops: {result}")
+
+        # 당첨점/지역 순위 (통계 API는 조회만 하므로 여기서 채움)
+        from app.services.leaderboards import refresh_leaderboards
+        result = refresh_leaderboards()
+        print(f"Refreshed shop leaderboards: {result}")
+
+        # 판매점 좌표와 R*Tree 공간 인덱스
+        from app.services.shop_geo import create_spatial_index, geocode_shops
+        with db.engine.begin() as connection:
+            if create_spatial_index(connection):
+                print("Created shops_rtree spatial index")
+            else:
+                print("shops_rtree spatial index already exists")
+        result = geocode_shops()
+        print(f"Geocoded shops: {result}")
+
         print("Database migration completed.")
 
 
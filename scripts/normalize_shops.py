@@ -0,0 +1,33 @@
+import argparse
+import sys
+from pathlib import Path
+
+# Ensure project root is on sys.path when running as a script
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app import create_app
+from app.services.leaderboards import refresh_leaderboards
+from app.services.shop_geo import geocode_shops
+from app.services.shop_normalizer import normalize_shops
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="당첨점을 정규화 판매점(shops)에 연결")
+    parser.add_argument("--rebuild", action="store_true", help="모든 당첨 행을 다시 정규화")
+    parser.add_argument("--regeocode", action="store_true", help="모든 판매점 좌표를 다시 계산 (좌표 데이터셋 교체 시)")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        result = normalize_shops(rebuild=args.rebuild)
+        print(f"Normalize result: {result}")
+        result = geocode_shops(rebuild=args.regeocode)
+        print(f"Geocode result: {result}")
+        result = refresh_leaderboards()
+        print(f"Leaderboard result: {result}")
+
+
+if __name__ == "__main__":
+    main()
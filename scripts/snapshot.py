@@ -0,0 +1,58 @@
+import argparse
+import json
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Ensure project root is on sys.path when running as a script
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app import create_app
+from app.services.snapshots import FORMATS, export_snapshot, import_snapshot, load_draw_arrays, snapshot_root
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="draws/winning_shops Arrow/Parquet 스냅샷 내보내기/가져오기")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    export = sub.add_parser("export", help="DB를 스냅샷 디렉터리로 내보내기")
+    export.add_argument("directory", nargs="?", default=None,
+                        help="스냅샷 디렉터리 (기본: instance/snapshots/<시각>)")
+    export.add_argument("--formats", default=",".join(FORMATS), help="쉼표로 구분된 형식 (arrow,parquet)")
+
+    load = sub.add_parser("import", help="스냅샷을 DB에 반영")
+    load.add_argument("directory", help="스냅샷 디렉터리")
+    load.add_argument("--data-type", choices=("both", "numbers", "shops"), default="both")
+
+    inspect = sub.add_parser("inspect", help="스냅샷의 추첨 결과 행렬 확인 (DB 사용 안 함)")
+    inspect.add_argument("directory", help="스냅샷 디렉터리")
+    args = parser.parse_args()
+
+    if args.command == "inspect":
+        arrays = load_draw_arrays(args.directory)
+        numbers = arrays["numbers"]
+        print(f"{len(arrays['rounds'])} draws, numbers {numbers.shape} {numbers.dtype}, "
+              f"zero-copy={not numbers.flags.owndata and not numbers.flags.writeable}")
+        if len(arrays["rounds"]):
+            print(f"Rounds {arrays['rounds'][0]}-{arrays['rounds'][-1]}, latest {numbers[-1].tolist()} "
+                  f"+ {arrays['bonus'][-1]}")
+        return
+
+    app = create_app()
+    with app.app_context():
+        if args.command == "export":
+            directory = args.directory or snapshot_root(app.instance_path) / datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+            formats = [fmt.strip() for fmt in args.formats.split(",") if fmt.strip()]
+            manifest = export_snapshot(directory, formats)
+            print(f"Snapshot written to {directory}")
+            print(json.dumps(manifest, indent=2, ensure_ascii=False))
+        else:
+            result = import_snapshot(args.directory, args.data_type)
+            print(f"Imported {result['rounds']} rounds: draws updated={result['draws_updated']}, "
+                  f"shops updated={result['shops_updated']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import argparse
 import os
 import sys
 from pathlib import Path
@@ -8,14 +9,37 @@ if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
 from app import create_app
-from app.services.updater import update_to_latest
+from app.services import http_cache
+from app.services.async_fetcher import DEFAULT_CONCURRENCY, DEFAULT_RATE
+from app.services.updater import revalidate_recent_shops, update_to_latest
 
 
 def main() -> None:
+    parser = argparse.ArgumentParser(description="최신 회차까지 추첨 결과/당첨점 수집")
+    parser.add_argument("--cache-mode", choices=http_cache.MODES, default=None,
+                        help="HTTP 캐시 모드 (replay: 캐시만 사용해 네트워크 없이 재구성)")
+    parser.add_argument("--prune-cache", action="store_true", help="수집 후 만료된 캐시 항목 삭제")
+    parser.add_argument("--async-prefetch", action="store_true",
+                        help="asyncio 수집기로 응답을 동시에 미리 받아 캐시한 뒤 반영")
+    parser.add_argument("--bulk", action="store_true",
+                        help="asyncio 수집기로 받은 결과를 청크 단위 트랜잭션으로 일괄 저장")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="동시 요청 수")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="초당 최대 요청 수")
+    parser.add_argument("--revalidate-shops", type=int, default=0, metavar="N",
+                        help="수집 후 최근 N개 회차의 당첨점 페이지를 조건부 요청으로 다시 확인해 바뀐 페이지 반영")
+    args = parser.parse_args()
+
     app = create_app()
     with app.app_context():
-        result = update_to_latest()
+        if args.cache_mode:
+            http_cache.set_mode(args.cache_mode)
+        result = update_to_latest(prefetch=args.async_prefetch, concurrency=args.concurrency, rate=args.rate,
+                                  bulk=args.bulk)
         print(f"Update result: {result}")
+        if args.revalidate_shops:
+            print(f"Shop revalidation: {revalidate_recent_shops(args.revalidate_shops, args.concurrency, args.rate)}")
+        if args.prune_cache:
+            print(f"Cache prune: {http_cache.prune()}")
 
 
 if __name__ == "__main__":